@@ -0,0 +1,88 @@
+"""Compare converting the full page with markdownify against pruning the DOM to the main content first,
+and converting inline against the round trip to the converter's process pool.
+
+The pool columns include pickling the page to a worker and the markdown back; the pool startup,
+spawning the workers and importing the converter in them, is reported once, as every run pays it.
+
+The fixture pages are a few KB, the real ones are 100 KB to several MB. `--size` adds each page
+with its body repeated up to that many characters, to measure conversion at the real sizes.
+
+Usage:
+    uv run python benchmarks/bench_convert.py --repeat 50
+    uv run python benchmarks/bench_convert.py --repeat 3 --size 100000 --size 1000000 --size 4000000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from typing import Annotated
+
+import typer
+from fixture_server import FIXTURES_DIR
+from fixture_server import fixture_pages
+
+from exchange_changelog.converter import Converter
+from exchange_changelog.converter import html_to_markdown
+
+
+def measure(fn: Callable[[str], str], html: str, repeat: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = fn(html)
+    return (time.perf_counter() - start) / repeat * 1000, len(text)
+
+
+def scale_page(html: str, size: int) -> str:
+    """The page with its body repeated until it is at least `size` characters."""
+    start = html.index(">", html.index("<body")) + 1
+    end = html.rindex("</body>")
+    body = html[start:end]
+    copies = max(1, math.ceil((size - len(html) + len(body)) / len(body)))
+    return html[:start] + body * copies + html[end:]
+
+
+async def measure_pool(pages: dict[str, str], repeat: int, workers: int) -> tuple[float, dict[str, float]]:
+    """The milliseconds until the first conversion through a cold pool returns, and the mean per page after."""
+    start = time.perf_counter()
+    async with Converter(max_workers=workers, min_size=0) as converter:
+        await converter("<p></p>")
+        startup_ms = (time.perf_counter() - start) * 1000
+
+        results = {}
+        for name, html in pages.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                await converter(html)
+            results[name] = (time.perf_counter() - start) / repeat * 1000
+    return startup_ms, results
+
+
+def main(
+    repeat: Annotated[int, typer.Option(help="conversions per page and path")] = 50,
+    workers: Annotated[int, typer.Option(help="processes in the converter pool")] = 2,
+    size: Annotated[
+        list[int] | None, typer.Option(help="also convert each page scaled up to this many characters")
+    ] = None,
+) -> None:
+    pages = {name: (FIXTURES_DIR / name).read_text(encoding="utf-8") for name in fixture_pages()}
+    for scaled_size in size or []:
+        pages.update(
+            {f"{name}@{scaled_size // 1000}k": scale_page(pages[name], scaled_size) for name in fixture_pages()}
+        )
+    startup_ms, pool_ms = asyncio.run(measure_pool(pages, repeat, workers))
+
+    print(f"{'page':<28} {'full ms':>9} {'full chars':>11} {'pruned ms':>10} {'pruned chars':>13} {'pool ms':>8}")
+    for name, html in pages.items():
+        full_ms, full_chars = measure(lambda html: html_to_markdown(html, prune=False), html, repeat)
+        pruned_ms, pruned_chars = measure(html_to_markdown, html, repeat)
+        print(
+            f"{name:<28} {full_ms:>9.2f} {full_chars:>11} {pruned_ms:>10.2f} {pruned_chars:>13} {pool_ms[name]:>8.2f}"
+        )
+    print(f"pool startup with {workers} workers: {startup_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,144 @@
+"""Run App end to end against the fixture pages and a fake model, with no network.
+
+Every configured size runs in its own process so that peak RSS is measured per size.
+The second run of each size reuses the cache of the first one, which measures the
+unchanged-page path.
+
+Usage:
+    uv run python benchmarks/bench_e2e.py --docs 15 --docs 150 --docs 1500 --latency 0.5
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Awaitable
+from collections.abc import Callable
+from pathlib import Path
+from typing import Annotated
+from typing import Any
+
+import typer
+from agents import set_tracing_disabled
+from fake_model import FakeModel
+from fixture_server import fixture_pages
+from fixture_server import serve_fixtures
+
+from exchange_changelog import app as app_module
+from exchange_changelog import lazy
+from exchange_changelog.app import App
+from exchange_changelog.changelog import extract_changelog
+from exchange_changelog.config import Config
+from exchange_changelog.config import Document
+
+
+def timed(timings: list[float], fn: Callable[..., Awaitable[Any]]) -> Any:
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def run_app(config: Config, output_file: Path, model: FakeModel) -> dict[str, Any]:
+    app = App(config=config, output_file=output_file)
+
+    stages: dict[str, list[float]] = defaultdict(list)
+    app.fetcher.fetch = timed(stages["fetch"], app.fetcher.fetch)  # type: ignore[method-assign]
+    app.scraper.fetch = timed(stages["render"], app.scraper.fetch)  # type: ignore[method-assign]
+    app.convert = timed(stages["convert"], app.convert)  # type: ignore[method-assign]
+    app_module.extract_changelog = timed(stages["extract"], extract_changelog)
+
+    calls = model.calls
+    start = time.perf_counter()
+    app.run()
+    wall = time.perf_counter() - start
+
+    return {
+        "wall": wall,
+        "throughput": len(config.docs) / wall,
+        "llm_calls": model.calls - calls,
+        "stages": {
+            name: {"count": len(t), "mean": statistics.mean(t), "p95": sorted(t)[int(len(t) * 0.95)]}
+            for name, t in stages.items()
+            if t
+        },
+    }
+
+
+def run_size(num_docs: int, latency: float, concurrency: int) -> dict[str, Any]:
+    # make sure nothing reaches out to real services
+    for key in ("REDIS_URL", "SLACK_TOKEN", "SLACK_CHANNEL", "LANGFUSE_PUBLIC_KEY"):
+        os.environ.pop(key, None)
+    set_tracing_disabled(True)
+
+    model = FakeModel(latency=latency)
+    lazy.get_openai_model = lambda *args, **kwargs: model  # type: ignore[assignment]
+
+    pages = fixture_pages()
+    with serve_fixtures() as base_url, tempfile.TemporaryDirectory() as tmp:
+        config = Config(
+            docs=[
+                Document(name=f"doc {i}", url=f"{base_url}/{pages[i % len(pages)]}?doc={i}") for i in range(num_docs)
+            ],
+            num_days=3650,
+            max_concurrency=concurrency,
+            # every fixture is served from the same local host
+            max_concurrency_per_host=concurrency,
+            cache_dir=str(Path(tmp) / "cache"),
+        )
+        cold = run_app(config, Path(tmp) / "changelog.md", model)
+        warm = run_app(config, Path(tmp) / "changelog.md", model)
+
+    # ru_maxrss is in kilobytes on Linux; the converter pool runs in child processes
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"docs": num_docs, "cold": cold, "warm": warm, "peak_rss_mb": (self_rss + children_rss) / 1024}
+
+
+def print_report(results: list[dict[str, Any]]) -> None:
+    print(f"{'docs':>6} {'run':<5} {'wall s':>8} {'docs/s':>8} {'llm':>6} {'rss MB':>8}  stages (mean / p95 ms)")
+    for result in results:
+        for run in ("cold", "warm"):
+            r = result[run]
+            stages = "  ".join(
+                f"{name}={s['mean'] * 1000:.1f}/{s['p95'] * 1000:.1f}" for name, s in sorted(r["stages"].items())
+            )
+            print(
+                f"{result['docs']:>6} {run:<5} {r['wall']:>8.2f} {r['throughput']:>8.1f} {r['llm_calls']:>6} "
+                f"{result['peak_rss_mb']:>8.1f}  {stages}"
+            )
+
+
+def main(
+    docs: Annotated[list[int] | None, typer.Option(help="number of documents, may be repeated")] = None,
+    latency: Annotated[float, typer.Option(help="fake model latency in seconds")] = 0.5,
+    concurrency: Annotated[int, typer.Option(help="Config.max_concurrency")] = 16,
+    child: Annotated[bool, typer.Option(hidden=True)] = False,
+) -> None:
+    sizes = docs or [15, 150, 1500]
+    if child:
+        print(json.dumps(run_size(sizes[0], latency, concurrency)))
+        return
+
+    results = []
+    for size in sizes:
+        cmd = [sys.executable, __file__, "--child", "--docs", str(size)]
+        cmd += ["--latency", str(latency), "--concurrency", str(concurrency)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print_report(results)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,82 @@
+"""Compare page loads with networkidle and every request against request blocking and the readiness wait.
+
+Reports the mean load time and the bytes transferred per fixture page. The fixture pages
+reference real analytics and chat widget scripts, so the "before" numbers depend on the network.
+
+Usage:
+    uv run python benchmarks/bench_page_load.py --rounds 3
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from typing import Annotated
+from typing import Any
+
+import typer
+from fixture_server import fixture_pages
+from fixture_server import serve_fixtures
+
+from exchange_changelog.scraper import PageOptions
+from exchange_changelog.scraper import PageSlot
+from exchange_changelog.scraper import PlaywrightScraper
+
+
+class MeasuringScraper(PlaywrightScraper):
+    """Add up the bytes of every response the page receives."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.bytes = 0
+
+    async def _load(self, slot: PageSlot, page: Any, url: str, options: PageOptions) -> str:
+        tasks = []
+
+        async def add_sizes(request: Any) -> None:
+            sizes = await request.sizes()
+            self.bytes += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+
+        def on_finished(request: Any) -> None:
+            tasks.append(asyncio.ensure_future(add_sizes(request)))
+
+        page.on("requestfinished", on_finished)
+        try:
+            return await super()._load(slot, page, url, options)
+        finally:
+            page.remove_listener("requestfinished", on_finished)
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+MODES: dict[str, dict[str, Any]] = {
+    "before": {"wait_until": "networkidle", "block_requests": False, "wait_for_ready": False},
+    "after": {},
+}
+
+
+async def load(url: str, mode: str) -> tuple[float, int]:
+    scraper = MeasuringScraper(timeout=30_000, browser_headless=True, pool_size=1, **MODES[mode])
+    async with scraper:
+        # launch the browser before timing
+        await scraper.fetch("about:blank")
+        scraper.bytes = 0
+
+        start = time.perf_counter()
+        await scraper.fetch(url)
+        return time.perf_counter() - start, scraper.bytes
+
+
+def main(rounds: Annotated[int, typer.Option(help="number of loads per page and mode")] = 3) -> None:
+    with serve_fixtures() as base_url:
+        print(f"{'page':<20} {'mode':<8} {'mean':>8} {'bytes':>10}")
+        for name in fixture_pages():
+            for mode in MODES:
+                results = [asyncio.run(load(f"{base_url}/{name}", mode)) for _ in range(rounds)]
+                seconds = statistics.mean(elapsed for elapsed, _ in results)
+                size = statistics.mean(size for _, size in results)
+                print(f"{name:<20} {mode:<8} {seconds:>7.3f}s {size:>10.0f}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,72 @@
+"""Compare launching Chromium per URL with the pooled PlaywrightScraper.
+
+Both modes load the same URLs with at most `--concurrency` pages in flight, so the difference
+is the browser launch and context setup the pool saves, not the concurrency.
+
+Usage:
+    uv run python benchmarks/bench_scraper.py --rounds 3
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from typing import Annotated
+
+import typer
+from fixture_server import fixture_pages
+from fixture_server import serve_fixtures
+
+from exchange_changelog.scraper import PlaywrightScraper
+
+
+async def scrape_all(scraper: PlaywrightScraper, urls: list[str], concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def scrape(url: str) -> None:
+        async with semaphore:
+            await scraper(url)
+
+    await asyncio.gather(*[scrape(url) for url in urls])
+
+
+async def scrape_per_url(urls: list[str], concurrency: int) -> None:
+    # not started, so every call launches and closes its own browser
+    scraper = PlaywrightScraper(timeout=30_000, wait_until="load", browser_headless=True)
+    await scrape_all(scraper, urls, concurrency)
+
+
+async def scrape_pooled(urls: list[str], concurrency: int) -> None:
+    async with PlaywrightScraper(
+        timeout=30_000,
+        wait_until="load",
+        browser_headless=True,
+        pool_size=concurrency,
+    ) as scraper:
+        await scrape_all(scraper, urls, concurrency)
+
+
+def measure(name: str, rounds: int, fn) -> None:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        asyncio.run(fn())
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<12} mean={statistics.mean(timings):.3f}s min={min(timings):.3f}s max={max(timings):.3f}s")
+
+
+def main(
+    rounds: Annotated[int, typer.Option(help="number of rounds per mode")] = 3,
+    copies: Annotated[int, typer.Option(help="how many times each fixture page is requested")] = 3,
+    concurrency: Annotated[int, typer.Option(help="pages in flight in both modes, and the pool size")] = 4,
+) -> None:
+    with serve_fixtures() as base_url:
+        urls = [f"{base_url}/{name}" for name in fixture_pages()] * copies
+        print(f"{len(urls)} urls, {concurrency} in flight, {rounds} rounds")
+        measure("per-url", rounds, lambda: scrape_per_url(urls, concurrency))
+        measure("pooled", rounds, lambda: scrape_pooled(urls, concurrency))
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,109 @@
+"""A deterministic stand-in for the OpenAI model, for running the pipeline offline."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from agents import Model
+from agents import ModelResponse
+from agents import Usage
+from agents.items import TResponseStreamEvent
+from openai.types.responses import Response
+from openai.types.responses import ResponseCompletedEvent
+from openai.types.responses import ResponseOutputMessage
+from openai.types.responses import ResponseOutputText
+from openai.types.responses import ResponseUsage
+
+from exchange_changelog.changelog import Change
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.changelog import Reasoning
+from exchange_changelog.sections import parse_headings
+from exchange_changelog.tokens import count_tokens
+
+
+def fake_changelog(text: str) -> Changelog:
+    """Build a changelog with one change per dated heading, using the bullets below it as items."""
+    lines = text.splitlines()
+    headings = parse_headings(lines)
+
+    changes = []
+    for i, heading in enumerate(headings):
+        if heading.date is None:
+            continue
+        end = headings[i + 1].line if i + 1 < len(headings) else len(lines)
+        items = [line.lstrip("*+- ") for line in lines[heading.line + 1 : end] if line[:1] in "*+-"]
+        changes.append(
+            Change(
+                reasoning=Reasoning(steps=[], final_output=""),
+                date=heading.date.isoformat(),
+                items=items or [heading.title],
+                keywords=[],
+                categories=[],
+            )
+        )
+    return Changelog(changes=changes[:10], upcoming_changes="")
+
+
+class FakeModel(Model):
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    async def get_response(
+        self, system_instructions: str | None, input: Any, *args: Any, **kwargs: Any
+    ) -> ModelResponse:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+        text = input if isinstance(input, str) else "\n".join(str(item.get("content", "")) for item in input)
+        output = fake_changelog(text).model_dump_json()
+        input_tokens = count_tokens((system_instructions or "") + text)
+        output_tokens = count_tokens(output)
+        return ModelResponse(
+            output=[
+                ResponseOutputMessage(
+                    id=f"msg_{self.calls}",
+                    content=[ResponseOutputText(text=output, type="output_text", annotations=[])],
+                    role="assistant",
+                    status="completed",
+                    type="message",
+                )
+            ],
+            usage=Usage(
+                requests=1,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+            ),
+            response_id=None,
+        )
+
+    async def stream_response(
+        self, system_instructions: str | None, input: Any, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        """The whole answer of `get_response` as a single completed event."""
+        response = await self.get_response(system_instructions, input, *args, **kwargs)
+        yield ResponseCompletedEvent(
+            response=Response(
+                id=f"resp_{self.calls}",
+                created_at=time.time(),
+                model="fake",
+                object="response",
+                output=response.output,
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+                usage=ResponseUsage(
+                    input_tokens=response.usage.input_tokens,
+                    input_tokens_details=response.usage.input_tokens_details,
+                    output_tokens=response.usage.output_tokens,
+                    output_tokens_details=response.usage.output_tokens_details,
+                    total_tokens=response.usage.total_tokens,
+                ),
+            ),
+            sequence_number=0,
+            type="response.completed",
+        )
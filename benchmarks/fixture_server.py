@@ -0,0 +1,41 @@
+"""Serve the hand-written exchange pages in tests/fixtures/pages over local HTTP."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "pages"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def fixture_pages() -> list[str]:
+    return sorted(p.name for p in FIXTURES_DIR.glob("*.html"))
+
+
+class FixtureServer(ThreadingHTTPServer):
+    # the default backlog of 5 drops connections under concurrent load, which shows up as 1s retries
+    request_queue_size = 1024
+
+
+@contextmanager
+def serve_fixtures(directory: Path = FIXTURES_DIR) -> Iterator[str]:
+    """Start a local HTTP server in a background thread and yield its base URL."""
+    server = FixtureServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f"http://{host!s}:{port}"
+    finally:
+        server.shutdown()
+        server.server_close()
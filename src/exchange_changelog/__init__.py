@@ -1,11 +1,25 @@
 import os
 import sys
+from typing import TYPE_CHECKING
+from typing import Any
 from typing import Final
 
 from loguru import logger
 
-from .lazy import lazy_run
-from .lazy import lazy_run_sync
+if TYPE_CHECKING:
+    from .lazy import lazy_run
+    from .lazy import lazy_run_sync
+
+__all__ = ["lazy_run", "lazy_run_sync"]
 
 LOGURU_LEVEL: Final[str] = os.getenv("LOGURU_LEVEL", "INFO")
 logger.configure(handlers=[{"sink": sys.stderr, "level": LOGURU_LEVEL}])
+
+
+def __getattr__(name: str) -> Any:
+    # lazy.py imports the agents sdk and openai, which take seconds; load it on first use
+    if name in __all__:
+        from . import lazy
+
+        return getattr(lazy, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,49 @@
+from __future__ import annotations
+
 import asyncio
 import os
+from datetime import date
+from datetime import timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlparse
 
 import logfire
 from loguru import logger
-from redis.asyncio import Redis
+from pydantic import BaseModel
 
+from .batch import BatchClient
+from .batch import BatchExtractor
 from .changelog import Changelog
 from .changelog import extract_changelog
 from .config import Config
 from .config import Document
+from .converter import Converter
+from .fetcher import HttpFetcher
+from .fetcher import is_sufficient
+from .history import HistoryIndex
+from .metrics import Metrics
+from .rules import parse_changelog
+from .scraper import PageOptions
 from .scraper import PlaywrightScraper
-from .slack import post_slack_message
+from .sections import diff_sections
+from .sections import select_recent_sections
+from .slack import SlackQueue
+from .snapshots import SnapshotStore
+from .sources import find_source
+from .store import fingerprint
+from .store import get_store
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class Extraction(BaseModel):
+    """The last extraction of a document, used to skip or narrow down the next one."""
+
+    fingerprint: str
+    text: str = ""
+    changelog: Changelog
 
 
 class App:
@@ -20,44 +52,260 @@ class App:
         self.output_file = Path(output_file)
 
         # Setup redis
-        self.redis = None
+        self.redis: Redis | None = None
         redis_url = os.getenv("REDIS_URL")
         if redis_url is not None:
+            from redis.asyncio import Redis
+
             logger.info("REDIS_URL is set, using redis")
             self.redis = Redis.from_url(redis_url)
+        self.store = get_store(self.redis, config.cache_dir)
 
-        self.lock = asyncio.Lock()
         self.results: list[tuple[Document, Changelog]] = []
-        self.scraper = PlaywrightScraper(timeout=30_000)
+        self.seen: set[str] = set()
+        self.fetcher = HttpFetcher(self.store, max_connections=config.max_concurrency * 2)
+        # a shared browser, e.g. `exchange-changelog browser-server`, saves launching one per run
+        self.scraper = PlaywrightScraper(
+            timeout=30_000, pool_size=config.max_concurrency, browser_url=os.getenv("BROWSER_CDP_URL") or None
+        )
+        self.converter = Converter(max_workers=config.convert_workers, min_size=config.convert_min_size)
+        self.slack = SlackQueue()
+        self.metrics = Metrics()
+        self.snapshots = SnapshotStore(config.snapshot_dir) if config.snapshot_dir else None
+        self.history = HistoryIndex(config.history_db) if config.history_db else None
+
+        # limit the number of docs in flight, and the number of pages open per host
+        self.semaphore = asyncio.Semaphore(config.max_concurrency)
+        self.host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.config.max_concurrency_per_host)
+        return self.host_semaphores[host]
+
+    async def scrape(self, api_doc: Document) -> str:
+        """Load the page as markdown: from a cheaper source, over plain http, or with the browser as a last resort."""
+        host_semaphore = self.get_host_semaphore(api_doc.url)
+
+        source = find_source(api_doc.url, api_doc.source)
+        if source is not None:
+            async with host_semaphore:
+                with self.metrics.timer("source", api_doc.name):
+                    text = await source.fetch(self.fetcher, api_doc.url)
+            if text and text.strip():
+                self.metrics.inc("bytes_fetched", api_doc.name, len(text.encode()))
+                self.metrics.inc("source_reads", api_doc.name)
+                await self.save_snapshot(api_doc, text, text)
+                return text
+            logger.info("no text from the {} source of {}, loading the page", source.name, api_doc.name)
+
+        if not api_doc.render:
+            async with host_semaphore:
+                with self.metrics.timer("fetch", api_doc.name):
+                    page = await self.fetcher.fetch(api_doc.url, remember=False)
+            if page is not None:
+                self.metrics.inc("bytes_fetched", api_doc.name, len(page.html.encode()))
+                if page.not_modified:
+                    self.metrics.inc("not_modified", api_doc.name)
+                text = await self.convert(api_doc, page.html)
+                # only a page that needs no browser is kept for conditional requests, a 304 for
+                # the shell of a client-side rendered page would skip rendering it
+                if is_sufficient(text):
+                    if not page.not_modified:
+                        await self.fetcher.remember(api_doc.url, page)
+                    await self.save_snapshot(api_doc, page.html, text)
+                    return text
+                if page.not_modified:
+                    await self.fetcher.forget(api_doc.url)
+            logger.info("static html of {} is not sufficient, rendering with browser", api_doc.name)
+
+        # the page goes back to the pool before markdown conversion and the llm call
+        async with host_semaphore:
+            with self.metrics.timer("render", api_doc.name):
+                options = PageOptions(content_selector=api_doc.content_selector, allow=api_doc.allow_requests)
+                html = await self.scraper.fetch(api_doc.url, options)
+        self.metrics.inc("rendered", api_doc.name)
+        self.metrics.inc("bytes_fetched", api_doc.name, len(html.encode()))
+        text = await self.convert(api_doc, html)
+        await self.save_snapshot(api_doc, html, text)
+        return text
+
+    async def convert(self, api_doc: Document, html: str) -> str:
+        with self.metrics.timer("convert", api_doc.name):
+            return await self.converter(html, api_doc.content_selector, api_doc.drop_selectors)
+
+    async def save_snapshot(self, api_doc: Document, html: str, text: str) -> None:
+        if self.snapshots is None:
+            return
+
+        try:
+            await asyncio.to_thread(self.snapshots.save, api_doc.name, api_doc.url, html, text)
+        except Exception as e:
+            logger.warning("unable to save a snapshot of {}, got: {}", api_doc.name, e)
 
     async def extract_recent_changelog(self, api_doc: Document) -> Changelog:
-        text = await self.scraper(api_doc.url)
+        text = await self.scrape(api_doc)
         logger.info("text length: {}", len(text))
 
+        changelog = self.parse_with_rules(api_doc, text)
+        if changelog is None:
+            changelog = await self.extract(api_doc, self.select_text(api_doc, text))
+
+        await self.select_recent_changes(api_doc, changelog)
+
+        return changelog
+
+    async def select_recent_changes(self, api_doc: Document, changelog: Changelog) -> None:
+        """Drop the changes older than num_days, indexing them all first if history_db is set."""
+        if self.history is None:
+            changelog.select_recent_changes(self.config.num_days)
+            return
+
+        since = date.today() - timedelta(days=self.config.num_days)
+        try:
+            changelog.changes = await asyncio.to_thread(
+                self.history.recent_changes, api_doc.name, changelog.changes, since
+            )
+        except Exception as e:
+            logger.warning("unable to index the changes of {}, got: {}", api_doc.name, e)
+            changelog.select_recent_changes(self.config.num_days)
+
+    async def extract(self, api_doc: Document, text: str) -> Changelog:
+        # skip the llm call if the page has not changed since the last run
+        previous = await self.load_extraction(api_doc)
+        unchanged = self.unchanged_changelog(api_doc, previous, text)
+        if unchanged is not None:
+            return unchanged
+
+        changelog = None
+        # only diff against a snapshot that was extracted with the same prompt
+        if (
+            self.config.incremental
+            and previous is not None
+            and fingerprint(previous.text, self.config.prompt) == previous.fingerprint
+        ):
+            changelog = await self.extract_incremental(api_doc, previous, text)
+
+        if changelog is None:
+            changelog = await self.extract_changelog(api_doc, text)
+
+        await self.save_changelog(api_doc, text, changelog)
+        return changelog
+
+    def unchanged_changelog(self, api_doc: Document, previous: Extraction | None, text: str) -> Changelog | None:
+        """The previous changelog, if it was extracted from the same text with the same prompt."""
+        if previous is None or previous.fingerprint != fingerprint(text, self.config.prompt):
+            return None
+
+        logger.info("{} is unchanged, reusing the previous changelog", api_doc.name)
+        self.metrics.inc("unchanged_skips", api_doc.name)
+        return previous.changelog
+
+    async def extract_incremental(self, api_doc: Document, previous: Extraction, text: str) -> Changelog | None:
+        """Extract only the sections added or modified since the previous snapshot, and merge them in."""
+        diff = diff_sections(previous.text, text)
+        if diff is None:
+            return None
+
+        if diff.unchanged:
+            logger.info("no sections of {} changed, reusing the previous changelog", api_doc.name)
+            self.metrics.inc("unchanged_skips", api_doc.name)
+            return previous.changelog
+
+        if not diff.changed and diff.upcoming is None:
+            logger.info("upcoming changes of {} were removed", api_doc.name)
+            return Changelog(changes=previous.changelog.changes, upcoming_changes="")
+
+        logger.info("extracting {} changed sections of {}", len(diff.changed), api_doc.name)
+        partial = await self.extract_changelog(api_doc, diff.to_text())
+        return previous.changelog.merge(partial)
+
+    async def extract_changelog(self, api_doc: Document, text: str) -> Changelog:
+        self.metrics.inc("chars_sent", api_doc.name, len(text))
+        with self.metrics.timer("llm", api_doc.name):
+            return await extract_changelog(text, prompt=self.config.prompt, chunk_tokens=self.config.chunk_tokens)
+
+    def parse_with_rules(self, api_doc: Document, text: str) -> Changelog | None:
+        """Parse the full page with the rule-based parser, if the doc asks for it and the result is confident."""
+        if api_doc.parser != "rules":
+            return None
+
+        with self.metrics.timer("rules", api_doc.name):
+            result = parse_changelog(text, section_pattern=api_doc.section)
+
+        if result.confidence < self.config.rules_min_confidence:
+            logger.info("rules parsed {} with confidence {:.2f}, using the llm", api_doc.name, result.confidence)
+            self.metrics.inc("rules_fallbacks", api_doc.name)
+            return None
+
+        logger.info("rules parsed {} with confidence {:.2f}", api_doc.name, result.confidence)
+        self.metrics.inc("rules_parsed", api_doc.name)
+        return result.changelog
+
+    def select_text(self, api_doc: Document, text: str) -> str:
+        if api_doc.select_sections:
+            token_budget = api_doc.token_budget or self.config.token_budget
+            selected = select_recent_sections(text, token_budget=token_budget, section_pattern=api_doc.section)
+            if selected is not None:
+                return selected
+            logger.info("no dated sections found in {}, trimming to {} characters", api_doc.name, self.config.trim_len)
+
         # trim text
-        text = text[: self.config.trim_len]
+        return text[: self.config.trim_len]
+
+    async def load_extraction(self, api_doc: Document) -> Extraction | None:
+        data = await self.store.get(f"extraction:{api_doc.name}")
+        if data is None:
+            return None
+        return Extraction.model_validate_json(data)
 
-        changelog = await extract_changelog(text, prompt=self.config.prompt)
+    async def save_extraction(self, api_doc: Document, extraction: Extraction) -> None:
+        await self.store.set(f"extraction:{api_doc.name}", extraction.model_dump_json())
 
+    async def save_changelog(self, api_doc: Document, text: str, changelog: Changelog) -> None:
         # log parsed changes
         for change in changelog.changes:
             logger.info("change: {}", change)
 
-        changelog.select_recent_changes(self.config.num_days)
+        extraction = Extraction(fingerprint=fingerprint(text, self.config.prompt), text=text, changelog=changelog)
+        await self.save_extraction(api_doc, extraction)
 
-        return changelog
+    async def process_doc(self, doc: Document) -> Changelog:
+        try:
+            async with self.semaphore:
+                # token usage reported by lazy_run is attributed to this doc
+                with logfire.span(f"processing {doc.name}"), self.metrics.document(doc.name):
+                    return await self.extract_recent_changelog(doc)
+        except Exception as e:
+            return self.report_error(doc, e)
+
+    async def prepare_batch_doc(self, doc: Document) -> tuple[str, Changelog | None] | None:
+        """Load the text of the doc, with its changelog if it needs no extraction (parsed by rules or unchanged).
 
-    async def process_doc(self, doc: Document) -> None:
+        Returns None on error.
+        """
         try:
-            with logfire.span(f"processing {doc.name}"):
-                changelog = await self.extract_recent_changelog(doc)
+            async with self.semaphore:
+                with logfire.span(f"preparing {doc.name}"), self.metrics.document(doc.name):
+                    text = await self.scrape(doc)
+                    changelog = self.parse_with_rules(doc, text)
+                    if changelog is not None:
+                        return text, changelog
+
+                    text = self.select_text(doc, text)
+                    previous = await self.load_extraction(doc)
         except Exception as e:
-            logger.error("unable to extract changelog for {}, got: {}", doc.name, e)
-            post_slack_message(f"unable to extract changelog for {doc.name}, got: {e}")
-            changelog = Changelog(changes=[], upcoming_changes="")
+            self.report_error(doc, e)
+            return None
+
+        return text, self.unchanged_changelog(doc, previous, text)
 
-        async with self.lock:
-            self.results.append((doc, changelog))
+    def report_error(self, doc: Document, e: Exception | str) -> Changelog:
+        logger.error("unable to extract changelog for {}, got: {}", doc.name, e)
+        self.metrics.inc("errors", doc.name)
+        self.slack.post(f"unable to extract changelog for {doc.name}, got: {e}")
+        return Changelog(changes=[], upcoming_changes="")
 
     def write_file(self) -> None:
         with self.output_file.open("w", encoding="utf-8") as f:
@@ -73,34 +321,128 @@ class App:
                 )
             )
 
+    async def filter_seen_changes(self) -> None:
+        """Drop changes that were already posted, claiming the new ones with one pipelined SET NX per change.
+
+        Without redis the posted changes are only remembered by this process, e.g. in watch mode.
+        """
+        changes = [
+            (f"changelog:{doc.name}:{change.fingerprint()}", change)
+            for doc, changelog in self.results
+            for change in changelog.changes
+        ]
+
+        if self.redis is None:
+            results = [key not in self.seen for key, _ in changes]
+            self.seen.update(key for key, _ in changes)
+        else:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, change in changes:
+                    pipe.set(key, change.date, nx=True, ex=self.config.dedupe_ttl)
+                results = await pipe.execute()
+        claimed = iter(results)
+
+        for _, changelog in self.results:
+            new_changes = []
+            for change in changelog.changes:
+                if not next(claimed):
+                    logger.info("already seen change: {}", change)
+                    continue
+                new_changes.append(change)
+            changelog.changes = new_changes
+
     async def post_slack_message(self) -> None:
+        await self.filter_seen_changes()
+
         for doc, changelog in self.results:
-            if self.redis is not None:
-                # filter out already seen changes
-                new_changes = []
-                for change in changelog.changes:
-                    key = f"changelog:{doc.name}:{change.date}"
-
-                    if await self.redis.exists(key):
-                        logger.info("already seen change: {}", change)
-                        continue
-
-                    new_changes.append(change)
-                    await self.redis.set(key, len(change.items))
-                changelog.changes = new_changes
             # post to slack
             if changelog.changes:
-                post_slack_message(changelog.to_slack(doc.name, doc.url))
+                self.slack.post(changelog.to_slack(doc.name, doc.url))
+
+    def report_metrics(self) -> None:
+        logger.info("run summary:\n{}", self.metrics.summary())
+        cascade = self.metrics.cascade_summary()
+        if cascade is not None:
+            logger.info(cascade)
+        if self.config.metrics_file:
+            self.metrics.write_prometheus(self.config.metrics_file)
 
     async def _run(self) -> None:
-        # tasks = [self.process_doc(doc) for doc in self.config.docs]
-        # await asyncio.gather(*tasks)
+        self.metrics = Metrics()
+
+        # leaving the slack queue flushes the pending messages
+        async with self.slack:
+            async with self.fetcher, self.scraper, self.converter:
+                # gather keeps the results in config order regardless of completion order
+                changelogs = await asyncio.gather(*[self.process_doc(doc) for doc in self.config.docs])
+
+            self.results = list(zip(self.config.docs, changelogs, strict=True))
+
+            self.write_file()
+            with self.metrics.timer("slack"):
+                await self.post_slack_message()
+                await self.slack.flush()
+
+        self.report_metrics()
+
+    async def _run_batch(self, client: BatchClient | None = None) -> None:
+        """Run with one batch job for all changed docs instead of one model call per doc.
 
-        for doc in self.config.docs:
-            await self.process_doc(doc)
+        Every changed doc is extracted from its full selected text, `incremental` does not apply.
+        """
+        self.metrics = Metrics()
 
-        self.write_file()
-        await self.post_slack_message()
+        async with self.slack:
+            async with self.fetcher, self.scraper, self.converter:
+                prepared = await asyncio.gather(*[self.prepare_batch_doc(doc) for doc in self.config.docs])
+
+            texts = {doc.name: p[0] for doc, p in zip(self.config.docs, prepared, strict=True) if p and p[1] is None}
+            extracted = {}
+            errors: dict[str, Exception] = {}
+            if texts:
+                extractor = BatchExtractor(
+                    client=client,
+                    directory=Path(self.config.cache_dir) / "batches",
+                    prompt=self.config.prompt,
+                    max_tokens=self.config.batch_max_tokens,
+                    poll_interval=self.config.batch_poll_interval,
+                )
+                for doc in self.config.docs:
+                    if doc.name in texts:
+                        self.metrics.inc("chars_sent", doc.name, len(texts[doc.name]))
+                with self.metrics.timer("batch"):
+                    try:
+                        extracted = await extractor.extract(texts)
+                    except Exception as e:
+                        # every doc in the batch failed, the others are still written and posted
+                        errors = dict.fromkeys(texts, e)
+
+            changelogs = []
+            for doc, p in zip(self.config.docs, prepared, strict=True):
+                if p is None:
+                    changelog = Changelog(changes=[], upcoming_changes="")
+                elif p[1] is not None:
+                    changelog = p[1]
+                elif doc.name in extracted:
+                    changelog = extracted[doc.name]
+                    await self.save_changelog(doc, p[0], changelog)
+                else:
+                    changelog = self.report_error(doc, errors.get(doc.name, "no result in the batch output"))
+
+                await self.select_recent_changes(doc, changelog)
+                changelogs.append(changelog)
+
+            self.results = list(zip(self.config.docs, changelogs, strict=True))
+
+            self.write_file()
+            with self.metrics.timer("slack"):
+                await self.post_slack_message()
+                await self.slack.flush()
+
+        self.report_metrics()
 
     def run(self) -> None:
         asyncio.run(self._run())
+
+    def run_batch(self, client: BatchClient | None = None) -> None:
+        asyncio.run(self._run_batch(client))
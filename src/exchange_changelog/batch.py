@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Final
+from typing import Protocol
+
+from agents import AgentOutputSchema
+from loguru import logger
+from openai import AsyncOpenAI
+from pydantic import ValidationError
+
+from .changelog import PROMPT
+from .changelog import Changelog
+from .lazy import get_openai_client
+from .tokens import count_tokens
+
+BATCH_ENDPOINT: Final[str] = "/v1/chat/completions"
+TERMINAL_STATUSES: Final[frozenset[str]] = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass
+class BatchJob:
+    id: str
+    status: str
+    output_file_id: str | None = None
+    error_file_id: str | None = None
+
+
+class BatchClient(Protocol):
+    async def submit(self, path: Path) -> str: ...
+
+    async def retrieve(self, batch_id: str) -> BatchJob: ...
+
+    async def download(self, file_id: str) -> str: ...
+
+
+class OpenAIBatchClient:
+    """Upload a JSONL file and run it with the OpenAI Batch API."""
+
+    def __init__(self, client: AsyncOpenAI | None = None, endpoint: str = BATCH_ENDPOINT) -> None:
+        self.client = client or get_openai_client()
+        self.endpoint = endpoint
+
+    async def submit(self, path: Path) -> str:
+        file = await self.client.files.create(file=path, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=file.id,
+            endpoint=self.endpoint,  # type: ignore[arg-type]
+            completion_window="24h",
+        )
+        return batch.id
+
+    async def retrieve(self, batch_id: str) -> BatchJob:
+        batch = await self.client.batches.retrieve(batch_id)
+        return BatchJob(
+            id=batch.id,
+            status=batch.status,
+            output_file_id=batch.output_file_id,
+            error_file_id=batch.error_file_id,
+        )
+
+    async def download(self, file_id: str) -> str:
+        content = await self.client.files.content(file_id)
+        return content.text
+
+
+def build_request(custom_id: str, text: str, model: str, prompt: str | None = None) -> dict[str, Any]:
+    """One line of the batch file, asking for the same structured output as `extract_changelog`."""
+    if prompt is None:
+        prompt = PROMPT
+
+    schema = AgentOutputSchema(Changelog)
+    messages = [{"role": "user", "content": text}]
+    if prompt:
+        messages.insert(0, {"role": "system", "content": prompt})
+
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "messages": messages,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": schema.name(), "schema": schema.json_schema(), "strict": True},
+            },
+        },
+    }
+
+
+def estimate_tokens(request: dict[str, Any]) -> int:
+    return sum(count_tokens(message["content"]) for message in request["body"]["messages"])
+
+
+def split_requests(requests: list[dict[str, Any]], max_tokens: int) -> list[list[dict[str, Any]]]:
+    """Group requests into batches of at most `max_tokens` estimated input tokens each."""
+    batches: list[list[dict[str, Any]]] = []
+    current: list[dict[str, Any]] = []
+    used = 0
+    for request in requests:
+        tokens = estimate_tokens(request)
+        if current and used + tokens > max_tokens:
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(request)
+        used += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_results(text: str) -> dict[str, Changelog]:
+    """Parse the output file of a batch into changelogs by custom id, logging the requests that failed."""
+    changelogs: dict[str, Changelog] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+
+        result = json.loads(line)
+        custom_id = result["custom_id"]
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            logger.error("batch request {} failed: {}", custom_id, result.get("error") or response.get("body"))
+            continue
+
+        message = response["body"]["choices"][0]["message"]
+        try:
+            changelogs[custom_id] = Changelog.model_validate_json(message.get("content") or "")
+        except ValidationError as e:
+            logger.error("unable to parse the batch response for {}, got: {}", custom_id, e)
+    return changelogs
+
+
+class BatchExtractor:
+    """Extract changelogs for many documents with one or more batch jobs instead of one call each.
+
+    The requests are split into batches of at most `max_tokens` estimated input tokens, which
+    are submitted one after the other so the tokens enqueued at a time stay under the limit.
+    """
+
+    def __init__(
+        self,
+        client: BatchClient | None = None,
+        directory: str | Path = ".cache/batches",
+        model: str | None = None,
+        prompt: str | None = None,
+        max_tokens: int = 1_000_000,
+        poll_interval: float = 30.0,
+    ) -> None:
+        self.client = client or OpenAIBatchClient()
+        self.directory = Path(directory)
+        self.model = model or os.getenv("OPENAI_MODEL") or "gpt-4o"
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.poll_interval = poll_interval
+
+    async def extract(self, texts: dict[str, str]) -> dict[str, Changelog]:
+        """Extract a changelog from each text, keyed like `texts`; failed requests are left out."""
+        requests = [build_request(key, text, self.model, self.prompt) for key, text in texts.items()]
+
+        changelogs: dict[str, Changelog] = {}
+        for i, batch in enumerate(split_requests(requests, self.max_tokens)):
+            path = self.write_batch_file(batch, f"{int(time.time())}-{i}")
+            changelogs.update(await self.run_batch(path))
+        return changelogs
+
+    def write_batch_file(self, requests: list[dict[str, Any]], name: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.jsonl"
+        with path.open("w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        return path
+
+    async def run_batch(self, path: Path) -> dict[str, Changelog]:
+        batch_id = await self.client.submit(path)
+        logger.info("submitted batch {} from {}", batch_id, path)
+
+        job = await self.client.retrieve(batch_id)
+        while job.status not in TERMINAL_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            job = await self.client.retrieve(batch_id)
+        logger.info("batch {} is {}", batch_id, job.status)
+
+        if job.error_file_id is not None:
+            parse_results(await self.client.download(job.error_file_id))
+
+        # expired batches still return the requests that completed in time
+        if job.output_file_id is None:
+            return {}
+        return parse_results(await self.client.download(job.output_file_id))
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import signal
+import tempfile
+from collections.abc import Sequence
+
+import httpx
+from loguru import logger
+
+# flags for a headless chromium serving the devtools protocol, see `chrome --help` and
+# https://peter.sh/experiments/chromium-command-line-switches/
+CHROMIUM_FLAGS: tuple[str, ...] = (
+    "--headless=new",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-extensions",
+    "--mute-audio",
+)
+
+
+async def chromium_executable() -> str:
+    """The chromium installed by `playwright install`."""
+    # the sync api refuses to run inside an event loop, and the server always runs in one
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        return p.chromium.executable_path
+
+
+class BrowserServer:
+    """Keep one headless chromium running for the scrapers to connect to over CDP, at `endpoint`.
+
+    The browser is health checked every `health_interval` seconds through its `/json/version`
+    endpoint, and restarted with a fresh profile when it exits or fails `max_failures` checks in
+    a row. SIGINT or SIGTERM stops it.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9222,
+        executable: str | None = None,
+        args: Sequence[str] = (),
+        health_interval: float = 10.0,
+        max_failures: int = 3,
+        startup_timeout: float = 30.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.executable = executable
+        self.args = list(args)
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self.stopped = asyncio.Event()
+        self._process: asyncio.subprocess.Process | None = None
+        self._profile: tempfile.TemporaryDirectory[str] | None = None
+
+    @property
+    def endpoint(self) -> str:
+        """The URL to set BROWSER_CDP_URL to."""
+        return f"http://{self.host}:{self.port}"
+
+    def command(self) -> list[str]:
+        assert self.executable is not None and self._profile is not None
+        return [
+            self.executable,
+            *CHROMIUM_FLAGS,
+            f"--remote-debugging-address={self.host}",
+            f"--remote-debugging-port={self.port}",
+            f"--user-data-dir={self._profile.name}",
+            *self.args,
+            "about:blank",
+        ]
+
+    async def healthy(self) -> bool:
+        try:
+            async with httpx.AsyncClient(timeout=5) as client:
+                response = await client.get(f"{self.endpoint}/json/version")
+            return response.status_code == 200 and "webSocketDebuggerUrl" in response.json()
+        except (httpx.HTTPError, ValueError):
+            return False
+
+    async def start(self) -> None:
+        """Launch the browser and wait until it answers the health check."""
+        if self.executable is None:
+            # resolved once, restarts reuse it
+            self.executable = await chromium_executable()
+        self._profile = tempfile.TemporaryDirectory(prefix="exchange-changelog-browser-")
+        command = self.command()
+        logger.info("Launching {}", command[0])
+        self._process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.startup_timeout
+        while not await self.healthy():
+            if self._process.returncode is not None:
+                raise RuntimeError(f"browser exited with code {self._process.returncode} on startup")
+            if loop.time() > deadline:
+                await self.close()
+                raise RuntimeError(f"browser not ready after {self.startup_timeout} seconds")
+            await asyncio.sleep(0.1)
+        logger.info("Browser ready, connect with BROWSER_CDP_URL={}", self.endpoint)
+
+    async def close(self) -> None:
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except TimeoutError:
+                process.kill()
+                await process.wait()
+
+        if self._profile is not None:
+            self._profile.cleanup()
+            self._profile = None
+
+    async def restart(self) -> None:
+        self.restarts += 1
+        await self.close()
+        try:
+            await self.start()
+        except RuntimeError as e:
+            # tried again at the next check
+            logger.error("Unable to restart the browser, got error: {}", e)
+
+    def stop(self) -> None:
+        logger.info("stopping the browser")
+        self.stopped.set()
+
+    async def supervise(self) -> None:
+        """Check on the browser until stopped, restarting it when it is gone or unhealthy."""
+        failures = 0
+        while not self.stopped.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.stopped.wait(), timeout=self.health_interval)
+            if self.stopped.is_set():
+                break
+
+            if self._process is None or self._process.returncode is not None:
+                logger.warning("Browser exited, restarting it")
+                failures = 0
+                await self.restart()
+            elif not await self.healthy():
+                failures += 1
+                logger.warning("Browser health check failed ({}/{})", failures, self.max_failures)
+                if failures >= self.max_failures:
+                    failures = 0
+                    await self.restart()
+            else:
+                failures = 0
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        try:
+            await self.start()
+            await self.supervise()
+        finally:
+            await self.close()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    def run(self) -> None:
+        asyncio.run(self._run())
@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+import asyncio
+import time
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
@@ -7,7 +11,13 @@ from typing import Final
 from loguru import logger
 from pydantic import BaseModel
 
+from .lazy import get_small_model
 from .lazy import lazy_run
+from .metrics import record
+from .sections import parse_headings
+from .sections import split_sections
+from .store import fingerprint
+from .tokens import count_tokens
 
 PROMPT: Final[str] = """
 You will be provided with content from an API documentation page in Markdown format. Your task is to extract and summarize up to 10 changes or release notes, prioritizing them by date as found in sections such as changelog or release notes. Additionally, extract and summarize upcoming changes only if the main heading "Upcoming Changes" is present; otherwise, leave the corresponding field blank.
@@ -37,6 +47,20 @@ Think step by step to ensure that each instruction is carefully followed and tha
 """.strip()  # noqa
 
 
+def _normalize(item: str) -> str:
+    return " ".join(item.lower().split())
+
+
+def _unique(values: list[str]) -> list[str]:
+    seen = set()
+    unique = []
+    for value in values:
+        if _normalize(value) not in seen:
+            seen.add(_normalize(value))
+            unique.append(value)
+    return unique
+
+
 class Step(BaseModel):
     explanation: str
     output: str
@@ -73,6 +97,11 @@ class Change(BaseModel):
     keywords: list[str]
     categories: list[Category]
 
+    def fingerprint(self) -> str:
+        """Identify the change by its date and normalized items, so edits to a seen date are detected."""
+        items = sorted(_normalize(item) for item in self.items)
+        return fingerprint(self.date, *items)[:32]
+
     def to_markdown(self) -> str:
         lines = [
             f"📅*{self.date}*",
@@ -140,12 +169,153 @@ class Changelog(BaseModel):
 
         self.changes = recent_changes
 
+    def merge(self, other: Changelog, max_changes: int = 10) -> Changelog:
+        """Merge changes extracted from updated sections into this changelog.
+
+        Changes from `other` replace changes with the same date, the result keeps the
+        `max_changes` most recent dates, and the upcoming changes are taken from `other`.
+        """
+        changes = {change.date: change for change in self.changes}
+        changes.update({change.date: change for change in other.changes})
+        return Changelog(
+            changes=sorted(changes.values(), key=lambda change: change.date, reverse=True)[:max_changes],
+            upcoming_changes=other.upcoming_changes,
+        )
+
+
+class SlimChange(BaseModel):
+    """A change without the reasoning steps, the output of the small model."""
+
+    date: str
+    items: list[str]
+    keywords: list[str]
+    categories: list[Category]
+
+
+class SlimChangelog(BaseModel):
+    changes: list[SlimChange]
+    upcoming_changes: str
+
+    def to_changelog(self) -> Changelog:
+        reasoning = Reasoning(steps=[], final_output="")
+        return Changelog(
+            changes=[Change(reasoning=reasoning, **change.model_dump()) for change in self.changes],
+            upcoming_changes=self.upcoming_changes,
+        )
+
+
+def check_changelog(changelog: Changelog, text: str, today: date | None = None) -> list[str]:
+    """Find the signs of a bad extraction: unparsable, future or duplicate dates, empty items, and dates
+    that disagree with the dated headings of the text.
+
+    When the text has dated headings, every change must be dated like one of them and the latest
+    heading up to today must be among the changes.
+    """
+    # a day of slack for pages published in a timezone ahead of ours
+    latest_allowed = (today or date.today()) + timedelta(days=1)
+    problems = []
+
+    dates = set()
+    for change in changelog.changes:
+        try:
+            change_date = datetime.strptime(change.date, "%Y-%m-%d").date()
+        except ValueError:
+            problems.append(f"unparsable date {change.date!r}")
+            continue
+
+        if change_date > latest_allowed:
+            problems.append(f"future date {change.date}")
+        if change_date in dates:
+            problems.append(f"duplicate date {change.date}")
+        dates.add(change_date)
+
+        if not any(item.strip() for item in change.items):
+            problems.append(f"no items on {change.date}")
+
+    headings = {heading.date for heading in parse_headings(text.splitlines()) if heading.date is not None}
+    if headings:
+        problems += [f"{d} is not a heading of the text" for d in sorted(dates - headings)]
+        latest = max((d for d in headings if d <= latest_allowed), default=None)
+        if latest is not None and latest not in dates:
+            problems.append(f"the latest heading {latest} is missing")
+    return problems
+
+
+def reduce_changelogs(changelogs: list[Changelog], max_changes: int = 10) -> Changelog:
+    """Combine the changelogs extracted from chunks of one page.
+
+    Changes on the same date are merged with duplicate items, keywords and categories
+    dropped, and the `max_changes` most recent dates are kept.
+    """
+    changes: dict[str, Change] = {}
+    for changelog in changelogs:
+        for change in changelog.changes:
+            if change.date not in changes:
+                changes[change.date] = change.model_copy(deep=True)
+                continue
+
+            merged = changes[change.date]
+            merged.items = _unique(merged.items + change.items)
+            merged.keywords = _unique(merged.keywords + change.keywords)
+            merged.categories = list(dict.fromkeys(merged.categories + change.categories))
+
+    upcoming = [changelog.upcoming_changes.strip() for changelog in changelogs if changelog.upcoming_changes.strip()]
+    return Changelog(
+        changes=sorted(changes.values(), key=lambda change: change.date, reverse=True)[:max_changes],
+        upcoming_changes="\n\n".join(_unique(upcoming)),
+    )
+
+
+async def extract_changelog(text: str, prompt: str | None = None, chunk_tokens: int | None = None) -> Changelog:
+    """Extract the changelog from the text.
 
-async def extract_changelog(text: str, prompt: str | None = None) -> Changelog:
+    Text longer than `chunk_tokens` is split at headings, the chunks are extracted
+    concurrently and the results reduced into one changelog.
+    """
     # https://platform.openai.com/docs/guides/structured-outputs
     if prompt is None:
         prompt = PROMPT
 
+    if chunk_tokens is None or count_tokens(text) <= chunk_tokens:
+        return await _extract(text, prompt)
+
+    chunks = split_sections(text, chunk_tokens)
+    logger.info("extracting from {} chunks of at most {} tokens", len(chunks), chunk_tokens)
+    changelogs = await asyncio.gather(*[_extract(chunk, prompt) for chunk in chunks])
+    return reduce_changelogs(list(changelogs))
+
+
+async def _extract(text: str, prompt: str) -> Changelog:
+    """Extract with the small model without reasoning steps, if one is set, and with the model otherwise
+    or when the result does not pass `check_changelog`.
+    """
+    small_model = get_small_model()
+    if small_model is None:
+        return await _extract_with_reasoning(text, prompt)
+
+    start = time.perf_counter()
+    try:
+        slim = await lazy_run(input=text, instructions=prompt, model=small_model, output_type=SlimChangelog)
+        changelog = slim.to_changelog()
+        problems = check_changelog(changelog, text)
+    except Exception as e:
+        problems = [f"extraction failed: {e}"]
+    record("cascade_small_seconds", time.perf_counter() - start)
+
+    if not problems:
+        record("cascade_accepted")
+        return changelog
+
+    logger.info("escalating to the large model: {}", "; ".join(problems))
+    record("cascade_escalations")
+    start = time.perf_counter()
+    try:
+        return await _extract_with_reasoning(text, prompt)
+    finally:
+        record("cascade_large_seconds", time.perf_counter() - start)
+
+
+async def _extract_with_reasoning(text: str, prompt: str) -> Changelog:
     return await lazy_run(
         input=text,
         instructions=prompt,
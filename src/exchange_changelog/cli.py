@@ -1,25 +1,242 @@
+import os
+from datetime import datetime
 from typing import Annotated
 
 import typer
 from dotenv import find_dotenv
 from dotenv import load_dotenv
 
-from .app import App
 from .config import load_config
+from .snapshots import Snapshot
+from .snapshots import SnapshotStore
 from .utils import configure_langfuse
 
+# the app and its dependencies (agents, openai, playwright, ...) are imported by the commands
+# that need them, so --help and validate-config start quickly
+cli = typer.Typer()
 
+ConfigFile = Annotated[str, typer.Option("-c", "--config-file", help="config file")]
+OutputFile = Annotated[str, typer.Option("-o", "--output-file", help="output file")]
+
+
+@cli.command()
 def run(
-    config_file: Annotated[str, typer.Option("-c", "--config-file", help="config file")] = "config/default.yaml",
-    output_file: Annotated[str, typer.Option("-o", "--output-file", help="output file")] = "changelog.md",
+    config_file: ConfigFile = "config/default.yaml",
+    output_file: OutputFile = "changelog.md",
+    batch: Annotated[bool, typer.Option(help="extract with the OpenAI Batch API, slower but cheaper")] = False,
 ) -> None:
+    """Check every document once."""
+    from .app import App
+
     load_dotenv(find_dotenv())
     configure_langfuse()
 
     config = load_config(config_file)
     app = App(config=config, output_file=output_file)
-    app.run()
+    if batch:
+        app.run_batch()
+    else:
+        app.run()
+
+
+@cli.command()
+def watch(
+    config_file: ConfigFile = "config/default.yaml",
+    output_file: OutputFile = "changelog.md",
+) -> None:
+    """Keep running and check each document on its own adaptive schedule, until SIGINT or SIGTERM."""
+    from .app import App
+    from .watch import Watcher
+
+    load_dotenv(find_dotenv())
+    configure_langfuse()
+
+    config = load_config(config_file)
+    Watcher(App(config=config, output_file=output_file)).run()
+
+
+Queue = Annotated[str, typer.Option(help="name of the redis work queue, shared by the coordinator and its workers")]
+
+
+@cli.command()
+def coordinator(
+    config_file: ConfigFile = "config/default.yaml",
+    output_file: OutputFile = "changelog.md",
+    queue: Queue = "exchange-changelog",
+    timeout: Annotated[float | None, typer.Option(help="seconds to wait for the workers")] = None,
+) -> None:
+    """Enqueue every document for the workers on REDIS_URL and write the results."""
+    from .app import App
+    from .distributed import Coordinator
+
+    load_dotenv(find_dotenv())
+    configure_langfuse()
+
+    config = load_config(config_file)
+    Coordinator(App(config=config, output_file=output_file), queue=queue, timeout=timeout).run()
+
+
+@cli.command()
+def worker(
+    config_file: ConfigFile = "config/default.yaml",
+    queue: Queue = "exchange-changelog",
+    idle_timeout: Annotated[float | None, typer.Option(help="exit after this many seconds without a job")] = None,
+) -> None:
+    """Process documents from the queue on REDIS_URL, until SIGINT or SIGTERM."""
+    from .app import App
+    from .distributed import Worker
+
+    load_dotenv(find_dotenv())
+    configure_langfuse()
+
+    # the documents come with the jobs, the config only provides the settings
+    config = load_config(config_file)
+    Worker(App(config=config, output_file=os.devnull), queue=queue, idle_timeout=idle_timeout).run()
+
+
+@cli.command("browser-server")
+def browser_server(
+    host: Annotated[str, typer.Option(help="address to serve the devtools protocol on")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="port to serve the devtools protocol on")] = 9222,
+    executable: Annotated[str | None, typer.Option(help="chromium executable, playwright's by default")] = None,
+) -> None:
+    """Run a shared headless browser for BROWSER_CDP_URL, restarting it when unhealthy, until SIGINT or SIGTERM."""
+    from .browser_server import BrowserServer
+
+    BrowserServer(host=host, port=port, executable=executable).run()
+
+
+snapshots_cli = typer.Typer(help="Inspect the page snapshots kept in the config's snapshot_dir.")
+cli.add_typer(snapshots_cli, name="snapshots")
+
+
+def _snapshot_store(config_file: str) -> SnapshotStore:
+    config = load_config(config_file)
+    if not config.snapshot_dir:
+        typer.echo(f"snapshot_dir is not set in {config_file}", err=True)
+        raise typer.Exit(1)
+    return SnapshotStore(config.snapshot_dir)
+
+
+def _get_snapshot(store: SnapshotStore, snapshot_id: int) -> Snapshot:
+    snapshot = store.get(snapshot_id)
+    if snapshot is None:
+        typer.echo(f"no snapshot {snapshot_id}", err=True)
+        raise typer.Exit(1)
+    return snapshot
+
+
+Html = Annotated[bool, typer.Option("--html", help="the raw html instead of the markdown")]
+
+
+@snapshots_cli.command("list")
+def list_snapshots(
+    config_file: ConfigFile = "config/default.yaml",
+    doc: Annotated[str | None, typer.Option(help="only the snapshots of this doc")] = None,
+    limit: Annotated[int, typer.Option(help="number of snapshots to show")] = 20,
+) -> None:
+    """List snapshots, newest first."""
+    for snapshot in _snapshot_store(config_file).list(doc=doc, limit=limit):
+        taken_at = datetime.fromtimestamp(snapshot.taken_at).isoformat(timespec="seconds")
+        typer.echo(f"{snapshot.id}\t{taken_at}\t{snapshot.doc}\t{snapshot.markdown[:12]}")
+
+
+@snapshots_cli.command("show")
+def show_snapshot(snapshot_id: int, config_file: ConfigFile = "config/default.yaml", html: Html = False) -> None:
+    """Print a snapshot."""
+    store = _snapshot_store(config_file)
+    snapshot = _get_snapshot(store, snapshot_id)
+    typer.echo(store.read(snapshot.blob("html" if html else "markdown")))
+
+
+@snapshots_cli.command("diff")
+def diff_snapshots(
+    old_id: int,
+    new_id: Annotated[int | None, typer.Argument(help="defaults to the latest snapshot of the same doc")] = None,
+    config_file: ConfigFile = "config/default.yaml",
+    html: Html = False,
+) -> None:
+    """Show what changed between two snapshots."""
+    store = _snapshot_store(config_file)
+    old = _get_snapshot(store, old_id)
+    new = _get_snapshot(store, new_id) if new_id is not None else store.list(doc=old.doc, limit=1)[0]
+    typer.echo(store.diff(old, new, kind="html" if html else "markdown"), nl=False)
+
+
+@snapshots_cli.command("prune")
+def prune_snapshots(
+    config_file: ConfigFile = "config/default.yaml",
+    days: Annotated[float | None, typer.Option(help="overrides snapshot_retention_days")] = None,
+) -> None:
+    """Delete old and redundant snapshots and the blobs left unused."""
+    config = load_config(config_file)
+    store = _snapshot_store(config_file)
+    snapshots, blobs = store.prune(keep_days=config.snapshot_retention_days if days is None else days)
+    typer.echo(f"deleted {snapshots} snapshots and {blobs} blobs")
+
+
+@cli.command()
+def query(
+    config_file: ConfigFile = "config/default.yaml",
+    doc: Annotated[str | None, typer.Option(help="only the changes of this doc")] = None,
+    since: Annotated[datetime | None, typer.Option(formats=["%Y-%m-%d"], help="changes on or after this date")] = None,
+    until: Annotated[datetime | None, typer.Option(formats=["%Y-%m-%d"], help="changes on or before this date")] = None,
+    category: Annotated[str | None, typer.Option(help="e.g. BREAKING_CHANGES")] = None,
+    text: Annotated[str | None, typer.Option(help="words the items or keywords contain")] = None,
+    limit: Annotated[int, typer.Option(help="number of changes to show")] = 50,
+    markdown: Annotated[bool, typer.Option("--markdown", help="print the changes like the changelog file")] = False,
+) -> None:
+    """Search the changes indexed in the config's history_db, newest first."""
+    from .history import HistoryIndex
+
+    config = load_config(config_file)
+    if not config.history_db:
+        typer.echo(f"history_db is not set in {config_file}", err=True)
+        raise typer.Exit(1)
+
+    results = HistoryIndex(config.history_db).search(
+        doc=doc,
+        since=since.date() if since else None,
+        until=until.date() if until else None,
+        category=category.upper() if category else None,
+        text=text,
+        limit=limit,
+    )
+    if not markdown:
+        for result in results:
+            typer.echo(f"{result.date}\t{result.doc}\t{','.join(result.categories)}\t{' | '.join(result.items)}")
+        return
+
+    from .changelog import Changelog
+
+    urls = {d.name: d.url for d in config.docs}
+    docs = list(dict.fromkeys(result.doc for result in results))
+    changelogs = [
+        Changelog(changes=[r.to_change() for r in results if r.doc == name], upcoming_changes="").to_markdown(
+            name, urls.get(name)
+        )
+        for name in docs
+    ]
+    typer.echo("\n\n".join(changelogs))
+
+
+@cli.command("validate-config")
+def validate_config(config_file: ConfigFile = "config/default.yaml") -> None:
+    """Check the config file without loading the app."""
+    try:
+        config = load_config(config_file)
+    except Exception as e:
+        typer.echo(f"{config_file} is invalid: {e}", err=True)
+        raise typer.Exit(1) from e
+
+    problems = config.check()
+    for problem in problems:
+        typer.echo(f"{config_file}: {problem}", err=True)
+    if problems:
+        raise typer.Exit(1)
+
+    typer.echo(f"{config_file} is valid, {len(config.docs)} docs")
 
 
 def main() -> None:
-    typer.run(run)
+    cli()
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import re
 from pathlib import Path
+from typing import Literal
+from urllib.parse import urlparse
 
 from loguru import logger
 from pydantic import BaseModel
 
+from .sources import PAGE_SOURCE
+from .sources import SOURCES
 from .utils import load_yaml
 
 
@@ -18,11 +23,92 @@ def load_config(f: str | Path) -> Config:
 class Document(BaseModel):
     name: str
     url: str
+    # always render the page with the browser instead of trying plain http first
+    render: bool = False
+    # name of the source to read the text from instead of the page (google-docs, docusaurus, github),
+    # picked by url when unset; "page" always loads the page itself
+    source: str | None = None
+    # css selector of the main content region, overrides the defaults for docusaurus, readme.io and slate;
+    # a rendered page is also taken as soon as it is attached, instead of once the DOM is quiet
+    content_selector: str | None = None
+    # resource types (e.g. "font") or domains the browser loads even though they are blocked by default
+    allow_requests: list[str] = []
+    # css selectors of extra elements to remove before converting to markdown
+    drop_selectors: list[str] = []
+    # regex matching the heading of the changelog section, if the default patterns miss it
+    section: str | None = None
+    # overrides Config.token_budget
+    token_budget: int | None = None
+    # send only the most recent dated sections instead of the first trim_len characters
+    select_sections: bool = True
+    # "rules" builds the changelog from dated headings and bullets without the llm, if confident enough
+    parser: Literal["llm", "rules"] = "llm"
+    # seconds between checks right after a change in watch mode, overrides Config.watch_min_interval
+    poll_interval: float | None = None
 
 
 class Config(BaseModel):
     docs: list[Document] = []
     num_days: int = 14
     trim_len: int = 20000
+    token_budget: int = 3000
+    # longer llm input is split at headings into chunks of at most this many tokens, extracted concurrently
+    chunk_tokens: int | None = 4000
+    # below this confidence, documents with parser "rules" fall back to the llm
+    rules_min_confidence: float = 0.8
     slack_channel: str | None = None
     prompt: str = ""
+    max_concurrency: int = 4
+    max_concurrency_per_host: int = 2
+    cache_dir: str = ".cache"
+    # processes converting pages of convert_min_size characters or more to markdown, started once per run;
+    # None starts one per cpu, 0 converts every page on the event loop. a 100 KB page stalls the loop for
+    # 90-200 ms, the multi-megabyte slate pages (okx, binance apidocs, hitbtc) for seconds
+    convert_workers: int | None = 2
+    convert_min_size: int = 100_000
+    # send only the sections added or modified since the last run to the llm
+    incremental: bool = False
+    # how long posted changes are remembered, in seconds
+    dedupe_ttl: int = 180 * 24 * 60 * 60
+    # prometheus textfile to write the per-stage timings and counters of each run to
+    metrics_file: str | None = None
+    # estimated input tokens per batch job in batch mode, keep under the enqueued token limit of the model
+    batch_max_tokens: int = 1_000_000
+    # seconds between batch job status checks
+    batch_poll_interval: float = 30.0
+    # watch mode: seconds between checks of a doc, reset to the minimum after a change and
+    # multiplied by the backoff while it is stable, randomized by the jitter fraction
+    watch_min_interval: float = 15 * 60
+    watch_max_interval: float = 24 * 60 * 60
+    watch_backoff: float = 2.0
+    watch_jitter: float = 0.2
+    # directory to keep a compressed snapshot of the html and markdown of every scraped page in
+    snapshot_dir: str | None = None
+    # days of snapshots `snapshots prune` keeps, the latest snapshot of each doc is always kept
+    snapshot_retention_days: float = 30
+    # sqlite database every extracted change is indexed in, searchable with `exchange-changelog query`
+    history_db: str | None = None
+    # distributed mode: seconds a worker holds a job without a heartbeat before the coordinator requeues it
+    queue_lease_ttl: int = 60
+
+    def check(self) -> list[str]:
+        """Find the problems validation does not catch, e.g. duplicate names, which share cache keys."""
+        problems = []
+        names = set()
+        for doc in self.docs:
+            if doc.name in names:
+                problems.append(f"duplicate doc name {doc.name!r}")
+            names.add(doc.name)
+
+            if urlparse(doc.url).scheme not in ("http", "https"):
+                problems.append(f"{doc.name}: url {doc.url!r} is not http(s)")
+
+            if doc.section is not None:
+                try:
+                    re.compile(doc.section)
+                except re.error as e:
+                    problems.append(f"{doc.name}: invalid section pattern {doc.section!r}: {e}")
+
+            if doc.source is not None and doc.source != PAGE_SOURCE and doc.source not in SOURCES:
+                problems.append(f"{doc.name}: unknown source {doc.source!r}, expected one of {sorted(SOURCES)}")
+        return problems
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import signal
+import time
+import uuid
+from typing import TYPE_CHECKING
+from typing import Any
+
+import logfire
+from loguru import logger
+
+from .app import App
+from .changelog import Changelog
+from .config import Document
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class WorkQueue:
+    """The Redis keys shared by the coordinator and the workers.
+
+    Job ids wait in the `pending` list. A worker moves one to the `processing` list and
+    holds a lease key on it, refreshed by heartbeats while the doc is processed. Results
+    go to a hash per run. A job in `processing` whose lease is gone belonged to a worker
+    that crashed, and is moved back to `pending`.
+    """
+
+    def __init__(self, redis: Redis, name: str = "exchange-changelog", lease_ttl: int = 60) -> None:
+        self.redis = redis
+        self.name = name
+        self.lease_ttl = lease_ttl
+
+        self.pending = f"{name}:pending"
+        self.processing = f"{name}:processing"
+
+    def job_key(self, job_id: str) -> str:
+        return f"{self.name}:job:{job_id}"
+
+    def lease_key(self, job_id: str) -> str:
+        return f"{self.name}:lease:{job_id}"
+
+    def results_key(self, run_id: str) -> str:
+        return f"{self.name}:results:{run_id}"
+
+    async def enqueue(self, run_id: str, docs: list[Document], ttl: int) -> list[str]:
+        job_ids = [f"{run_id}:{i}" for i in range(len(docs))]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job_id, doc in zip(job_ids, docs, strict=True):
+                payload = json.dumps({"run_id": run_id, "doc": doc.model_dump()})
+                pipe.set(self.job_key(job_id), payload, ex=ttl)
+            pipe.rpush(self.pending, *job_ids)
+            await pipe.execute()
+        return job_ids
+
+    async def claim(self, worker_id: str, timeout: int = 1) -> tuple[str, str, Document] | None:
+        """Take the next job and lease it, returns the job id, run id and doc, or None if there is none."""
+        value = await self.redis.blmove(self.pending, self.processing, timeout, src="LEFT", dest="RIGHT")
+        if value is None:
+            return None
+
+        job_id = _decode(value)
+        await self.redis.set(self.lease_key(job_id), worker_id, ex=self.lease_ttl)
+        payload = await self.redis.get(self.job_key(job_id))
+        if payload is None:
+            # the run was given up on, drop the job
+            await self.release(job_id)
+            return None
+
+        data = json.loads(_decode(payload))
+        return job_id, data["run_id"], Document.model_validate(data["doc"])
+
+    async def heartbeat(self, job_id: str) -> None:
+        await self.redis.expire(self.lease_key(job_id), self.lease_ttl)
+
+    async def complete(self, job_id: str, run_id: str, result: dict[str, Any]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self.results_key(run_id), job_id, json.dumps(result))
+            pipe.lrem(self.processing, 0, job_id)
+            pipe.delete(self.lease_key(job_id))
+            await pipe.execute()
+
+    async def release(self, job_id: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lrem(self.processing, 0, job_id)
+            pipe.delete(self.lease_key(job_id))
+            await pipe.execute()
+
+    async def requeue_expired(self, unleased_since: dict[str, float]) -> list[str]:
+        """Move jobs back to pending once their lease has been gone for a full lease period.
+
+        The grace period covers the moment between a worker taking a job and leasing it.
+        `unleased_since` is kept by the caller between calls.
+        """
+        now = time.monotonic()
+        requeued = []
+        processing = {_decode(value) for value in await self.redis.lrange(self.processing, 0, -1)}
+        for job_id in list(unleased_since):
+            if job_id not in processing:
+                del unleased_since[job_id]
+
+        for job_id in processing:
+            if await self.redis.exists(self.lease_key(job_id)):
+                unleased_since.pop(job_id, None)
+                continue
+
+            since = unleased_since.setdefault(job_id, now)
+            if now - since < self.lease_ttl:
+                continue
+
+            # only the caller that removes the job from processing puts it back
+            if await self.redis.lrem(self.processing, 0, job_id):
+                await self.redis.rpush(self.pending, job_id)
+                requeued.append(job_id)
+            del unleased_since[job_id]
+        return requeued
+
+    async def results(self, run_id: str) -> dict[str, dict[str, Any]]:
+        data = await self.redis.hgetall(self.results_key(run_id))
+        return {_decode(key): json.loads(_decode(value)) for key, value in data.items()}
+
+    async def cleanup(self, run_id: str, job_ids: list[str]) -> None:
+        await self.redis.delete(self.results_key(run_id), *[self.job_key(job_id) for job_id in job_ids])
+
+
+def _get_redis(app: App) -> Redis:
+    if app.redis is None:
+        raise RuntimeError("REDIS_URL must be set to run a coordinator or a worker")
+    return app.redis
+
+
+class Coordinator:
+    """Enqueue every document as a job, wait for the workers, and write the output like `App.run`."""
+
+    def __init__(
+        self,
+        app: App,
+        queue: str = "exchange-changelog",
+        timeout: float | None = None,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.app = app
+        self.queue = WorkQueue(_get_redis(app), name=queue, lease_ttl=app.config.queue_lease_ttl)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    async def _run(self) -> None:
+        app = self.app
+        docs = app.config.docs
+        run_id = uuid.uuid4().hex
+        # jobs outlive a timed out run for a day at most
+        job_ids = await self.queue.enqueue(run_id, docs, ttl=24 * 60 * 60)
+        logger.info("enqueued {} docs as run {}", len(docs), run_id)
+
+        unleased_since: dict[str, float] = {}
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        async with app.slack:
+            while (results := await self.queue.results(run_id)).keys() < set(job_ids):
+                if deadline is not None and time.monotonic() > deadline:
+                    logger.error("timed out with {} of {} docs done", len(results), len(job_ids))
+                    break
+
+                for job_id in await self.queue.requeue_expired(unleased_since):
+                    logger.warning("lease of job {} expired, requeued", job_id)
+                await asyncio.sleep(self.poll_interval)
+
+            changelogs = []
+            for job_id, doc in zip(job_ids, docs, strict=True):
+                result = results.get(job_id)
+                if result is None:
+                    changelogs.append(app.report_error(doc, "no worker finished the job"))
+                elif "error" in result:
+                    changelogs.append(app.report_error(doc, result["error"]))
+                else:
+                    changelogs.append(Changelog.model_validate(result["changelog"]))
+            app.results = list(zip(docs, changelogs, strict=True))
+
+            app.write_file()
+            await app.post_slack_message()
+
+        await self.queue.cleanup(run_id, job_ids)
+
+    def run(self) -> None:
+        asyncio.run(self._run())
+
+
+class Worker:
+    """Claim jobs from the queue and process them with the app, `max_concurrency` at a time.
+
+    The documents come from the jobs, the settings from the worker's own config.
+    SIGINT or SIGTERM stops claiming and lets the jobs in flight finish.
+    """
+
+    def __init__(self, app: App, queue: str = "exchange-changelog", idle_timeout: float | None = None) -> None:
+        self.app = app
+        self.queue = WorkQueue(_get_redis(app), name=queue, lease_ttl=app.config.queue_lease_ttl)
+        self.idle_timeout = idle_timeout
+        self.worker_id = uuid.uuid4().hex
+        self.stopped = asyncio.Event()
+        self.last_job_at = time.monotonic()
+
+    def stop(self) -> None:
+        logger.info("stopping, finishing the jobs in flight")
+        self.stopped.set()
+
+    async def process(self, job_id: str, run_id: str, doc: Document) -> None:
+        app = self.app
+
+        async def heartbeat() -> None:
+            while True:
+                await asyncio.sleep(self.queue.lease_ttl / 3)
+                await self.queue.heartbeat(job_id)
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            with logfire.span(f"processing {doc.name}"), app.metrics.document(doc.name):
+                changelog = await app.extract_recent_changelog(doc)
+            result: dict[str, Any] = {"changelog": changelog.model_dump(mode="json")}
+        except Exception as e:
+            logger.error("unable to extract changelog for {}, got: {}", doc.name, e)
+            result = {"error": str(e)}
+        finally:
+            heartbeat_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await heartbeat_task
+
+        await self.queue.complete(job_id, run_id, result)
+
+    async def _loop(self) -> None:
+        while not self.stopped.is_set():
+            job = await self.queue.claim(self.worker_id)
+            if job is None:
+                if self.idle_timeout is not None and time.monotonic() - self.last_job_at > self.idle_timeout:
+                    self.stopped.set()
+                continue
+
+            await self.process(*job)
+            self.last_job_at = time.monotonic()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        logger.info("worker {} waiting for jobs on {}", self.worker_id, self.queue.pending)
+        async with self.app.fetcher, self.app.scraper, self.app.converter:
+            await asyncio.gather(*[self._loop() for _ in range(self.app.config.max_concurrency)])
+        self.app.report_metrics()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    def run(self) -> None:
+        asyncio.run(self._run())
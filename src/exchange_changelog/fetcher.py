@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from types import TracebackType
+
+import httpx
+from loguru import logger
+
+from .store import Store
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+# phrases served by client-side rendered apps in place of the real content
+JS_REQUIRED_MARKERS = (
+    "enable javascript",
+    "javascript is disabled",
+    "requires javascript",
+)
+
+# seconds a stored page and its validators are kept, after which the page is fetched in full again
+PAGE_TTL = 7 * 24 * 60 * 60
+
+
+@dataclass
+class StaticPage:
+    html: str
+    not_modified: bool = False
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def is_sufficient(text: str, min_chars: int = 500) -> bool:
+    """Check whether the markdown of a statically served page carries its content, or needs a browser to render it."""
+    if len(text) < min_chars:
+        return False
+
+    lowered = text.lower()
+    return not any(marker in lowered for marker in JS_REQUIRED_MARKERS)
+
+
+class HttpFetcher:
+    """Fetch pages over plain HTTP with a pooled client and conditional requests.
+
+    The ETag / Last-Modified validators and the body of the last 200 response are
+    kept in the store per URL for `ttl` seconds, so a 304 is answered from the stored body.
+    With `remember=False` the caller decides whether the page is worth keeping, e.g. not the
+    shell of a page that has to be rendered, and calls `remember` if so.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        client: httpx.AsyncClient | None = None,
+        ttl: int | None = PAGE_TTL,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.client = client
+
+    async def __aenter__(self) -> HttpFetcher:
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch(
+        self, url: str, content_types: tuple[str, ...] = ("html",), remember: bool = True
+    ) -> StaticPage | None:
+        """Return the page, or None if it can not be fetched without a browser.
+
+        A response whose content type contains none of `content_types` counts as not fetched.
+        """
+        if self.client is None:
+            raise RuntimeError("HttpFetcher must be used as an async context manager")
+
+        cached = None
+        data = await self.store.get(f"http:{url}")
+        if data is not None:
+            cached = json.loads(data)
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            response = await self.client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.warning("Unable to fetch {} over http, got error: {}", url, e)
+            return None
+
+        if response.status_code == 304 and cached is not None:
+            logger.info("{} is not modified", url)
+            return StaticPage(html=cached["html"], not_modified=True)
+
+        content_type = response.headers.get("content-type", content_types[0])
+        if response.status_code != 200 or not any(expected in content_type for expected in content_types):
+            logger.info("Unable to fetch {} over http, got status code: {}", url, response.status_code)
+            return None
+
+        page = StaticPage(
+            html=response.text,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        if remember:
+            await self.remember(url, page)
+        return page
+
+    async def remember(self, url: str, page: StaticPage) -> None:
+        """Keep the page and its validators, so the next fetch of the URL is conditional."""
+        if page.etag or page.last_modified:
+            data = {"etag": page.etag, "last_modified": page.last_modified, "html": page.html}
+            await self.store.set(f"http:{url}", json.dumps(data), ttl=self.ttl)
+
+    async def forget(self, url: str) -> None:
+        await self.store.delete(f"http:{url}")
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+# the changelog module pulls in the llm clients, it is only imported to rebuild changes,
+# so `exchange-changelog query` starts quickly
+if TYPE_CHECKING:
+    from .changelog import Change
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY,
+    doc TEXT NOT NULL,
+    date TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    items TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS changes_doc_date ON changes (doc, date);
+CREATE INDEX IF NOT EXISTS changes_doc_fingerprint ON changes (doc, fingerprint);
+CREATE TABLE IF NOT EXISTS change_categories (
+    change_id INTEGER NOT NULL REFERENCES changes (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    PRIMARY KEY (change_id, category)
+);
+CREATE INDEX IF NOT EXISTS change_categories_category ON change_categories (category, change_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS changes_fts USING fts5 (items, keywords);
+"""
+
+
+def _match_query(text: str) -> str:
+    """Quote every word, so the search is for all of them and punctuation is not taken as FTS5 syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+@dataclass(frozen=True)
+class IndexedChange:
+    doc: str
+    date: date
+    fingerprint: str
+    items: list[str]
+    keywords: list[str]
+    categories: list[str]
+    data: str
+
+    def to_change(self) -> Change:
+        from .changelog import Change
+
+        return Change.model_validate_json(self.data)
+
+
+class HistoryIndex:
+    """Every change extracted from each doc, one row per (doc, date), searchable by date, category and text.
+
+    Dates are parsed once, when a change is first indexed or its items change; a change already
+    indexed with the same fingerprint is found by the fingerprint alone.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # changes are indexed from a worker thread, the lock serializes access
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def upsert(self, doc: str, changes: Iterable[Change], now: float | None = None) -> dict[str, date]:
+        """Index the changes of `doc`, replacing the change indexed for the same date.
+
+        Returns the date of every indexed change by fingerprint, changes with unparsable dates are skipped.
+        """
+        now = time.time() if now is None else now
+        dates: dict[str, date] = {}
+        with self._lock, self._connect() as conn:
+            for change in changes:
+                change_fingerprint = change.fingerprint()
+                row = conn.execute(
+                    "SELECT date FROM changes WHERE doc = ? AND fingerprint = ?", (doc, change_fingerprint)
+                ).fetchone()
+                if row is not None:
+                    dates[change_fingerprint] = date.fromisoformat(row[0])
+                    continue
+
+                try:
+                    change_date = datetime.strptime(change.date, "%Y-%m-%d").date()
+                except ValueError as e:
+                    logger.warning("unable to parse date: {} got error: {}", change.date, e)
+                    continue
+
+                conn.execute(
+                    "INSERT INTO changes (doc, date, fingerprint, items, keywords, data, first_seen, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (doc, date) DO UPDATE SET "
+                    "fingerprint = excluded.fingerprint, items = excluded.items, keywords = excluded.keywords, "
+                    "data = excluded.data, updated_at = excluded.updated_at",
+                    (
+                        doc,
+                        change_date.isoformat(),
+                        change_fingerprint,
+                        json.dumps(change.items),
+                        json.dumps(change.keywords),
+                        change.model_dump_json(),
+                        now,
+                        now,
+                    ),
+                )
+                (change_id,) = conn.execute(
+                    "SELECT id FROM changes WHERE doc = ? AND date = ?", (doc, change_date.isoformat())
+                ).fetchone()
+
+                conn.execute("DELETE FROM change_categories WHERE change_id = ?", (change_id,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO change_categories (change_id, category) VALUES (?, ?)",
+                    [(change_id, str(category.value)) for category in change.categories],
+                )
+                conn.execute("DELETE FROM changes_fts WHERE rowid = ?", (change_id,))
+                conn.execute(
+                    "INSERT INTO changes_fts (rowid, items, keywords) VALUES (?, ?, ?)",
+                    (change_id, "\n".join(change.items), " ".join(change.keywords)),
+                )
+                dates[change_fingerprint] = change_date
+        return dates
+
+    def search(
+        self,
+        doc: str | None = None,
+        since: date | None = None,
+        until: date | None = None,
+        category: str | None = None,
+        text: str | None = None,
+        limit: int | None = None,
+    ) -> list[IndexedChange]:
+        """The indexed changes matching every given filter, newest first.
+
+        `text` matches changes whose items or keywords contain all of its words.
+        """
+        conditions = []
+        params: list[str | int] = []
+        if doc is not None:
+            conditions.append("doc = ?")
+            params.append(doc)
+        if since is not None:
+            conditions.append("date >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            conditions.append("date <= ?")
+            params.append(until.isoformat())
+        if category is not None:
+            conditions.append("id IN (SELECT change_id FROM change_categories WHERE category = ?)")
+            params.append(category)
+        if text is not None and text.strip():
+            conditions.append("id IN (SELECT rowid FROM changes_fts WHERE changes_fts MATCH ?)")
+            params.append(_match_query(text))
+
+        query = (
+            "SELECT id, doc, date, fingerprint, items, keywords, data, "
+            "(SELECT json_group_array(category) FROM change_categories WHERE change_id = changes.id) FROM changes"
+        )
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date DESC, doc LIMIT ?"
+        params.append(-1 if limit is None else limit)
+
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [
+            IndexedChange(
+                doc=row[1],
+                date=date.fromisoformat(row[2]),
+                fingerprint=row[3],
+                items=json.loads(row[4]),
+                keywords=json.loads(row[5]),
+                categories=json.loads(row[7]),
+                data=row[6],
+            )
+            for row in rows
+        ]
+
+    def recent_changes(self, doc: str, changes: list[Change], since: date) -> list[Change]:
+        """Index the changes of `doc` and keep those dated `since` or later, in their original order."""
+        dates = self.upsert(doc, changes)
+        return [
+            change
+            for change in changes
+            if (change_date := dates.get(change.fingerprint())) is not None and change_date >= since
+        ]
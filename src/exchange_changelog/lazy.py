@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
 from functools import cache
 from typing import Any
+from typing import Final
 from typing import Literal
 from typing import TypeVar
 
@@ -12,13 +21,30 @@ from agents import ModelSettings
 from agents import OpenAIChatCompletionsModel
 from agents import OpenAIResponsesModel
 from agents import Runner
+from agents import RunResult
 from loguru import logger
+from openai import APIConnectionError
+from openai import APIStatusError
 from openai import AsyncAzureOpenAI
 from openai import AsyncOpenAI
 from openai.types import ChatModel
+from pydantic import TypeAdapter
+from pydantic import ValidationError
+
+from .metrics import record
+from .metrics import record_usage
+from .response_cache import get_response_cache
+from .store import fingerprint
+from .tokens import count_tokens
 
 T = TypeVar("T")
 
+DEFAULT_MAX_CONCURRENCY: Final[int] = 16
+DEFAULT_MAX_RETRIES: Final[int] = 5
+# full jitter backoff: a random wait up to BASE * 2**attempt seconds, capped
+BACKOFF_BASE: Final[float] = 1.0
+BACKOFF_CAP: Final[float] = 60.0
+
 
 @cache
 def get_openai_client() -> AsyncOpenAI:
@@ -36,11 +62,15 @@ def get_openai_client() -> AsyncOpenAI:
 def get_openai_model(
     model: ChatModel | str | None = None,
     api_type: Literal["responses", "chat_completions"] = "responses",
+    max_retries: int | None = None,
 ) -> Model:
+    """The model, with the client's own retries unless `max_retries` is given."""
     if model is None:
         model = os.getenv("OPENAI_MODEL", "gpt-4o")
 
     openai_client = get_openai_client()
+    if max_retries is not None:
+        openai_client = openai_client.with_options(max_retries=max_retries)
 
     match api_type:
         case "responses":
@@ -51,6 +81,210 @@ def get_openai_model(
             raise ValueError(f"Invalid API type: {api_type}. Use 'responses' or 'chat_completions'.")
 
 
+def get_small_model() -> Model | None:
+    """The cheaper, faster model extractions are tried with first, if OPENAI_SMALL_MODEL is set."""
+    model = os.getenv("OPENAI_SMALL_MODEL")
+    # only run through lazy_run, which retries on its own
+    return get_openai_model(model, max_retries=0) if model else None
+
+
+@dataclass
+class _Call:
+    started_at: float
+    tokens: int
+
+
+class RateLimiter:
+    """Keep model calls under a tokens and a requests per minute quota, with a concurrency limit that adapts.
+
+    A call counts its estimated tokens when it starts, corrected to the actual usage when it ends.
+    The concurrency limit grows by one for every `limit` successful calls and halves on a throttled one
+    (AIMD), so it settles just below what the deployment accepts. It is shared by the event loops
+    of `lazy_run_sync`, hence the thread lock and polling instead of asyncio primitives.
+    """
+
+    def __init__(
+        self,
+        tpm: int | None = None,
+        rpm: int | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        window: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.tpm = tpm
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self.window = window
+        self.clock = clock
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.calls: deque[_Call] = deque()
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        while self.calls and self.calls[0].started_at <= now - self.window:
+            self.calls.popleft()
+
+        if self.in_flight >= int(self.limit):
+            # a call in flight has to finish first
+            return 0.05
+        if self.rpm is not None and len(self.calls) >= self.rpm:
+            return self.calls[-self.rpm].started_at + self.window - now
+
+        if self.tpm is not None and self.calls:
+            excess = sum(call.tokens for call in self.calls) + tokens - self.tpm
+            if excess > 0:
+                # wait for enough of the oldest calls to leave the window, a call over the whole quota goes alone
+                for call in self.calls:
+                    excess -= call.tokens
+                    if excess <= 0:
+                        break
+                return call.started_at + self.window - now
+        return 0.0
+
+    def try_acquire(self, tokens: int) -> tuple[_Call | None, float]:
+        """Start a call if the limits allow it, otherwise return how long to wait before trying again."""
+        with self._lock:
+            now = self.clock()
+            wait = self._wait_time(tokens, now)
+            if wait > 0:
+                return None, wait
+
+            call = _Call(started_at=now, tokens=tokens)
+            self.calls.append(call)
+            self.in_flight += 1
+            return call, 0.0
+
+    async def acquire(self, tokens: int) -> _Call:
+        while True:
+            call, wait = self.try_acquire(tokens)
+            if call is not None:
+                return call
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int) -> _Call:
+        while True:
+            call, wait = self.try_acquire(tokens)
+            if call is not None:
+                return call
+            time.sleep(wait)
+
+    def release(self, call: _Call, tokens: int | None = None, throttled: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if tokens is not None:
+                call.tokens = tokens
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+
+@cache
+def get_rate_limiter() -> RateLimiter:
+    """The limiter shared by all model calls, set up with LLM_TPM, LLM_RPM and LLM_MAX_CONCURRENCY."""
+    tpm = os.getenv("LLM_TPM")
+    rpm = os.getenv("LLM_RPM")
+    return RateLimiter(
+        tpm=int(tpm) if tpm else None,
+        rpm=int(rpm) if rpm else None,
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+    )
+
+
+def _status_code(e: Exception) -> int | None:
+    return e.status_code if isinstance(e, APIStatusError) else None
+
+
+def _is_retryable(e: Exception) -> bool:
+    # connection errors and timeouts (APITimeoutError is an APIConnectionError) are retried,
+    # but not taken as throttling, the server never answered
+    if isinstance(e, APIConnectionError):
+        return True
+    status_code = _status_code(e)
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def _is_throttled(e: Exception) -> bool:
+    return _status_code(e) in (429, 503)
+
+
+def _retry_delay(e: Exception, attempt: int) -> float:
+    """Full jitter backoff, or longer if the response asks for it with Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+    try:
+        retry_after = float(e.response.headers.get("retry-after", 0)) if isinstance(e, APIStatusError) else 0.0
+    except ValueError:
+        # an http date, rare enough to ignore
+        retry_after = 0.0
+    return max(delay, retry_after)
+
+
+def _estimate_tokens(agent: Agent, input: str) -> int:
+    return count_tokens(str(agent.instructions or "") + input)
+
+
+def _usage_tokens(result: RunResult) -> int:
+    usage = result.context_wrapper.usage
+    return usage.input_tokens + usage.output_tokens
+
+
+def _retry_delay_after(e: Exception, attempt: int) -> float | None:
+    """How long to wait before retrying the failed call, None if it should not be retried."""
+    if not _is_retryable(e) or attempt >= int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)):
+        return None
+    delay = _retry_delay(e, attempt)
+    logger.warning("model call failed with {}, retrying in {:.1f} seconds", e, delay)
+    record("llm_retries")
+    return delay
+
+
+async def _run_agent(agent: Agent, input: str) -> RunResult:
+    limiter = get_rate_limiter()
+    tokens = _estimate_tokens(agent, input)
+    attempt = 0
+    while True:
+        call = await limiter.acquire(tokens)
+        result: RunResult | None = None
+        throttled = False
+        try:
+            result = await Runner.run(starting_agent=agent, input=input)
+            return result
+        except Exception as e:
+            throttled = _is_throttled(e)
+            delay = _retry_delay_after(e, attempt)
+            if delay is None:
+                raise
+        finally:
+            # also when the call is cancelled, or its slot would stay in flight for good
+            limiter.release(call, _usage_tokens(result) if result is not None else None, throttled=throttled)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _run_agent_sync(agent: Agent, input: str) -> RunResult:
+    limiter = get_rate_limiter()
+    tokens = _estimate_tokens(agent, input)
+    attempt = 0
+    while True:
+        call = limiter.acquire_sync(tokens)
+        result: RunResult | None = None
+        throttled = False
+        try:
+            result = Runner.run_sync(starting_agent=agent, input=input)
+            return result
+        except Exception as e:
+            throttled = _is_throttled(e)
+            delay = _retry_delay_after(e, attempt)
+            if delay is None:
+                raise
+        finally:
+            limiter.release(call, _usage_tokens(result) if result is not None else None, throttled=throttled)
+        time.sleep(delay)
+        attempt += 1
+
+
 def _create_agent(
     instructions: str | None = None,
     name: str = "lazy_run",
@@ -58,7 +292,8 @@ def _create_agent(
     model_settings: ModelSettings | None = None,
     output_type: type[T] | None = None,
 ) -> Agent:
-    model = model or get_openai_model()
+    # the rate limiter retries throttled calls itself, so it sees every 429
+    model = model or get_openai_model(max_retries=0)
     model_settings = model_settings or ModelSettings()
     return Agent(
         name=name,
@@ -69,6 +304,62 @@ def _create_agent(
     )
 
 
+def _cache_key(agent: Agent, input: str, output_type: type[T] | None) -> str | None:
+    """Hash everything that determines the response: model, settings, instructions, input and output schema."""
+    if get_response_cache() is None:
+        return None
+
+    try:
+        schema = TypeAdapter(output_type or str).json_schema()
+    except Exception:
+        # no json schema means no way to store the output either
+        return None
+
+    model = agent.model
+    model_name = model if isinstance(model, str) else getattr(model, "model", type(model).__name__)
+    return fingerprint(
+        str(model_name),
+        json.dumps(agent.model_settings.to_json_dict(), sort_keys=True, default=str),
+        str(agent.instructions or ""),
+        input,
+        json.dumps(schema, sort_keys=True),
+    )
+
+
+def _get_cached(key: str | None, output_type: type[T] | None) -> Any:
+    response_cache = get_response_cache()
+    if key is None or response_cache is None:
+        return None
+
+    try:
+        value = response_cache.get(key)
+    except Exception as e:
+        logger.warning("unable to read the response cache, got: {}", e)
+        return None
+    if value is None:
+        return None
+
+    try:
+        output = TypeAdapter(output_type or str).validate_json(value)
+    except ValidationError:
+        return None
+
+    logger.info("using the cached response for {}", key[:12])
+    record("llm_cache_hits")
+    return output
+
+
+def _set_cached(key: str | None, output_type: type[T] | None, output: Any) -> None:
+    response_cache = get_response_cache()
+    if key is None or response_cache is None or output is None:
+        return
+
+    try:
+        response_cache.set(key, TypeAdapter(output_type or str).dump_json(output).decode("utf-8"))
+    except Exception as e:
+        logger.warning("unable to write the response cache, got: {}", e)
+
+
 async def lazy_run(
     input: str,
     instructions: str | None = None,
@@ -86,19 +377,40 @@ async def lazy_run(
         model (Model | None): The model to use for the agent.
         model_settings (ModelSettings | None): The settings for the model.
         output_type (type[T] | None): The type of output to return.
+
+    The validated output is cached when LLM_CACHE is set, see `get_response_cache`. Calls go
+    through the shared `RateLimiter` and throttled, failed (429/5xx) or unanswered (connection errors and timeouts)
+    calls are retried.
     """
     model_settings = model_settings or ModelSettings()
-    result = await Runner.run(
-        starting_agent=_create_agent(
-            instructions=instructions,
-            name=name,
-            model=model,
-            model_settings=model_settings,
-            output_type=output_type,
-        ),
-        input=input,
+    agent = _create_agent(
+        instructions=instructions,
+        name=name,
+        model=model,
+        model_settings=model_settings,
+        output_type=output_type,
     )
 
+    # no key without LLM_CACHE, then there is no cache to wait on
+    key = _cache_key(agent, input, output_type)
+    if key is not None:
+        # both caches block on I/O (a redis round trip or a sqlite write), keep them off the event loop
+        cached = await asyncio.to_thread(_get_cached, key, output_type)
+        if cached is not None:
+            return cached
+
+    result = await _run_agent(agent, input)
+
+    output = _final_output(result, output_type)
+    if key is not None:
+        await asyncio.to_thread(_set_cached, key, output_type, output)
+    return output
+
+
+def _final_output(result: RunResult, output_type: type[T] | None) -> Any:
+    usage = result.context_wrapper.usage
+    record_usage(usage.input_tokens, usage.output_tokens, usage.requests)
+
     if output_type is None:
         return result.final_output
     return result.final_output_as(output_type)
@@ -121,19 +433,27 @@ def lazy_run_sync(
         model (Model | None): The model to use for the agent.
         model_settings (ModelSettings | None): The settings for the model.
         output_type (type[T] | None): The type of output to return.
+
+    The validated output is cached when LLM_CACHE is set, see `get_response_cache`. Calls go
+    through the shared `RateLimiter` and throttled, failed (429/5xx) or unanswered (connection errors and timeouts)
+    calls are retried.
     """
     model_settings = model_settings or ModelSettings()
-    result = Runner.run_sync(
-        starting_agent=_create_agent(
-            instructions=instructions,
-            name=name,
-            model=model,
-            model_settings=model_settings,
-            output_type=output_type,
-        ),
-        input=input,
+    agent = _create_agent(
+        instructions=instructions,
+        name=name,
+        model=model,
+        model_settings=model_settings,
+        output_type=output_type,
     )
 
-    if output_type is None:
-        return result.final_output
-    return result.final_output_as(output_type)
+    key = _cache_key(agent, input, output_type)
+    cached = _get_cached(key, output_type)
+    if cached is not None:
+        return cached
+
+    result = _run_agent_sync(agent, input)
+
+    output = _final_output(result, output_type)
+    _set_cached(key, output_type, output)
+    return output
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Final
+
+import logfire
+
+PREFIX: Final[str] = "exchange_changelog"
+
+# the metrics and document the running task reports to, so lazy_run can attribute token usage
+_scope: ContextVar[tuple[Metrics, str] | None] = ContextVar("metrics_scope", default=None)
+
+COUNTER_HELP: Final[dict[str, str]] = {
+    "bytes_fetched": "Bytes of HTML fetched",
+    "chars_sent": "Characters of page text sent to the model",
+    "input_tokens": "Input tokens used by the model",
+    "output_tokens": "Output tokens used by the model",
+    "llm_requests": "Requests made to the model",
+    "llm_cache_hits": "Model responses served from the response cache",
+    "llm_retries": "Model calls retried after a 429 or 5xx response",
+    "not_modified": "Pages answered with 304 Not Modified",
+    "rendered": "Pages rendered with the browser",
+    "source_reads": "Pages read from a cheaper source (an export, raw markdown or a raw file) instead of the page",
+    "requests_blocked": "Browser requests for images, fonts, media and trackers that were blocked",
+    "unchanged_skips": "Extractions skipped because the page text did not change",
+    "rules_parsed": "Changelogs built by the rule-based parser instead of the model",
+    "rules_fallbacks": "Rule-based parses below the confidence threshold, extracted with the model",
+    "cascade_accepted": "Extractions by the small model that passed the checks",
+    "cascade_escalations": "Extractions by the small model that failed the checks, redone by the large model",
+    "cascade_small_seconds": "Seconds spent on extractions by the small model",
+    "cascade_large_seconds": "Seconds spent on escalated extractions by the large model",
+    "errors": "Documents that failed to process",
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Per-document stage timings and counters for one run."""
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.timings: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.counters: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    @contextmanager
+    def document(self, doc: str) -> Iterator[None]:
+        token = _scope.set((self, doc))
+        try:
+            yield
+        finally:
+            _scope.reset(token)
+
+    @contextmanager
+    def timer(self, stage: str, doc: str = "") -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with logfire.span("{stage} {doc}", stage=stage, doc=doc):
+                yield
+        finally:
+            self.timings[doc][stage] += time.perf_counter() - start
+
+    def inc(self, name: str, doc: str = "", value: float = 1) -> None:
+        self.counters[name][doc] += value
+
+    def to_prometheus(self) -> str:
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent in each stage per document in the last run",
+            f"# TYPE {PREFIX}_stage_seconds gauge",
+        ]
+        for doc, stages in sorted(self.timings.items()):
+            for stage, seconds in sorted(stages.items()):
+                lines.append(f'{PREFIX}_stage_seconds{{doc="{_escape(doc)}",stage="{stage}"}} {seconds:.6f}')
+
+        # gauges of the last run: the counts start at zero every run and the file is overwritten,
+        # as counters prometheus would read every run as a reset
+        for name, values in sorted(self.counters.items()):
+            lines += [
+                f"# HELP {PREFIX}_{name}_last_run {COUNTER_HELP.get(name, name)} in the last run",
+                f"# TYPE {PREFIX}_{name}_last_run gauge",
+            ]
+            for doc, value in sorted(values.items()):
+                lines.append(f'{PREFIX}_{name}_last_run{{doc="{_escape(doc)}"}} {value:g}')
+
+        lines += [
+            f"# HELP {PREFIX}_last_run_timestamp_seconds Start time of the last run",
+            f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge",
+            f"{PREFIX}_last_run_timestamp_seconds {self.started_at:.3f}",
+            f"# HELP {PREFIX}_last_run_duration_seconds Duration of the last run",
+            f"# TYPE {PREFIX}_last_run_duration_seconds gauge",
+            f"{PREFIX}_last_run_duration_seconds {time.time() - self.started_at:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path) -> None:
+        """Write the metrics for the node_exporter textfile collector, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp.replace(path)
+
+    def total(self, name: str) -> float:
+        return sum(self.counters.get(name, {}).values())
+
+    def cascade_summary(self) -> str | None:
+        """The share of small model extractions escalated to the large model, and the time the others saved.
+
+        The time saved is estimated from the mean latency of the escalated large model calls of the run.
+        """
+        accepted = self.total("cascade_accepted")
+        escalations = self.total("cascade_escalations")
+        if accepted + escalations == 0:
+            return None
+
+        summary = f"model cascade: {escalations:g} of {accepted + escalations:g} extractions escalated"
+        summary += f" ({escalations / (accepted + escalations):.0%})"
+        if escalations == 0:
+            return summary + ", no large model calls to estimate the time saved from"
+
+        saved = accepted * self.total("cascade_large_seconds") / escalations - self.total("cascade_small_seconds")
+        if saved < 0:
+            return summary + f", about {-saved:.1f}s of model latency lost"
+        return summary + f", about {saved:.1f}s of model latency saved"
+
+    def summary(self) -> str:
+        stages = sorted({stage for timings in self.timings.values() for stage in timings})
+        counters = ["input_tokens", "output_tokens", "unchanged_skips"]
+        docs = sorted(set(self.timings) | {doc for values in self.counters.values() for doc in values})
+
+        header = ["doc"] + [f"{stage} s" for stage in stages] + counters
+        rows = [header]
+        for doc in docs:
+            row = [doc or "(run)"]
+            row += [f"{self.timings[doc][stage]:.2f}" if stage in self.timings[doc] else "" for stage in stages]
+            row += [f"{self.counters[name][doc]:g}" if doc in self.counters[name] else "" for name in counters]
+            rows.append(row)
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths, strict=True)) for row in rows)
+
+
+def record(name: str, value: float = 1) -> None:
+    """Increment a counter of the running document, if any."""
+    scope = _scope.get()
+    if scope is None:
+        return
+
+    metrics, doc = scope
+    metrics.inc(name, doc, value)
+
+
+def record_usage(input_tokens: int, output_tokens: int, requests: int = 1) -> None:
+    record("input_tokens", input_tokens)
+    record("output_tokens", output_tokens)
+    record("llm_requests", requests)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from functools import cache
+from pathlib import Path
+from typing import Final
+from typing import Protocol
+
+from loguru import logger
+from redis import Redis
+
+DEFAULT_TTL: Final[int] = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES: Final[int] = 10_000
+
+
+class ResponseCache(Protocol):
+    def get(self, key: str) -> str | None: ...
+
+    def set(self, key: str, value: str) -> None: ...
+
+
+class SQLiteResponseCache:
+    """Keep responses in a local SQLite file, evicting expired and least recently used entries on write."""
+
+    def __init__(self, path: str | Path, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # lazy_run reads and writes from worker threads, the lock serializes access
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return str(row[0])
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisResponseCache:
+    """Keep responses in Redis with a TTL.
+
+    The size bound is left to the server, e.g. `maxmemory-policy allkeys-lru`.
+    """
+
+    def __init__(self, redis: Redis, ttl: int = DEFAULT_TTL, prefix: str = "llm:") -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> str | None:
+        value = self.redis.get(self.prefix + key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return str(value)
+
+    def set(self, key: str, value: str) -> None:
+        self.redis.set(self.prefix + key, value, ex=self.ttl)
+
+
+@cache
+def get_response_cache() -> ResponseCache | None:
+    """The cache for model responses, opted into with LLM_CACHE set to a SQLite file path or a redis:// URL."""
+    location = os.getenv("LLM_CACHE")
+    if not location:
+        return None
+
+    ttl = int(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL))
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        logger.info("Caching model responses in redis")
+        return RedisResponseCache(Redis.from_url(location), ttl=ttl)
+
+    logger.info("Caching model responses in {}", location)
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    return SQLiteResponseCache(location, ttl=ttl, max_entries=max_entries)
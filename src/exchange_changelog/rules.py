@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Final
+
+from .changelog import Category
+from .changelog import Change
+from .changelog import Changelog
+from .changelog import Reasoning
+from .sections import HEADING_PATTERN
+from .sections import collect_sections
+
+# markdownify cycles through these bullets by nesting depth
+BULLETS: Final[str] = "*+-"
+BULLET_PATTERN = re.compile(r"^([*+-]|\d+[.)])\s+(.*)$")
+# a bold line ending with a colon, e.g. "**User Data Streams:**", groups the bullets below it
+LABEL_PATTERN = re.compile(r"^\*\*([^*]+?):?\*\*:?$")
+
+CODE_PATTERN = re.compile(r"`([^`]{2,80})`")
+ENDPOINT_PATTERN = re.compile(r"\b(?:GET|POST|PUT|DELETE|PATCH)\s+(/[\w/{}.:-]+)")
+
+CATEGORY_PATTERNS: Final[list[tuple[Category, re.Pattern[str]]]] = [
+    (
+        Category.BREAKING_CHANGES,
+        re.compile(r"breaking|no longer|\bremoved?\b|retire|go offline|rejected|\brequired?\b|migrate|http 410"),
+    ),
+    (Category.DEPRECATIONS, re.compile(r"deprecat")),
+    (
+        Category.NEW_FEATURES,
+        re.compile(r"\bnew\b|\badd(?:ed|s)?\b|\bsupports?\b|introduc|launch|now available|enabled"),
+    ),
+    (Category.BUG_FIXES, re.compile(r"\bfix(?:ed|es)?\b|\bbug\b|issue where|incorrect")),
+    (Category.PERFORMANCE_IMPROVEMENTS, re.compile(r"performance|latency|faster|weight|raised to|\d+ ?ms\b")),
+    (Category.SECURITY_UPDATES, re.compile(r"security|ed25519|hmac|\brsa|whitelist|ip binding|signature|permission")),
+]
+
+# confidence of a section whose content is only in paragraphs or tables, which the rules summarize poorly
+PROSE_CONFIDENCE: Final[float] = 0.5
+MAX_KEYWORDS: Final[int] = 5
+
+
+@dataclass
+class RuleResult:
+    changelog: Changelog
+    confidence: float
+
+
+def tag_categories(text: str) -> list[Category]:
+    lowered = text.lower()
+    return [category for category, pattern in CATEGORY_PATTERNS if pattern.search(lowered)]
+
+
+def extract_keywords(items: list[str]) -> list[str]:
+    """Endpoints and code spans mentioned in the items, most mentioned first."""
+    counts: dict[str, int] = {}
+    for item in items:
+        keywords = []
+        for span in CODE_PATTERN.findall(item):
+            endpoint = ENDPOINT_PATTERN.fullmatch(span)
+            keywords.append(endpoint.group(1) if endpoint else span)
+        keywords += ENDPOINT_PATTERN.findall(CODE_PATTERN.sub("", item))
+
+        for keyword in dict.fromkeys(keywords):
+            counts[keyword] = counts.get(keyword, 0) + 1
+    return sorted(counts, key=lambda keyword: -counts[keyword])[:MAX_KEYWORDS]
+
+
+def _clean(text: str) -> str:
+    # zero width spaces come from the anchor links of docusaurus and vitepress headings
+    return " ".join(text.replace("**", "").replace("\u200b", "").split())
+
+
+def parse_items(body: str) -> tuple[list[str], float]:
+    """Turn the lines below a dated heading into items, prefixing nested bullets with their parents.
+
+    Returns the items and the confidence that they cover the section.
+    """
+    items: list[str] = []
+    context: list[str] = []  # sub heading or bold label above the bullets
+    parents: list[str] = []  # bullets by depth
+    pending: str | None = None  # the last bullet, an item unless it has children
+    bullets = 0
+    prose = 0
+    in_code_block = False
+
+    def flush() -> None:
+        nonlocal pending
+        if pending is not None:
+            items.append(": ".join(context + [pending]))
+            pending = None
+
+    for line in body.splitlines()[1:]:
+        if line.startswith("```"):
+            in_code_block = not in_code_block
+            continue
+        if in_code_block or line.startswith("|"):
+            prose += line.startswith("|")
+            continue
+
+        heading = HEADING_PATTERN.match(line)
+        label = LABEL_PATTERN.match(line)
+        bullet = BULLET_PATTERN.match(line)
+        title = heading.group(2) if heading else label.group(1) if label else None
+        if title is not None:
+            flush()
+            context = [_clean(title)]
+            parents = []
+        elif bullet:
+            depth = BULLETS.index(bullet.group(1)) if bullet.group(1) in BULLETS else 0
+            depth = min(depth, len(parents))
+            if depth > 0 and pending is not None and depth == len(parents):
+                # the previous bullet has children, so it is only a prefix
+                pending = None
+            else:
+                flush()
+            parents = parents[:depth] + [_clean(bullet.group(2))]
+            pending = ": ".join(parents)
+            bullets += 1
+        else:
+            flush()
+            items.append(_clean(line))
+            prose += 1
+    flush()
+
+    if not items:
+        return [], 0.0
+    return items, 1.0 if bullets and prose <= bullets else PROSE_CONFIDENCE
+
+
+def parse_changelog(text: str, section_pattern: str | None = None, max_changes: int = 10) -> RuleResult:
+    """Build the changelog from dated headings and the bullets below them, without a model.
+
+    The confidence is the mean over the parsed sections of how well their content fits
+    the rules, and 0 when the page has no dated headings.
+    """
+    sections, upcoming = collect_sections(text, section_pattern)
+    if not sections:
+        return RuleResult(changelog=Changelog(changes=[], upcoming_changes=""), confidence=0.0)
+
+    sections.sort(key=lambda section: section.date or date.min, reverse=True)
+
+    changes: dict[str, Change] = {}
+    confidences = []
+    for section in sections:
+        items, confidence = parse_items(section.body)
+        confidences.append(confidence)
+        if not items or section.date is None:
+            continue
+
+        key = section.date.isoformat()
+        if key in changes:
+            changes[key].items += items
+            continue
+        if len(changes) == max_changes:
+            break
+
+        changes[key] = Change(
+            reasoning=Reasoning(steps=[], final_output="parsed from the dated headings by rules"),
+            date=key,
+            items=items,
+            keywords=[],
+            categories=[],
+        )
+
+    for change in changes.values():
+        change.keywords = extract_keywords(change.items)
+        change.categories = tag_categories(" ".join(change.items))
+
+    upcoming_changes = "\n".join(_clean(line) for section in upcoming for line in section.body.splitlines()[1:])
+    return RuleResult(
+        changelog=Changelog(changes=list(changes.values()), upcoming_changes=upcoming_changes),
+        confidence=sum(confidences) / len(confidences),
+    )
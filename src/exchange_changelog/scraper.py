@@ -1,45 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+from dataclasses import dataclass
+from dataclasses import field
+from types import TracebackType
+from typing import TYPE_CHECKING
+from typing import Final
 from typing import Literal
+from urllib.parse import urlparse
 
 from loguru import logger
-from markdownify import markdownify as md
-from playwright.async_api import async_playwright
 
+from .converter import html_to_markdown
+from .metrics import record
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser
+    from playwright.async_api import BrowserContext
+    from playwright.async_api import Page
+    from playwright.async_api import Playwright
+    from playwright.async_api import Route
+
+# resource types the markdown conversion throws away anyway
+BLOCKED_RESOURCE_TYPES: Final[frozenset[str]] = frozenset({"image", "media", "font"})
+# analytics, tag managers, session recording and chat widgets, subdomains included
+TRACKER_DOMAINS: Final[tuple[str, ...]] = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "hm.baidu.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "zdassets.com",
+    "zopim.com",
+    "crisp.chat",
+    "tawk.to",
+    "livechatinc.com",
+    "drift.com",
+    "hs-scripts.com",
+    "cookielaw.org",
+)
+
+# resolves once the document has gone `quiet` milliseconds without a mutation
+WAIT_FOR_QUIET_DOM: Final[str] = """
+quiet => new Promise(resolve => {
+    const done = () => { observer.disconnect(); resolve(true); };
+    let timer = setTimeout(done, quiet);
+    const observer = new MutationObserver(() => { clearTimeout(timer); timer = setTimeout(done, quiet); });
+    observer.observe(document, { subtree: true, childList: true, characterData: true });
+})
+"""
+
+
+def _matches_domain(host: str, domains: Sequence[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def is_blocked(resource_type: str, url: str, allow: Sequence[str] = ()) -> bool:
+    """Whether the browser should skip the request; `allow` lists resource types or domains to load anyway."""
+    host = urlparse(url).hostname or ""
+    if resource_type in allow or _matches_domain(host, allow):
+        return False
+    return resource_type in BLOCKED_RESOURCE_TYPES or _matches_domain(host, TRACKER_DOMAINS)
 
-def strip_empty_lines(text: str) -> str:
-    lines = []
-    for line in text.splitlines():
-        stripped = line.strip()
-        if stripped:
-            lines += [stripped]
-    return "\n".join(lines)
+
+@dataclass
+class PageOptions:
+    # wait for this element instead of a quiet DOM before taking the content
+    content_selector: str | None = None
+    # resource types or domains to load even though they are blocked by default
+    allow: Sequence[str] = ()
+
+
+@dataclass
+class PageSlot:
+    # the browser the context was opened in, a slot from a browser that was relaunched is not reused
+    browser: Browser | None = None
+    context: BrowserContext | None = None
+    page: Page | None = None
+    uses: int = 0
+    # what the page being loaded needs, read by the request handler of the context
+    options: PageOptions = field(default_factory=PageOptions)
+    blocked: int = 0
 
 
 class PlaywrightScraper:
+    """Scrape pages with Chromium and convert them to markdown.
+
+    Used as a plain callable, every URL launches and closes its own browser. Used as
+    an async context manager, the browser is launched once on first use and pages are
+    served from a bounded pool of contexts that are recycled after `max_page_uses`
+    loads or when they crash.
+
+    Images, fonts, media and trackers are not loaded unless `block_requests` is off.
+    After navigating, the page is ready once the content selector is attached, or
+    once the DOM has been quiet for `quiet_ms`, whichever applies; a page that does
+    not get ready within `ready_timeout` seconds is taken as it is.
+
+    With `browser_url` set, e.g. to a `browser-server`, the scraper connects to that
+    browser instead of launching its own, and falls back to launching one if it can't.
+    Pages are still opened in contexts of their own, which are closed along with the
+    connection, so runs sharing the browser don't share cookies or storage.
+    """
+
     def __init__(
         self,
         timeout: float | None = 0,
-        wait_until: Literal["commit", "domcontentloaded", "load", "networkidle"] = "networkidle",
+        wait_until: Literal["commit", "domcontentloaded", "load", "networkidle"] = "domcontentloaded",
         browser_headless: bool = False,
+        pool_size: int = 4,
+        max_page_uses: int = 20,
+        block_requests: bool = True,
+        wait_for_ready: bool = True,
+        quiet_ms: int = 500,
+        ready_timeout: float = 10.0,
+        browser_url: str | None = None,
+        connect_timeout: float = 10.0,
     ) -> None:
         self.timeout = timeout
         self.wait_until = wait_until
         self.browser_headless = browser_headless
+        self.pool_size = pool_size
+        self.max_page_uses = max_page_uses
+        self.block_requests = block_requests
+        self.wait_for_ready = wait_for_ready
+        self.quiet_ms = quiet_ms
+        self.ready_timeout = ready_timeout
+        self.browser_url = browser_url
+        self.connect_timeout = connect_timeout
+
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._slots: asyncio.Queue[PageSlot] | None = None
+        self._browser_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> PlaywrightScraper:
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    @property
+    def started(self) -> bool:
+        return self._slots is not None
+
+    async def start(self) -> None:
+        """Switch to pooled mode. The browser itself is launched on first use."""
+        if self.started:
+            return
+
+        self._slots = asyncio.Queue(maxsize=self.pool_size)
+        for _ in range(self.pool_size):
+            self._slots.put_nowait(PageSlot())
+
+    async def close(self) -> None:
+        if self._slots is not None:
+            while not self._slots.empty():
+                await self._release_slot(self._slots.get_nowait())
+            self._slots = None
+
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                logger.warning("Unable to close browser, got error: {}", e)
+            self._browser = None
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __call__(self, url: str, options: PageOptions | None = None) -> str:
+        return html_to_markdown(await self.fetch(url, options))
+
+    async def fetch(self, url: str, options: PageOptions | None = None) -> str:
+        """Load the URL and return the rendered HTML."""
+        options = options or PageOptions()
+        if not self.started:
+            return await self._fetch_once(url, options)
+
+        try:
+            return await self._fetch_pooled(url, options)
+        except Exception as e:
+            if self._browser is not None and self._browser.is_connected():
+                raise
+            # the browser died under us: relaunch it and give the URL one more try
+            logger.warning("Browser disconnected while loading {}, relaunching. Got error: {}", url, e)
+            return await self._fetch_pooled(url, options)
+
+    async def _fetch_once(self, url: str, options: PageOptions) -> str:
+        # playwright is imported on first use, runs served over plain http never load it
+        from playwright.async_api import async_playwright
 
-    async def __call__(self, url: str) -> str:
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.browser_headless)
-            context = await browser.new_context()
-            page = await context.new_page()
+            browser = await self._launch(p)
+            try:
+                context = await browser.new_context()
+                slot = PageSlot(context=context)
+                await self._route_requests(slot)
+                page = await context.new_page()
+                return await self._load(slot, page, url, options)
+            finally:
+                await browser.close()
+
+    async def _fetch_pooled(self, url: str, options: PageOptions) -> str:
+        assert self._slots is not None
+
+        slot = await self._slots.get()
+        try:
+            page = await self._checkout(slot)
+            content = await self._load(slot, page, url, options)
+            slot.uses += 1
+        except Exception:
+            await self._release_slot(slot)
+            raise
+        else:
+            if slot.uses >= self.max_page_uses:
+                await self._release_slot(slot)
+        finally:
+            self._slots.put_nowait(slot)
+
+        return content
 
+    async def _checkout(self, slot: PageSlot) -> Page:
+        browser = await self._ensure_browser()
+
+        if slot.page is not None and (slot.page.is_closed() or slot.browser is not browser):
+            await self._release_slot(slot)
+
+        if slot.page is None:
+            slot.browser = browser
+            slot.context = await browser.new_context()
+            await self._route_requests(slot)
+            slot.page = await slot.context.new_page()
+
+        return slot.page
+
+    async def _ensure_browser(self) -> Browser:
+        async with self._browser_lock:
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+            if self._browser is None or not self._browser.is_connected():
+                self._browser = await self._launch(self._playwright)
+            return self._browser
+
+    async def _launch(self, playwright: Playwright) -> Browser:
+        if self.browser_url:
             try:
-                await page.goto(url, timeout=self.timeout, wait_until=self.wait_until)
+                return await self._connect(playwright, self.browser_url)
             except Exception as e:
                 logger.warning(
-                    "Unable to load page: {}, falling back to default wait_until(load). Got error: {}", url, e
+                    "Unable to connect to the browser at {}, launching one. Got error: {}", self.browser_url, e
                 )
-                await page.goto(url, timeout=self.timeout)
 
-            content = await page.content()
-            await browser.close()
+        logger.info("Launching browser")
+        return await playwright.chromium.launch(headless=self.browser_headless)
 
-            return strip_empty_lines(md(content, strip=["a", "img"]))
+    async def _connect(self, playwright: Playwright, url: str) -> Browser:
+        logger.info("Connecting to the browser at {}", url)
+        parsed = urlparse(url)
+        if parsed.scheme in ("http", "https") or parsed.path.startswith("/devtools/"):
+            return await playwright.chromium.connect_over_cdp(url, timeout=self.connect_timeout * 1000)
+        # a playwright server, e.g. `playwright run-server`
+        return await playwright.chromium.connect(url, timeout=self.connect_timeout * 1000)
+
+    async def _release_slot(self, slot: PageSlot) -> None:
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception as e:
+                logger.debug("Unable to close browser context, got error: {}", e)
+        slot.browser = None
+        slot.context = None
+        slot.page = None
+        slot.uses = 0
+
+    async def _route_requests(self, slot: PageSlot) -> None:
+        if not self.block_requests or slot.context is None:
+            return
+
+        async def handle(route: Route) -> None:
+            request = route.request
+            if is_blocked(request.resource_type, request.url, slot.options.allow):
+                slot.blocked += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await slot.context.route("**/*", handle)
+
+    async def _load(self, slot: PageSlot, page: Page, url: str, options: PageOptions) -> str:
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        slot.options = options
+        slot.blocked = 0
+        try:
+            try:
+                await page.goto(url, timeout=self.timeout, wait_until=self.wait_until)
+            except PlaywrightTimeoutError as e:
+                # whatever has loaded is still worth more than a second navigation
+                logger.warning("Timed out loading {}, using what has loaded so far. Got error: {}", url, e)
+            else:
+                if self.wait_for_ready:
+                    await self._wait_until_ready(page, url, options)
+        finally:
+            if slot.blocked:
+                record("requests_blocked", slot.blocked)
+
+        return await page.content()
+
+    async def _wait_until_ready(self, page: Page, url: str, options: PageOptions) -> None:
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            if options.content_selector:
+                await page.wait_for_selector(
+                    options.content_selector, state="attached", timeout=self.ready_timeout * 1000
+                )
+            else:
+                await asyncio.wait_for(page.evaluate(WAIT_FOR_QUIET_DOM, self.quiet_ms), self.ready_timeout)
+        except (PlaywrightTimeoutError, TimeoutError):
+            logger.info("{} was not ready after {} seconds, using it as it is", url, self.ready_timeout)
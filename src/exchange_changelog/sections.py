@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import date
+from datetime import datetime
+
+from .tokens import CHARS_PER_TOKEN
+from .tokens import count_tokens
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+CHANGELOG_PATTERN = re.compile(
+    r"change[\s_-]*log|release[\s_-]*notes?|revision history|version history|api updates",
+    re.IGNORECASE,
+)
+UPCOMING_PATTERN = re.compile(r"upcoming changes", re.IGNORECASE)
+# a line holding only a date, optionally bold, such as the date labels of mintlify changelogs,
+# bold dates in docusaurus pages or the dates in plain text google doc exports
+DATE_LINE_PATTERN = re.compile(r"^(\*\*|__|)([^*_]+?)\1$")
+# below every markdown heading, so date lines split the section they are in but never end it
+DATE_LINE_LEVEL = 7
+
+MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+DATE_PATTERNS: list[tuple[re.Pattern[str], str]] = [
+    (re.compile(r"(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})"), "ymd"),
+    (re.compile(rf"(\d{{4}})[-/ ]({MONTHS})[-/ ](\d{{1,2}})", re.IGNORECASE), "ybd"),
+    (re.compile(rf"({MONTHS})\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})", re.IGNORECASE), "bdy"),
+    (re.compile(rf"(\d{{1,2}})(?:st|nd|rd|th)?\s+({MONTHS}),?\s+(\d{{4}})", re.IGNORECASE), "dby"),
+]
+
+
+@dataclass
+class Heading:
+    line: int
+    level: int
+    title: str
+    date: date | None = None
+
+
+def _month(name: str) -> int:
+    return datetime.strptime(name[:3].title(), "%b").month
+
+
+def parse_date(text: str) -> date | None:
+    """Find the first date in a heading title, in any of the common changelog formats."""
+    for pattern, order in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            groups = match.groups()
+            try:
+                match order:
+                    case "ymd":
+                        return date(int(groups[0]), int(groups[1]), int(groups[2]))
+                    case "ybd":
+                        return date(int(groups[0]), _month(groups[1]), int(groups[2]))
+                    case "bdy":
+                        return date(int(groups[2]), _month(groups[0]), int(groups[1]))
+                    case "dby":
+                        return date(int(groups[2]), _month(groups[1]), int(groups[0]))
+            except ValueError:
+                continue
+    return None
+
+
+def _date_line(line: str) -> date | None:
+    match = DATE_LINE_PATTERN.match(line.strip())
+    if match is None:
+        return None
+    text = match.group(2).strip()
+    if not any(pattern.fullmatch(text) for pattern, _ in DATE_PATTERNS):
+        return None
+    return parse_date(text)
+
+
+def parse_headings(lines: list[str]) -> list[Heading]:
+    """The markdown headings, and the lines holding only a date as headings below all of them."""
+    headings = []
+    in_code_block = False
+    for i, line in enumerate(lines):
+        if line.startswith("```"):
+            in_code_block = not in_code_block
+            continue
+        if in_code_block:
+            continue
+
+        match = HEADING_PATTERN.match(line)
+        if match is None:
+            if (line_date := _date_line(line)) is not None:
+                headings.append(Heading(line=i, level=DATE_LINE_LEVEL, title=line.strip(), date=line_date))
+            continue
+
+        # docusaurus and vitepress end headings with a zero width space in the anchor link
+        title = match.group(2).replace("\u200b", "").strip()
+        headings.append(Heading(line=i, level=len(match.group(1)), title=title, date=parse_date(title)))
+    return headings
+
+
+def _section_end(headings: list[Heading], index: int, num_lines: int) -> int:
+    """A section runs until the next heading of the same or a higher level, or the next dated heading."""
+    heading = headings[index]
+    for other in headings[index + 1 :]:
+        if other.level <= heading.level or other.date is not None:
+            return other.line
+    return num_lines
+
+
+def _subtree_end(headings: list[Heading], index: int, num_lines: int) -> int:
+    heading = headings[index]
+    for other in headings[index + 1 :]:
+        if other.level <= heading.level:
+            return other.line
+    return num_lines
+
+
+def _find_scope(headings: list[Heading], num_lines: int, section_pattern: str | None) -> tuple[int, int]:
+    """Return the line range of the changelog section, if there is one with dated headings in it."""
+    root_pattern = re.compile(section_pattern, re.IGNORECASE) if section_pattern else CHANGELOG_PATTERN
+    for i, heading in enumerate(headings):
+        if heading.date is not None or not root_pattern.search(heading.title):
+            continue
+        end = _subtree_end(headings, i, num_lines)
+        if any(h.date is not None and heading.line < h.line < end for h in headings):
+            return heading.line, end
+    return 0, num_lines
+
+
+@dataclass
+class Section:
+    title: str
+    body: str
+    date: date | None = None
+
+
+def collect_sections(text: str, section_pattern: str | None = None) -> tuple[list[Section], list[Section]]:
+    """Split the changelog part of the text into dated sections and upcoming changes sections."""
+    lines = text.splitlines()
+    headings = parse_headings(lines)
+    start, end = _find_scope(headings, len(lines), section_pattern)
+
+    sections: list[Section] = []
+    upcoming: list[Section] = []
+    for i, heading in enumerate(headings):
+        if not start <= heading.line < end:
+            continue
+        if heading.date is None and not UPCOMING_PATTERN.search(heading.title):
+            continue
+
+        body = "\n".join(lines[heading.line : min(_section_end(headings, i, len(lines)), end)])
+        section = Section(title=heading.title, body=body, date=heading.date)
+        if heading.date is not None:
+            sections.append(section)
+        else:
+            upcoming.append(section)
+    return sections, upcoming
+
+
+def _take_within_budget(bodies: list[str], token_budget: int) -> list[str]:
+    selected: list[str] = []
+    used = 0
+    for body in bodies:
+        tokens = count_tokens(body)
+        if used + tokens > token_budget:
+            if not selected:
+                selected.append(body[: token_budget * CHARS_PER_TOKEN])
+            break
+        selected.append(body)
+        used += tokens
+    return selected
+
+
+def select_recent_sections(text: str, token_budget: int, section_pattern: str | None = None) -> str | None:
+    """Build the LLM input from the most recent dated sections of the changelog.
+
+    The changelog section is found by heading title (`section_pattern` or a release notes /
+    changelog pattern), and the dated headings inside it are taken newest first until the
+    token budget is spent. An "Upcoming Changes" section is always put first.
+
+    Returns None when the page has no dated headings, so the caller can fall back to the
+    plain character trim.
+    """
+    sections, upcoming = collect_sections(text, section_pattern)
+    if not sections:
+        return None
+
+    # pages are usually newest first, but do not rely on it
+    sections.sort(key=lambda section: section.date or date.min, reverse=True)
+
+    bodies = [section.body for section in upcoming + sections]
+    return "\n".join(_take_within_budget(bodies, token_budget))
+
+
+def _split_block(block: str, max_tokens: int, model: str | None = None) -> list[str]:
+    """Split a block on line boundaries, and lines longer than the budget by characters."""
+    if count_tokens(block, model) <= max_tokens:
+        return [block]
+
+    pieces: list[str] = []
+    for line in block.splitlines():
+        while count_tokens(line, model) > max_tokens:
+            pieces.append(line[: max_tokens * CHARS_PER_TOKEN])
+            line = line[max_tokens * CHARS_PER_TOKEN :]
+        pieces.append(line)
+    return pieces
+
+
+def split_sections(text: str, max_tokens: int, model: str | None = None) -> list[str]:
+    """Split the text into chunks of at most `max_tokens`, cutting at headings where possible."""
+    lines = text.splitlines()
+    boundaries = sorted({0} | {heading.line for heading in parse_headings(lines)})
+    blocks = ["\n".join(lines[start:end]) for start, end in zip(boundaries, boundaries[1:] + [len(lines)], strict=True)]
+
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for block in blocks:
+        for piece in _split_block(block, max_tokens, model):
+            tokens = count_tokens(piece, model)
+            if current and used + tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current = []
+                used = 0
+            current.append(piece)
+            used += tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+@dataclass
+class SectionDiff:
+    upcoming: str | None
+    upcoming_changed: bool
+    changed: list[str]
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.changed and not self.upcoming_changed
+
+    def to_text(self) -> str:
+        """The text to extract from: the upcoming changes section, followed by the added or modified sections."""
+        bodies = [self.upcoming] if self.upcoming is not None else []
+        return "\n".join(bodies + self.changed)
+
+
+def diff_sections(old: str, new: str) -> SectionDiff | None:
+    """Compare two snapshots section by section, keyed by heading.
+
+    Returns None when the new text has no dated headings and can not be diffed.
+    """
+    new_sections, new_upcoming = collect_sections(new)
+    if not new_sections:
+        return None
+
+    old_sections, old_upcoming = collect_sections(old)
+    old_bodies = {section.title: section.body for section in old_sections}
+
+    upcoming = "\n".join(section.body for section in new_upcoming) or None
+    old_upcoming_text = "\n".join(section.body for section in old_upcoming) or None
+    return SectionDiff(
+        upcoming=upcoming,
+        upcoming_changed=upcoming != old_upcoming_text,
+        changed=[section.body for section in new_sections if old_bodies.get(section.title) != section.body],
+    )
@@ -1,19 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
 import os
 from functools import cache
+from types import TracebackType
+from typing import Final
 
 from loguru import logger
-from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+# Slack truncates the text field at 40,000 characters, but splits and folds messages well before that.
+MAX_MESSAGE_LENGTH: Final[int] = 4000
 
 
 @cache
-def get_slack_client() -> WebClient | None:
+def get_async_slack_client() -> AsyncWebClient | None:
     token = os.getenv("SLACK_TOKEN")
     if token is None:
         logger.warning("SLACK_TOKEN environment variable is not set")
         return None
 
-    return WebClient(token=token)
+    return AsyncWebClient(token=token)
 
 
 @cache
@@ -26,14 +35,130 @@ def get_slack_channel() -> str | None:
     return channel
 
 
-def post_slack_message(text: str) -> None:
-    channel = get_slack_channel()
-    client = get_slack_client()
+def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Split a message on line boundaries into chunks of at most `max_length` characters."""
+    chunks: list[str] = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > max_length:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_messages(messages: list[str], max_length: int = MAX_MESSAGE_LENGTH, separator: str = "\n\n") -> list[str]:
+    """Merge messages into as few chunks as possible, each at most `max_length` characters."""
+    packed: list[str] = []
+    current = ""
+    for message in messages:
+        for chunk in split_message(message, max_length):
+            candidate = f"{current}{separator}{chunk}" if current else chunk
+            if len(candidate) > max_length:
+                packed.append(current)
+                candidate = chunk
+            current = candidate
+
+    if current:
+        packed.append(current)
+    return packed
+
+
+class SlackQueue:
+    """Post Slack messages from a background task without blocking the event loop.
+
+    Messages queued close together are merged into as few chat.postMessage calls as
+    the size limit allows, rate limited calls are retried after Retry-After, and
+    leaving the async context flushes whatever is still queued.
+    """
+
+    def __init__(
+        self,
+        client: AsyncWebClient | None = None,
+        channel: str | None = None,
+        max_length: int = MAX_MESSAGE_LENGTH,
+        max_retries: int = 5,
+        linger: float = 1.0,
+    ) -> None:
+        self.client = client
+        self.channel = channel
+        self.max_length = max_length
+        self.max_retries = max_retries
+        self.linger = linger
+
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> SlackQueue:
+        if self.client is None:
+            self.client = get_async_slack_client()
+        if self.channel is None:
+            self.channel = get_slack_channel()
+
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def post(self, text: str) -> None:
+        self._queue.put_nowait(text)
+
+    async def flush(self) -> None:
+        await self._queue.join()
+
+    async def _run(self) -> None:
+        while True:
+            messages = [await self._queue.get()]
+
+            # give related messages a moment to arrive, then take everything queued
+            await asyncio.sleep(self.linger)
+            while not self._queue.empty():
+                messages.append(self._queue.get_nowait())
+
+            try:
+                for text in pack_messages(messages, self.max_length):
+                    await self._send(text)
+            except Exception as e:
+                logger.error("unable to post slack message, got: {}", e)
+            finally:
+                for _ in messages:
+                    self._queue.task_done()
+
+    async def _send(self, text: str) -> None:
+        if self.client is None or self.channel is None:
+            return
 
-    if channel is None or client is None:
-        return
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.client.chat_postMessage(channel=self.channel, text=text, mrkdwn=True)
+                return
+            except SlackApiError as e:
+                if e.response.status_code != 429 or attempt == self.max_retries:
+                    logger.error("slack api error: {}", e)
+                    return
 
-    try:
-        client.chat_postMessage(channel=channel, text=text, mrkdwn=True)
-    except SlackApiError as e:
-        logger.error("slack api error: {}", e)
+                retry_after = float(e.response.headers.get("Retry-After", 1))
+                logger.warning("slack rate limited, retrying in {} seconds", retry_after)
+                await asyncio.sleep(retry_after)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import difflib
+import gzip
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+Codec = Literal["zstd", "gzip"]
+Kind = Literal["html", "markdown"]
+
+SUFFIXES: dict[str, Codec] = {".zst": "zstd", ".gz": "gzip"}
+
+
+def _compress(data: bytes, codec: Codec) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, codec: Codec) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    id: int
+    doc: str
+    url: str
+    taken_at: float
+    html: str
+    markdown: str
+
+    def blob(self, kind: Kind) -> str:
+        return self.html if kind == "html" else self.markdown
+
+
+class SnapshotStore:
+    """Keep the raw html and the markdown of every scraped page, compressed and content-addressed.
+
+    Blobs are stored once per sha256 under `blobs/`, so a page that did not change costs a row in
+    the SQLite index and no blob. The index maps (doc, time) to the blobs of each snapshot.
+    """
+
+    def __init__(self, directory: str | Path, codec: Codec | None = None) -> None:
+        self.directory = Path(directory)
+        self.codec: Codec = codec or ("zstd" if zstandard is not None else "gzip")
+
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # snapshots are saved from a worker thread, the lock serializes access
+            self._conn = sqlite3.connect(
+                self.directory / "index.sqlite3", check_same_thread=False, isolation_level=None
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, doc TEXT NOT NULL, url TEXT NOT NULL, "
+                "taken_at REAL NOT NULL, html TEXT NOT NULL, markdown TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS snapshots_doc_taken_at ON snapshots (doc, taken_at)")
+        return self._conn
+
+    def _blob_path(self, digest: str) -> Path | None:
+        for suffix in SUFFIXES:
+            path = self.directory / "blobs" / digest[:2] / (digest + suffix)
+            if path.exists():
+                return path
+        return None
+
+    def _write_blob(self, text: str) -> str:
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if self._blob_path(digest) is not None:
+            return digest
+
+        suffix = next(suffix for suffix, codec in SUFFIXES.items() if codec == self.codec)
+        path = self.directory / "blobs" / digest[:2] / (digest + suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(_compress(data, self.codec))
+        tmp.replace(path)
+        return digest
+
+    def read(self, digest: str) -> str:
+        path = self._blob_path(digest)
+        if path is None:
+            raise KeyError(digest)
+        return _decompress(path.read_bytes(), SUFFIXES[path.suffix]).decode("utf-8")
+
+    def save(self, doc: str, url: str, html: str, markdown: str, taken_at: float | None = None) -> Snapshot:
+        with self._lock:
+            conn = self._connect()
+            html_digest = self._write_blob(html)
+            markdown_digest = self._write_blob(markdown)
+            taken_at = time.time() if taken_at is None else taken_at
+            cursor = conn.execute(
+                "INSERT INTO snapshots (doc, url, taken_at, html, markdown) VALUES (?, ?, ?, ?, ?)",
+                (doc, url, taken_at, html_digest, markdown_digest),
+            )
+        return Snapshot(cursor.lastrowid or 0, doc, url, taken_at, html_digest, markdown_digest)
+
+    def list(self, doc: str | None = None, limit: int | None = None) -> list[Snapshot]:
+        """The snapshots of `doc`, or of every doc, newest first."""
+        query = "SELECT id, doc, url, taken_at, html, markdown FROM snapshots"
+        params: tuple[str | int, ...] = ()
+        if doc is not None:
+            query += " WHERE doc = ?"
+            params = (doc,)
+        query += " ORDER BY taken_at DESC, id DESC LIMIT ?"
+        params += (-1 if limit is None else limit,)
+
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+        return [Snapshot(*row) for row in rows]
+
+    def get(self, snapshot_id: int) -> Snapshot | None:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute("SELECT id, doc, url, taken_at, html, markdown FROM snapshots WHERE id = ?", (snapshot_id,))
+                .fetchone()
+            )
+        return None if row is None else Snapshot(*row)
+
+    def diff(self, old: Snapshot, new: Snapshot, kind: Kind = "markdown") -> str:
+        return "".join(
+            difflib.unified_diff(
+                self.read(old.blob(kind)).splitlines(keepends=True),
+                self.read(new.blob(kind)).splitlines(keepends=True),
+                fromfile=f"{old.doc}@{old.id}",
+                tofile=f"{new.doc}@{new.id}",
+            )
+        )
+
+    def prune(self, keep_days: float, keep_last: int = 1, now: float | None = None) -> tuple[int, int]:
+        """Apply the retention policy and delete the blobs no snapshot refers to anymore.
+
+        Snapshots older than `keep_days` go, except the newest `keep_last` of each doc. Of the newer
+        ones, a snapshot identical to both its neighbours goes too, which keeps when each version was
+        first and last seen. Returns the number of snapshots and blobs deleted.
+        """
+        cutoff = (time.time() if now is None else now) - keep_days * 24 * 60 * 60
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute("SELECT id, doc, taken_at, html, markdown FROM snapshots ORDER BY doc, taken_at, id")
+
+            by_doc: dict[str, list[tuple[int, float, str, str]]] = {}
+            for snapshot_id, doc, taken_at, html, markdown in rows:
+                by_doc.setdefault(doc, []).append((snapshot_id, taken_at, html, markdown))
+
+            deleted = []
+            for snapshots in by_doc.values():
+                for i, (snapshot_id, taken_at, *content) in enumerate(snapshots):
+                    if i >= len(snapshots) - keep_last:
+                        break
+                    expired = taken_at < cutoff
+                    redundant = 0 < i < len(snapshots) - 1 and snapshots[i - 1][2:] == snapshots[i + 1][2:] == tuple(
+                        content
+                    )
+                    if expired or redundant:
+                        deleted.append(snapshot_id)
+
+            conn.executemany("DELETE FROM snapshots WHERE id = ?", [(snapshot_id,) for snapshot_id in deleted])
+
+            referenced = {digest for row in conn.execute("SELECT html, markdown FROM snapshots") for digest in row}
+            removed_blobs = 0
+            for path in (self.directory / "blobs").glob("*/*"):
+                if path.suffix in SUFFIXES and path.stem not in referenced:
+                    path.unlink()
+                    removed_blobs += 1
+
+            if deleted:
+                conn.execute("VACUUM")
+        return len(deleted), removed_blobs
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import TYPE_CHECKING
+from typing import Final
+from typing import Protocol
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from .fetcher import HttpFetcher
+
+# content types of plain text and markdown files
+TEXT_CONTENT_TYPES: Final[tuple[str, ...]] = ("text/plain", "text/markdown", "text/x-markdown")
+# Document.source value that skips the sources and loads the page itself
+PAGE_SOURCE: Final[str] = "page"
+# docusaurus sites by host, with the sitemap listing their pages
+DOCUSAURUS_SITEMAPS: Final[dict[str, str]] = {
+    "developers.binance.com": "https://developers.binance.com/sitemap.xml",
+    "bybit-exchange.github.io": "https://bybit-exchange.github.io/docs/sitemap.xml",
+}
+SITEMAP_NAMESPACE: Final[str] = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+class Source(Protocol):
+    """A cheaper way to the text of a page than loading and converting the page."""
+
+    name: str
+
+    def matches(self, url: str) -> bool: ...
+
+    async def fetch(self, fetcher: HttpFetcher, url: str) -> str | None:
+        """Return the markdown or plain text of the page, or None to load the page instead."""
+        ...
+
+
+def _without_fragment(url: str) -> str:
+    return url.split("#", 1)[0]
+
+
+class GoogleDocsSource:
+    """Read a Google Doc from its plain text export."""
+
+    name = "google-docs"
+    pattern = re.compile(r"^https://docs\.google\.com/document/d/([\w-]+)")
+
+    def matches(self, url: str) -> bool:
+        return self.pattern.match(url) is not None
+
+    async def fetch(self, fetcher: HttpFetcher, url: str) -> str | None:
+        match = self.pattern.match(url)
+        if match is None:
+            return None
+
+        export_url = f"https://docs.google.com/document/d/{match[1]}/export?format=txt"
+        page = await fetcher.fetch(export_url, content_types=TEXT_CONTENT_TYPES)
+        return None if page is None else page.html.lstrip("\ufeff")
+
+
+class DocusaurusSource:
+    """Read a docusaurus page from the markdown the site serves next to it, at the page URL plus `.md`.
+
+    When the sitemap has a `lastmod` for the page and it is the same as last time, the stored
+    markdown is used without requesting the page at all.
+    """
+
+    name = "docusaurus"
+
+    def __init__(self, sitemaps: dict[str, str] | None = None) -> None:
+        self.sitemaps = DOCUSAURUS_SITEMAPS if sitemaps is None else sitemaps
+
+    def matches(self, url: str) -> bool:
+        return urlparse(url).hostname in self.sitemaps
+
+    async def lastmod(self, fetcher: HttpFetcher, url: str) -> str | None:
+        sitemap_url = self.sitemaps.get(urlparse(url).hostname or "")
+        if sitemap_url is None:
+            return None
+
+        page = await fetcher.fetch(sitemap_url, content_types=("xml",))
+        if page is None:
+            return None
+
+        try:
+            root = ElementTree.fromstring(page.html)
+        except ElementTree.ParseError as e:
+            logger.warning("Unable to parse the sitemap {}, got error: {}", sitemap_url, e)
+            return None
+
+        for entry in root.iter(f"{SITEMAP_NAMESPACE}url"):
+            loc = entry.findtext(f"{SITEMAP_NAMESPACE}loc", "").rstrip("/")
+            if loc == url:
+                return entry.findtext(f"{SITEMAP_NAMESPACE}lastmod")
+        return None
+
+    async def fetch(self, fetcher: HttpFetcher, url: str) -> str | None:
+        url = _without_fragment(url).rstrip("/")
+        key = f"source:{url}"
+
+        lastmod = await self.lastmod(fetcher, url)
+        if lastmod is not None:
+            data = await fetcher.store.get(key)
+            if data is not None and json.loads(data)["lastmod"] == lastmod:
+                logger.info("{} is unchanged since {} according to the sitemap", url, lastmod)
+                return str(json.loads(data)["text"])
+
+        page = await fetcher.fetch(url + ".md", content_types=TEXT_CONTENT_TYPES)
+        if page is None:
+            return None
+
+        if lastmod is not None:
+            await fetcher.store.set(key, json.dumps({"lastmod": lastmod, "text": page.html}), ttl=fetcher.ttl)
+        return page.html
+
+
+class GitHubSource:
+    """Read markdown and text files hosted on GitHub as raw files instead of the rendered blob page."""
+
+    name = "github"
+    pattern = re.compile(
+        r"^https://(?:github\.com/([^/]+)/([^/]+)/blob|raw\.githubusercontent\.com/([^/]+)/([^/]+))"
+        r"/(.+\.(?:md|markdown|txt|rst))$"
+    )
+
+    def raw_url(self, url: str) -> str | None:
+        match = self.pattern.match(_without_fragment(url))
+        if match is None:
+            return None
+
+        owner, repo = (match[1], match[2]) if match[1] else (match[3], match[4])
+        return f"https://raw.githubusercontent.com/{owner}/{repo}/{match[5]}"
+
+    def matches(self, url: str) -> bool:
+        return self.raw_url(url) is not None
+
+    async def fetch(self, fetcher: HttpFetcher, url: str) -> str | None:
+        raw_url = self.raw_url(url)
+        if raw_url is None:
+            return None
+
+        page = await fetcher.fetch(raw_url, content_types=TEXT_CONTENT_TYPES)
+        return None if page is None else page.html
+
+
+SOURCES: dict[str, Source] = {}
+
+
+def register_source(source: Source) -> Source:
+    """Add a source, later registered sources with the same name replace earlier ones."""
+    SOURCES[source.name] = source
+    return source
+
+
+def find_source(url: str, name: str | None = None) -> Source | None:
+    """The source named by `Document.source`, or the first registered source matching the URL."""
+    if name == PAGE_SOURCE:
+        return None
+    if name is not None:
+        return SOURCES[name]
+    return next((source for source in SOURCES.values() if source.matches(url)), None)
+
+
+register_source(GoogleDocsSource())
+register_source(DocusaurusSource())
+register_source(GitHubSource())
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+from typing import Protocol
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+def fingerprint(*parts: str) -> str:
+    """Return a stable sha256 hex digest of the given strings."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Store(Protocol):
+    async def get(self, key: str) -> str | None: ...
+
+    async def set(self, key: str, value: str, ttl: int | None = None) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class RedisStore:
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+
+    async def get(self, key: str) -> str | None:
+        value = await self.redis.get(key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return str(value)
+
+    async def set(self, key: str, value: str, ttl: int | None = None) -> None:
+        await self.redis.set(key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.redis.delete(key)
+
+
+class FileStore:
+    """Keep each key in its own file under `root`. Keys do not expire, the ttl is for shared stores."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / quote(key, safe="")
+
+    async def get(self, key: str) -> str | None:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    async def set(self, key: str, value: str, ttl: int | None = None) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(value, encoding="utf-8")
+        tmp.replace(path)
+
+    async def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+def get_store(redis: Redis | None, cache_dir: str | Path) -> Store:
+    if redis is not None:
+        return RedisStore(redis)
+    return FileStore(cache_dir)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import os
+from functools import cache
+from typing import Any
+
+import tiktoken
+from loguru import logger
+
+# rough average for English prose and markdown when the tokenizer can not be loaded
+CHARS_PER_TOKEN = 4
+
+
+@cache
+def _get_encoding(model: str) -> Any:
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # the encoding files are downloaded on first use, which fails offline
+        logger.warning(
+            "unable to load the tokenizer for {}, estimating tokens from the length. Got error: {}", model, e
+        )
+        return None
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Count tokens with the tokenizer of the model, or estimate from the text length if it can not be loaded."""
+    if model is None:
+        model = os.getenv("OPENAI_MODEL", "gpt-4o")
+
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
@@ -2,8 +2,6 @@ import base64
 import os
 from pathlib import Path
 
-import logfire
-import nest_asyncio
 import yaml
 from loguru import logger
 
@@ -46,6 +44,9 @@ def configure_langfuse(service_name: str | None = None) -> None:
     os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = host + "/api/public/otel"
     os.environ["OTEL_EXPORTER_OTLP_HEADERS"] = f"Authorization=Basic {langfuse_auth}"
 
+    import logfire
+    import nest_asyncio
+
     nest_asyncio.apply()
 
     logger.info("Configuring Logfire...")
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import random
+import signal
+import time
+from dataclasses import dataclass
+
+from loguru import logger
+
+from .app import App
+from .changelog import Changelog
+from .config import Document
+from .metrics import Metrics
+
+
+@dataclass
+class PollSchedule:
+    """When to check a document next.
+
+    The interval drops to `min_interval` after a change and is multiplied by `backoff`
+    after every check without one, up to `max_interval`. Each wait is scaled by a
+    random factor within `jitter`, so checks of docs on the same host drift apart.
+    """
+
+    min_interval: float
+    max_interval: float
+    backoff: float = 2.0
+    jitter: float = 0.2
+    interval: float = 0.0
+    next_at: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.interval:
+            self.interval = self.min_interval
+
+    def _wait(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self, now: float) -> None:
+        # spread the first checks instead of starting every doc at once
+        self.next_at = now + random.uniform(0, self.jitter * self.interval)
+
+    def update(self, changed: bool, now: float) -> None:
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self.next_at = now + self._wait()
+
+    def retry(self, now: float) -> None:
+        self.next_at = now + self._wait()
+
+
+def has_new_changes(previous: Changelog | None, changelog: Changelog) -> bool:
+    if previous is None:
+        return False
+
+    seen = {change.fingerprint() for change in previous.changes}
+    return (
+        any(change.fingerprint() not in seen for change in changelog.changes)
+        or changelog.upcoming_changes != previous.upcoming_changes
+    )
+
+
+class Watcher:
+    """Keep the browser and clients open and check each document on its own adaptive schedule.
+
+    SIGINT or SIGTERM stops the watcher after the docs being checked are done, then the
+    output file is written and the queued Slack messages are sent.
+    """
+
+    def __init__(self, app: App) -> None:
+        self.app = app
+        self.config = app.config
+        self.schedules = {
+            doc.name: PollSchedule(
+                min_interval=doc.poll_interval or self.config.watch_min_interval,
+                max_interval=self.config.watch_max_interval,
+                backoff=self.config.watch_backoff,
+                jitter=self.config.watch_jitter,
+            )
+            for doc in self.config.docs
+        }
+        self.latest: dict[str, Changelog] = {}
+        self.stopped = asyncio.Event()
+
+    def stop(self) -> None:
+        logger.info("stopping, finishing the docs in flight")
+        self.stopped.set()
+
+    async def check(self, docs: list[Document]) -> None:
+        app = self.app
+        app.metrics = Metrics()
+        changelogs = await asyncio.gather(*[app.process_doc(doc) for doc in docs])
+
+        now = time.monotonic()
+        changed = []
+        for doc, changelog in zip(docs, changelogs, strict=True):
+            if doc.name in app.metrics.counters["errors"]:
+                # keep the last good changelog and retry on the current interval
+                self.schedules[doc.name].retry(now)
+                continue
+
+            new_changes = has_new_changes(self.latest.get(doc.name), changelog)
+            if new_changes or doc.name not in self.latest:
+                changed.append((doc, changelog.model_copy(deep=True)))
+            self.latest[doc.name] = changelog
+            self.schedules[doc.name].update(new_changes, now)
+            logger.info("next check of {} in {:.0f} seconds", doc.name, self.schedules[doc.name].next_at - now)
+
+        if changed:
+            self.write_file()
+            # dedupe filters the changes that were posted before
+            app.results = changed
+            await app.post_slack_message()
+
+        app.report_metrics()
+
+    def write_file(self) -> None:
+        self.app.results = [(doc, self.latest[doc.name]) for doc in self.config.docs if doc.name in self.latest]
+        self.app.write_file()
+
+    async def _run(self) -> None:
+        if not self.config.docs:
+            return
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        now = time.monotonic()
+        for schedule in self.schedules.values():
+            schedule.start(now)
+
+        # leaving the slack queue flushes the pending messages
+        async with self.app.slack:
+            async with self.app.fetcher, self.app.scraper, self.app.converter:
+                while not self.stopped.is_set():
+                    now = time.monotonic()
+                    due = [doc for doc in self.config.docs if self.schedules[doc.name].next_at <= now]
+                    if due:
+                        await self.check(due)
+                        continue
+
+                    wait = min(schedule.next_at for schedule in self.schedules.values()) - now
+                    with contextlib.suppress(TimeoutError):
+                        await asyncio.wait_for(self.stopped.wait(), timeout=wait)
+
+            if self.latest:
+                self.write_file()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+
+    def run(self) -> None:
+        asyncio.run(self._run())
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog.config import Config
+from exchange_changelog.config import Document
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    return Config(
+        docs=[
+            Document(name="Binance Spot", url="https://developers.binance.com/docs/spot/CHANGELOG"),
+            Document(name="Binance Margin", url="https://developers.binance.com/docs/margin/change-log"),
+            Document(name="Binance Derivatives", url="https://developers.binance.com/docs/derivatives/change-log"),
+            Document(name="Bybit", url="https://bybit-exchange.github.io/docs/changelog/v5"),
+            Document(name="Kraken", url="https://docs.kraken.com/api/docs/change-log"),
+        ],
+        max_concurrency=4,
+        max_concurrency_per_host=2,
+        cache_dir=str(tmp_path / "cache"),
+        convert_workers=0,
+    )
@@ -0,0 +1,163 @@
+"""A small in-memory stand-in for redis.asyncio.Redis, covering the commands the app uses."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.data: dict[str, bytes] = {}
+        self.expires: dict[str, float] = {}
+        self.lists: dict[str, list[bytes]] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.round_trips = 0
+
+    def _expire_keys(self) -> None:
+        now = time.monotonic()
+        for key, expires_at in list(self.expires.items()):
+            if expires_at <= now:
+                self.data.pop(key, None)
+                del self.expires[key]
+
+    def _set(self, key: str, value: Any, nx: bool = False, ex: int | None = None) -> bool | None:
+        self._expire_keys()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+        else:
+            self.expires.pop(key, None)
+        return True
+
+    async def get(self, key: str) -> bytes | None:
+        self.round_trips += 1
+        self._expire_keys()
+        return self.data.get(key)
+
+    async def set(self, key: str, value: Any, nx: bool = False, ex: int | None = None) -> bool | None:
+        self.round_trips += 1
+        return self._set(key, value, nx=nx, ex=ex)
+
+    async def exists(self, key: str) -> int:
+        self.round_trips += 1
+        self._expire_keys()
+        return int(key in self.data)
+
+    def _rpush(self, key: str, *values: Any) -> int:
+        items = self.lists.setdefault(key, [])
+        items.extend(value if isinstance(value, bytes) else str(value).encode() for value in values)
+        return len(items)
+
+    def _lrem(self, key: str, count: int, value: Any) -> int:
+        value = value if isinstance(value, bytes) else str(value).encode()
+        items = self.lists.get(key, [])
+        self.lists[key] = [item for item in items if item != value]
+        return len(items) - len(self.lists[key])
+
+    def _hset(self, key: str, field: Any, value: Any) -> int:
+        field = field if isinstance(field, bytes) else str(field).encode()
+        fields = self.hashes.setdefault(key, {})
+        new = field not in fields
+        fields[field] = value if isinstance(value, bytes) else str(value).encode()
+        return int(new)
+
+    def _delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            found = [self.data.pop(key, None), self.lists.pop(key, None), self.hashes.pop(key, None)]
+            deleted += any(value is not None for value in found)
+            self.expires.pop(key, None)
+        return deleted
+
+    async def rpush(self, key: str, *values: Any) -> int:
+        self.round_trips += 1
+        return self._rpush(key, *values)
+
+    async def lrem(self, key: str, count: int, value: Any) -> int:
+        self.round_trips += 1
+        return self._lrem(key, count, value)
+
+    async def lrange(self, key: str, start: int, end: int) -> list[bytes]:
+        self.round_trips += 1
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    async def blmove(self, source: str, destination: str, timeout: float, src: str, dest: str) -> bytes | None:
+        self.round_trips += 1
+        deadline = time.monotonic() + timeout
+        while not self.lists.get(source):
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(0.01)
+
+        value = self.lists[source].pop(0 if src == "LEFT" else -1)
+        if dest == "LEFT":
+            self.lists.setdefault(destination, []).insert(0, value)
+        else:
+            self._rpush(destination, value)
+        return value
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        self.round_trips += 1
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        self.round_trips += 1
+        self._expire_keys()
+        if key not in self.data:
+            return False
+        self.expires[key] = time.monotonic() + seconds
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        self.round_trips += 1
+        return self._delete(*keys)
+
+    def ttl(self, key: str) -> float | None:
+        expires_at = self.expires.get(key)
+        return None if expires_at is None else expires_at - time.monotonic()
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> FakePipeline:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        self.commands = []
+
+    def set(self, key: str, value: Any, nx: bool = False, ex: int | None = None) -> FakePipeline:
+        self.commands.append(("_set", (key, value), {"nx": nx, "ex": ex}))
+        return self
+
+    def rpush(self, key: str, *values: Any) -> FakePipeline:
+        self.commands.append(("_rpush", (key, *values), {}))
+        return self
+
+    def lrem(self, key: str, count: int, value: Any) -> FakePipeline:
+        self.commands.append(("_lrem", (key, count, value), {}))
+        return self
+
+    def hset(self, key: str, field: Any, value: Any) -> FakePipeline:
+        self.commands.append(("_hset", (key, field, value), {}))
+        return self
+
+    def delete(self, *keys: str) -> FakePipeline:
+        self.commands.append(("_delete", keys, {}))
+        return self
+
+    async def execute(self) -> list[Any]:
+        self.redis.round_trips += 1
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
@@ -0,0 +1,282 @@
+import asyncio
+import random
+from datetime import date
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+
+from exchange_changelog import app as app_module
+from exchange_changelog.app import App
+from exchange_changelog.changelog import Change
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.config import Config
+from exchange_changelog.fetcher import StaticPage
+from exchange_changelog.metrics import record_usage
+from exchange_changelog.scraper import PageOptions
+
+from .fake_redis import FakeRedis
+from .test_changelog import make_change
+
+
+async def no_static_page(
+    url: str, content_types: tuple[str, ...] = ("html",), remember: bool = True
+) -> StaticPage | None:
+    return None
+
+
+def test_run_keeps_config_order_and_limits_hosts(config: Config, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+
+    in_flight: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        host = url.split("/")[2]
+        in_flight[host] = in_flight.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), in_flight[host])
+        await asyncio.sleep(random.uniform(0.001, 0.01))
+        in_flight[host] -= 1
+        return f"<p>{url}</p>"
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        await asyncio.sleep(random.uniform(0.001, 0.01))
+        return Changelog(changes=[], upcoming_changes=text)
+
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+
+    asyncio.run(app._run())
+
+    assert [doc.name for doc, _ in app.results] == [doc.name for doc in config.docs]
+    assert [changelog.upcoming_changes for _, changelog in app.results] == [doc.url for doc in config.docs]
+    assert peak["developers.binance.com"] <= config.max_concurrency_per_host
+
+
+def test_unchanged_page_skips_extraction(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pages = {doc.url: f"<p>{doc.name}</p>" for doc in config.docs}
+    calls: list[str] = []
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return pages[url]
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        calls.append(text)
+        return Changelog(changes=[], upcoming_changes=text)
+
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+
+    def run() -> App:
+        app = App(config=config, output_file=tmp_path / "changelog.md")
+        monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+        monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+        monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+        asyncio.run(app._run())
+        return app
+
+    run()
+    assert len(calls) == len(config.docs)
+
+    calls.clear()
+    app = run()
+    assert calls == []
+    assert app.metrics.counters["unchanged_skips"] == {doc.name: 1 for doc in config.docs}
+    assert [changelog.upcoming_changes for _, changelog in app.results] == [doc.name for doc in config.docs]
+
+    pages[config.docs[0].url] = "<p>updated</p>"
+    run()
+    assert calls == ["updated"]
+
+
+def test_incremental_extraction(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:1]
+    config.incremental = True
+    page = "<h2>2024-03-01</h2><ul><li>b</li></ul><h2>2024-01-05</h2><ul><li>a</li></ul>"
+    calls: list[str] = []
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return page
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        calls.append(text)
+        return Changelog(changes=[], upcoming_changes="")
+
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+
+    def run() -> None:
+        app = App(config=config, output_file=tmp_path / "changelog.md")
+        monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+        monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+        monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+        asyncio.run(app._run())
+
+    run()
+    assert calls == ["## 2024-03-01\n* b\n## 2024-01-05\n* a"]
+
+    page = "<h2>2024-04-01</h2><ul><li>c</li></ul>" + page
+    run()
+    assert calls[1] == "## 2024-04-01\n* c"
+
+
+def test_post_slack_message_dedupes_changes(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    redis = FakeRedis()
+    posted: list[str] = []
+
+    def run(changes: list[Change]) -> list[str]:
+        app = App(config=config, output_file=tmp_path / "changelog.md")
+        monkeypatch.setattr(app.slack, "post", posted.append)
+        app.redis = redis  # type: ignore[assignment]
+        app.results = [(config.docs[0], Changelog(changes=changes, upcoming_changes=""))]
+        redis.round_trips = 0
+        asyncio.run(app.post_slack_message())
+        assert redis.round_trips == 1
+        return [change.date for _, changelog in app.results for change in changelog.changes]
+
+    assert run([make_change("2024-01-02", "b"), make_change("2024-01-01", "a")]) == ["2024-01-02", "2024-01-01"]
+    assert len(posted) == 1
+
+    # seen changes are dropped, an edited entry on a seen date is new
+    assert run([make_change("2024-01-02", "b"), make_change("2024-01-01", "a, edited")]) == ["2024-01-01"]
+    assert run([make_change("2024-01-02", " B ")]) == []
+    assert len(posted) == 2
+
+    ttl = redis.ttl(next(iter(redis.data)))
+    assert ttl is not None
+    assert 0 < ttl <= config.dedupe_ttl
+
+
+def test_run_reports_metrics(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:2]
+    config.metrics_file = str(tmp_path / "metrics" / "exchange_changelog.prom")
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return "<p>page</p>"
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        # what lazy_run reports after the model call
+        record_usage(input_tokens=100, output_tokens=20)
+        return Changelog(changes=[], upcoming_changes="")
+
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    asyncio.run(app._run())
+
+    assert app.metrics.counters["input_tokens"] == {"Binance Spot": 100, "Binance Margin": 100}
+    assert app.metrics.counters["output_tokens"] == {"Binance Spot": 20, "Binance Margin": 20}
+    assert app.metrics.counters["rendered"] == {"Binance Spot": 1, "Binance Margin": 1}
+    assert set(app.metrics.timings["Binance Spot"]) == {"source", "fetch", "render", "convert", "llm"}
+    assert "slack" in app.metrics.timings[""]
+
+    text = Path(config.metrics_file).read_text()
+    assert 'exchange_changelog_input_tokens_last_run{doc="Binance Spot"} 100' in text
+    assert 'exchange_changelog_stage_seconds{doc="Binance Margin",stage="llm"}' in text
+
+
+def test_rules_parser_bypasses_the_llm(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:2]
+    config.num_days = 36500
+    for doc in config.docs:
+        doc.parser = "rules"
+    pages = {
+        config.docs[0].url: (Path(__file__).parent / "fixtures" / "pages" / "binance_spot.html").read_text(),
+        config.docs[1].url: "<h2>2025-01-01</h2><p>Some prose about the release.</p>",
+    }
+    calls: list[str] = []
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return pages[url]
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        calls.append(text)
+        return Changelog(changes=[], upcoming_changes="")
+
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    asyncio.run(app._run())
+
+    assert calls == ["## 2025-01-01\nSome prose about the release."]
+    assert len(app.results[0][1].changes) == 8
+    assert app.metrics.counters["rules_parsed"] == {"Binance Spot": 1}
+    assert app.metrics.counters["rules_fallbacks"] == {"Binance Margin": 1}
+
+
+def test_history_index_keeps_old_changes(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:1]
+    config.history_db = str(tmp_path / "history.sqlite3")
+    today = date.today()
+    changes = [
+        make_change(today.isoformat(), "recent"),
+        make_change((today - timedelta(days=365)).isoformat(), "old"),
+        make_change("not a date", "undated"),
+    ]
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return "<p>page</p>"
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        return Changelog(changes=changes, upcoming_changes="")
+
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    asyncio.run(app._run())
+
+    assert app.results[0][1].changes == changes[:1]
+    assert app.history is not None
+    assert [result.items for result in app.history.search(doc="Binance Spot")] == [["recent"], ["old"]]
+
+
+def test_client_side_rendered_page_is_rendered_after_a_304(
+    config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config.docs = config.docs[-1:]
+    shell = '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+    rendered = "<main><h2>2025-04-01</h2>" + "<p>rendered changelog entry</p>" * 30 + "</main>"
+    renders: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"shell"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=shell, headers={"ETag": '"shell"', "Content-Type": "text/html"})
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        renders.append(url)
+        return rendered
+
+    async def scrape_twice() -> list[str]:
+        results = []
+        for _ in range(2):
+            app = App(config=config, output_file=tmp_path / "changelog.md")
+            app.fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+            results.append(await app.scrape(config.docs[0]))
+        return results
+
+    first, second = asyncio.run(scrape_twice())
+
+    assert "rendered changelog entry" in first
+    assert second == first
+    assert renders == [config.docs[0].url] * 2
+    assert not list((tmp_path / "cache").glob("http*"))
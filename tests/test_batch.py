@@ -0,0 +1,172 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog.app import App
+from exchange_changelog.batch import BatchExtractor
+from exchange_changelog.batch import BatchJob
+from exchange_changelog.batch import build_request
+from exchange_changelog.batch import parse_results
+from exchange_changelog.batch import split_requests
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.config import Config
+from exchange_changelog.scraper import PageOptions
+
+from .test_app import no_static_page
+from .test_changelog import make_change
+
+
+class LocalBatchClient:
+    """Answers each request with one change dated by the text, after a couple of status checks."""
+
+    def __init__(self, fail: set[str] | None = None) -> None:
+        self.fail = fail or set()
+        self.batches: dict[str, list[dict]] = {}
+        self.checks: dict[str, int] = {}
+        self.files: dict[str, str] = {}
+
+    async def submit(self, path: Path) -> str:
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = [json.loads(line) for line in path.read_text().splitlines()]
+        self.checks[batch_id] = 0
+        return batch_id
+
+    async def retrieve(self, batch_id: str) -> BatchJob:
+        self.checks[batch_id] += 1
+        if self.checks[batch_id] < 3:
+            return BatchJob(id=batch_id, status="in_progress")
+
+        lines = []
+        for request in self.batches[batch_id]:
+            custom_id = request["custom_id"]
+            if custom_id in self.fail:
+                lines.append({"custom_id": custom_id, "response": {"status_code": 500, "body": {}}, "error": None})
+                continue
+
+            text = request["body"]["messages"][-1]["content"]
+            changelog = Changelog(changes=[make_change("2099-01-01", text)], upcoming_changes="")
+            body = {"choices": [{"message": {"role": "assistant", "content": changelog.model_dump_json()}}]}
+            lines.append({"custom_id": custom_id, "response": {"status_code": 200, "body": body}, "error": None})
+
+        self.files[f"file_{batch_id}"] = "\n".join(json.dumps(line) for line in lines)
+        return BatchJob(id=batch_id, status="completed", output_file_id=f"file_{batch_id}")
+
+    async def download(self, file_id: str) -> str:
+        return self.files[file_id]
+
+
+def test_build_request() -> None:
+    request = build_request("Bybit", "## 2025-01-01", model="gpt-4o-mini")
+
+    assert request["url"] == "/v1/chat/completions"
+    assert request["body"]["model"] == "gpt-4o-mini"
+    assert [message["role"] for message in request["body"]["messages"]] == ["system", "user"]
+    assert request["body"]["response_format"]["json_schema"]["strict"] is True
+
+
+def test_split_requests_by_tokens() -> None:
+    requests = [build_request(str(i), "word " * 1000, model="gpt-4o", prompt="") for i in range(5)]
+
+    batches = split_requests(requests, max_tokens=2500)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert split_requests(requests[:1], max_tokens=1) == [requests[:1]]
+
+
+def test_parse_results_skips_failures() -> None:
+    ok = Changelog(changes=[], upcoming_changes="soon")
+    lines = [
+        {
+            "custom_id": "a",
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": ok.model_dump_json()}}]}},
+        },
+        {"custom_id": "b", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "{}"}}]}}},
+        {"custom_id": "c", "response": None, "error": {"code": "server_error"}},
+    ]
+
+    assert parse_results("\n".join(json.dumps(line) for line in lines)) == {"a": ok}
+
+
+def test_extractor_submits_one_batch_at_a_time(tmp_path: Path) -> None:
+    client = LocalBatchClient()
+    extractor = BatchExtractor(client=client, directory=tmp_path, prompt="", max_tokens=600, poll_interval=0)
+
+    changelogs = asyncio.run(extractor.extract({str(i): f"text {i} " + "word " * 500 for i in range(3)}))
+
+    assert len(client.batches) == 3
+    assert sorted(changelogs) == ["0", "1", "2"]
+    assert len(list(tmp_path.glob("*.jsonl"))) == 3
+
+
+def test_run_batch(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.num_days = 36500
+    pages = {doc.url: f"<p>{doc.name}</p>" for doc in config.docs}
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return pages[url]
+
+    def run(client: LocalBatchClient) -> App:
+        app = App(config=config, output_file=tmp_path / "changelog.md")
+        monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+        monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+        monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+        config.batch_poll_interval = 0
+        asyncio.run(app._run_batch(client))
+        return app
+
+    client = LocalBatchClient(fail={"Bybit"})
+    app = run(client)
+
+    assert len(client.batches) == 1
+    assert [doc.name for doc, _ in app.results] == [doc.name for doc in config.docs]
+    items = {
+        doc.name: [item for change in changelog.changes for item in change.items] for doc, changelog in app.results
+    }
+    assert items["Binance Spot"] == ["Binance Spot"]
+    assert items["Bybit"] == []
+    assert app.metrics.counters["errors"] == {"Bybit": 1}
+    assert "Binance Spot" in (tmp_path / "changelog.md").read_text()
+
+    # only the doc that failed or changed is submitted again
+    pages[config.docs[0].url] = "<p>updated</p>"
+    client = LocalBatchClient()
+    app = run(client)
+
+    assert sorted(request["custom_id"] for request in client.batches["batch_0"]) == ["Binance Spot", "Bybit"]
+    assert app.results[0][1].changes[0].items == ["updated"]
+
+
+class FailingBatchClient(LocalBatchClient):
+    async def submit(self, path: Path) -> str:
+        raise RuntimeError("upload failed")
+
+
+def test_run_batch_reports_a_failed_batch(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.num_days = 36500
+    config.batch_poll_interval = 0
+    pages = {doc.url: f"<p>{doc.name}</p>" for doc in config.docs}
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return pages[url]
+
+    def run(client: LocalBatchClient, posted: list[str]) -> App:
+        app = App(config=config, output_file=tmp_path / "changelog.md")
+        monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+        monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+        monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+        monkeypatch.setattr(app.slack, "post", posted.append)
+        asyncio.run(app._run_batch(client))
+        return app
+
+    run(LocalBatchClient(), [])
+    pages[config.docs[0].url] = "<p>updated</p>"
+    posted: list[str] = []
+    app = run(FailingBatchClient(), posted)
+
+    # only the changed doc was in the batch, the unchanged ones are still written and posted
+    assert app.metrics.counters["errors"] == {"Binance Spot": 1}
+    assert "unable to extract changelog for Binance Spot, got: upload failed" in posted
+    assert app.results[1][1].changes[0].items == ["Binance Margin"]
+    assert "Binance Margin" in (tmp_path / "changelog.md").read_text()
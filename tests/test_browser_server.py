@@ -0,0 +1,115 @@
+import asyncio
+import socket
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import playwright.async_api
+import pytest
+
+from exchange_changelog.browser_server import BrowserServer
+
+# stands in for chromium, serving /json/version on the --remote-debugging-port it is given
+FAKE_CHROMIUM = f"""#!{sys.executable}
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+port = next(int(arg.split("=", 1)[1]) for arg in sys.argv if arg.startswith("--remote-debugging-port="))
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({{"webSocketDebuggerUrl": f"ws://127.0.0.1:{{port}}/devtools/browser/fake"}}).encode()
+        self.send_response(200 if self.path == "/json/version" else 404)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+HTTPServer(("127.0.0.1", port), Handler).serve_forever()
+"""
+
+
+@pytest.fixture
+def fake_chromium(tmp_path: Path) -> str:
+    path = tmp_path / "chromium"
+    path.write_text(FAKE_CHROMIUM)
+    path.chmod(0o755)
+    return str(path)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def test_browser_server_restarts_the_browser(fake_chromium: str) -> None:
+    server = BrowserServer(port=free_port(), executable=fake_chromium, health_interval=0.05)
+
+    async def run() -> None:
+        await server.start()
+        assert await server.healthy()
+        supervisor = asyncio.create_task(server.supervise())
+
+        assert server._process is not None
+        server._process.kill()
+        while server.restarts == 0 or not await server.healthy():
+            await asyncio.sleep(0.05)
+
+        server.stop()
+        await supervisor
+        await server.close()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+    assert server.restarts == 1
+    assert server._process is None
+
+
+def test_browser_server_fails_when_the_browser_exits(tmp_path: Path) -> None:
+    executable = tmp_path / "chromium"
+    executable.write_text(f"#!{sys.executable}\nraise SystemExit(1)\n")
+    executable.chmod(0o755)
+    server = BrowserServer(port=free_port(), executable=str(executable))
+
+    async def run() -> None:
+        try:
+            await server.start()
+        finally:
+            await server.close()
+
+    with pytest.raises(RuntimeError, match="exited with code 1"):
+        asyncio.run(run())
+
+
+class FakePlaywright:
+    def __init__(self, executable_path: str) -> None:
+        self.chromium = SimpleNamespace(executable_path=executable_path)
+
+    async def __aenter__(self) -> "FakePlaywright":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+def test_browser_server_finds_the_playwright_chromium(fake_chromium: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(playwright.async_api, "async_playwright", lambda: FakePlaywright(fake_chromium))
+    server = BrowserServer(port=free_port())
+
+    async def run() -> None:
+        # started inside the running loop, as `run()` does
+        try:
+            await server.start()
+            assert await server.healthy()
+        finally:
+            await server.close()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+    assert server.executable == fake_chromium
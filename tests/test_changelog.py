@@ -0,0 +1,146 @@
+import asyncio
+from datetime import date
+from typing import Any
+
+import pytest
+
+from exchange_changelog import changelog as changelog_module
+from exchange_changelog.changelog import Category
+from exchange_changelog.changelog import Change
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.changelog import Reasoning
+from exchange_changelog.changelog import SlimChange
+from exchange_changelog.changelog import SlimChangelog
+from exchange_changelog.changelog import check_changelog
+from exchange_changelog.changelog import extract_changelog
+from exchange_changelog.changelog import reduce_changelogs
+from exchange_changelog.metrics import Metrics
+
+
+def make_change(date: str, *items: str) -> Change:
+    return Change(
+        reasoning=Reasoning(steps=[], final_output=""),
+        date=date,
+        items=list(items),
+        keywords=[],
+        categories=[],
+    )
+
+
+def test_merge() -> None:
+    previous = Changelog(
+        changes=[make_change(f"2024-01-{day:02d}", "old") for day in range(10, 0, -1)],
+        upcoming_changes="old upcoming",
+    )
+    update = Changelog(
+        changes=[make_change("2024-02-01", "new"), make_change("2024-01-10", "edited")],
+        upcoming_changes="new upcoming",
+    )
+
+    merged = previous.merge(update)
+
+    assert [change.date for change in merged.changes] == ["2024-02-01"] + [
+        f"2024-01-{day:02d}" for day in range(10, 1, -1)
+    ]
+    assert merged.changes[1].items == ["edited"]
+    assert merged.upcoming_changes == "new upcoming"
+
+
+def test_reduce_changelogs() -> None:
+    first = make_change("2024-01-02", "Add endpoint", "Fix bug")
+    first.categories = [Category.NEW_FEATURES]
+    second = make_change("2024-01-02", "add  endpoint", "Deprecate field")
+    second.categories = [Category.NEW_FEATURES, Category.DEPRECATIONS]
+
+    reduced = reduce_changelogs(
+        [
+            Changelog(
+                changes=[first] + [make_change(f"2023-12-{day:02d}", "old") for day in range(1, 10)],
+                upcoming_changes="",
+            ),
+            Changelog(changes=[second, make_change("2024-01-01", "new")], upcoming_changes="soon"),
+            Changelog(changes=[], upcoming_changes="soon"),
+        ]
+    )
+
+    assert len(reduced.changes) == 10
+    assert [change.date for change in reduced.changes[:3]] == ["2024-01-02", "2024-01-01", "2023-12-09"]
+    assert reduced.changes[0].items == ["Add endpoint", "Fix bug", "Deprecate field"]
+    assert reduced.changes[0].categories == [Category.NEW_FEATURES, Category.DEPRECATIONS]
+    assert reduced.upcoming_changes == "soon"
+    # the inputs are left untouched
+    assert first.items == ["Add endpoint", "Fix bug"]
+
+
+def test_extract_changelog_in_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    inputs: list[str] = []
+
+    async def fake_lazy_run(input: str, **kwargs: object) -> Changelog:
+        inputs.append(input)
+        dates = [line[3:] for line in input.splitlines() if line.startswith("## ")]
+        return Changelog(changes=[make_change(date, "change") for date in dates], upcoming_changes="")
+
+    monkeypatch.setattr(changelog_module, "lazy_run", fake_lazy_run)
+    text = "\n".join(f"## 2024-01-{day:02d}\n" + "- change\n" * 50 for day in range(12, 0, -1))
+
+    changelog = asyncio.run(extract_changelog(text, chunk_tokens=200))
+
+    assert len(inputs) > 1
+    assert [change.date for change in changelog.changes] == [f"2024-01-{day:02d}" for day in range(12, 2, -1)]
+
+    inputs.clear()
+    asyncio.run(extract_changelog(text, chunk_tokens=None))
+    assert inputs == [text]
+
+
+PAGE = "# Changelog\n\n## 2025-04-08\n\n- Removed an endpoint\n\n## 2025-03-21\n\n- Added an endpoint\n"
+
+
+@pytest.mark.parametrize(
+    ("changes", "problems"),
+    [
+        ([make_change("2025-04-08", "a"), make_change("2025-03-21", "b")], []),
+        ([make_change("2025-04-08", "a")], []),
+        ([make_change("April 8", "a")], ["unparsable date 'April 8'", "the latest heading 2025-04-08 is missing"]),
+        ([make_change("2025-04-08", "a"), make_change("2025-04-08", "b")], ["duplicate date 2025-04-08"]),
+        ([make_change("2025-04-08", " ")], ["no items on 2025-04-08"]),
+        ([make_change("2025-04-08", "a"), make_change("2025-03-20", "b")], ["2025-03-20 is not a heading of the text"]),
+        ([make_change("2025-03-21", "b")], ["the latest heading 2025-04-08 is missing"]),
+        ([], ["the latest heading 2025-04-08 is missing"]),
+    ],
+)
+def test_check_changelog(changes: list[Change], problems: list[str]) -> None:
+    changelog = Changelog(changes=changes, upcoming_changes="")
+
+    assert check_changelog(changelog, PAGE, today=date(2025, 4, 10)) == problems
+
+
+def test_check_changelog_future_dates() -> None:
+    changelog = Changelog(changes=[make_change("2025-04-08", "a")], upcoming_changes="")
+
+    assert check_changelog(changelog, "no headings", today=date(2025, 4, 7)) == []
+    assert check_changelog(changelog, "no headings", today=date(2025, 4, 6)) == ["future date 2025-04-08"]
+
+
+@pytest.mark.parametrize(("small_date", "escalated"), [("2025-04-08", False), ("2025-04-07", True)])
+def test_extract_changelog_cascade(monkeypatch: pytest.MonkeyPatch, small_date: str, escalated: bool) -> None:
+    models: list[Any] = []
+
+    async def fake_lazy_run(input: str, model: Any = None, output_type: Any = None, **kwargs: object) -> Any:
+        models.append(model)
+        if output_type is SlimChangelog:
+            change = SlimChange(date=small_date, items=["small"], keywords=[], categories=[])
+            return SlimChangelog(changes=[change], upcoming_changes="")
+        return Changelog(changes=[make_change("2025-04-08", "large")], upcoming_changes="")
+
+    monkeypatch.setattr(changelog_module, "lazy_run", fake_lazy_run)
+    monkeypatch.setattr(changelog_module, "get_small_model", lambda: "small")
+    metrics = Metrics()
+
+    with metrics.document("Binance Spot"):
+        changelog = asyncio.run(extract_changelog("## 2025-04-08\n\n- change\n"))
+
+    assert models == (["small", None] if escalated else ["small"])
+    assert changelog.changes[0].items == (["large"] if escalated else ["small"])
+    assert metrics.counters["cascade_escalations" if escalated else "cascade_accepted"] == {"Binance Spot": 1}
+    assert ("cascade_large_seconds" in metrics.counters) == escalated
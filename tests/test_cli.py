@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from exchange_changelog.cli import cli
+
+# the cli used to import the whole app, about 2 seconds, before parsing any argument
+IMPORT_BUDGET_SECONDS = 1.0
+CONFIG_DIR = Path(__file__).parents[1] / "config"
+HEAVY_MODULES = ["agents", "openai", "playwright", "redis", "slack_sdk", "markdownify", "bs4", "httpx"]
+
+
+def test_cli_does_not_import_heavy_dependencies() -> None:
+    code = f"import sys, exchange_changelog.cli; print(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+    assert output.strip() == "[]"
+
+
+def test_cli_import_time() -> None:
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import exchange_changelog.cli"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    # import time: self [us] | cumulative [us] | module
+    cumulative = next(
+        int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.split("|")[-1].strip() == "exchange_changelog.cli"
+    )
+    assert cumulative / 1e6 < IMPORT_BUDGET_SECONDS
+
+
+def test_validate_config(tmp_path: Path) -> None:
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["validate-config", "-c", str(CONFIG_DIR / "default.yaml")])
+    assert result.exit_code == 0, result.output
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "docs:\n"
+        "  - {name: Bybit, url: 'https://bybit-exchange.github.io/docs/changelog/v5', section: '('}\n"
+        "  - {name: Bybit, url: 'bybit-exchange.github.io'}\n"
+        "  - {name: MAX, url: 'https://docs.google.com/document/d/1', source: google-doc}\n"
+    )
+    result = runner.invoke(cli, ["validate-config", "-c", str(config_file)])
+    assert result.exit_code == 1
+    assert "invalid section pattern" in result.output
+    assert "duplicate doc name 'Bybit'" in result.output
+    assert "is not http(s)" in result.output
+    assert "unknown source 'google-doc'" in result.output
+
+    config_file.write_text("docs:\n  - {name: Bybit}\n")
+    result = runner.invoke(cli, ["validate-config", "-c", str(config_file)])
+    assert result.exit_code == 1
+    assert "url" in result.output
@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from exchange_changelog.converter import Converter
+from exchange_changelog.converter import html_to_markdown
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+
+
+@pytest.mark.parametrize(
+    "page, first_line, boilerplate",
+    [
+        (
+            "binance_spot.html",
+            "# CHANGELOG for Binance's API",
+            ["Skip to main content", "Developer Forum", "Edit this page"],
+        ),
+        ("bybit_v5.html", "# Changelog", ["Bybit API Docs", "Copy Trade", "All rights reserved"]),
+        ("bitfinex.html", "## Upcoming Changes", ["Getting Started", "Powered by ReadMe", "Updated 26 days ago"]),
+        ("woox.html", "# Release Note", ["NAV", "Documentation Powered by Slate", "python"]),
+        ("huobi.html", "# Change Log", ["Quick Start\n* "]),
+    ],
+)
+def test_html_to_markdown_prunes_boilerplate(page: str, first_line: str, boilerplate: list[str]) -> None:
+    html = (PAGES_DIR / page).read_text()
+
+    text = html_to_markdown(html)
+
+    assert text.splitlines()[0] == first_line
+    for snippet in boilerplate:
+        assert snippet not in text
+    assert "gtag" not in text
+    assert len(text) < len(html_to_markdown(html, prune=False))
+
+
+def test_html_to_markdown_with_selectors() -> None:
+    html = (PAGES_DIR / "huobi.html").read_text()
+
+    text = html_to_markdown(html, content_selector="body", drop_selectors=["#market-maker-program ~ p"])
+
+    assert "Change Log" in text
+    assert "fee rebates" not in text
+
+
+def test_html_to_markdown_falls_back_to_body() -> None:
+    html = "<html><body><main><p>short</p></main><div>" + "<p>changelog entry</p>" * 20 + "</div></body></html>"
+
+    assert html_to_markdown(html).count("changelog entry") == 20
+
+
+def test_converter_process_pool() -> None:
+    html = (PAGES_DIR / "woox.html").read_text()
+    submitted: list[int] = []
+
+    async def convert(min_size: int) -> str:
+        async with Converter(max_workers=1, min_size=min_size) as converter:
+            assert converter._pool is not None
+            submit = converter._pool.submit
+
+            def counting_submit(fn: Any, /, *args: Any, **kwargs: Any) -> Any:
+                submitted.append(len(args[0]))
+                return submit(fn, *args, **kwargs)
+
+            converter._pool.submit = counting_submit  # type: ignore[method-assign]
+            return await converter(html)
+
+    assert asyncio.run(convert(min_size=0)) == html_to_markdown(html)
+    assert submitted == [len(html)]
+
+    # pages under min_size are converted inline
+    submitted.clear()
+    assert asyncio.run(convert(min_size=len(html) + 1)) == html_to_markdown(html)
+    assert submitted == []
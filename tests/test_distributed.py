@@ -0,0 +1,138 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog import app as app_module
+from exchange_changelog.app import App
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.config import Config
+from exchange_changelog.distributed import Coordinator
+from exchange_changelog.distributed import Worker
+from exchange_changelog.scraper import PageOptions
+
+from .fake_redis import FakeRedis
+from .test_app import no_static_page
+from .test_changelog import make_change
+
+
+def make_app(config: Config, redis: FakeRedis, output_file: Path, monkeypatch: pytest.MonkeyPatch) -> App:
+    app = App(config=config, output_file=output_file)
+    app.redis = redis  # type: ignore[assignment]
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+    return app
+
+
+def make_worker(
+    config: Config, redis: FakeRedis, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, processed: list[str]
+) -> Worker:
+    app = make_app(config, redis, tmp_path / "worker.md", monkeypatch)
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        processed.append(url)
+        if "kraken" in url:
+            raise RuntimeError("page did not load")
+        return f"<p>{url}</p>"
+
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    return Worker(app, idle_timeout=0.5)
+
+
+def test_coordinator_and_workers(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.num_days = 36500
+    redis = FakeRedis()
+    processed: list[str] = []
+    posted: list[str] = []
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        return Changelog(changes=[make_change("2025-01-01", text)], upcoming_changes="")
+
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    workers = [make_worker(config, redis, tmp_path, monkeypatch, processed) for _ in range(2)]
+    app = make_app(config, redis, tmp_path / "changelog.md", monkeypatch)
+    monkeypatch.setattr(app.slack, "post", posted.append)
+    coordinator = Coordinator(app, timeout=10, poll_interval=0.05)
+
+    async def run() -> None:
+        await asyncio.gather(coordinator._run(), *[worker._run() for worker in workers])
+
+    asyncio.run(run())
+
+    # every doc is processed once, by either worker
+    assert sorted(processed) == sorted(doc.url for doc in config.docs)
+    assert [doc.name for doc, _ in app.results] == [doc.name for doc in config.docs]
+    for doc, changelog in app.results[:-1]:
+        assert changelog.changes[0].items == [doc.url]
+    assert app.results[-1][1].changes == []
+    assert app.metrics.counters["errors"] == {"Kraken": 1}
+    assert any("page did not load" in message for message in posted)
+
+    output = (tmp_path / "changelog.md").read_text()
+    assert all(doc.name in output for doc in config.docs)
+    # only the dedupe keys are left behind
+    assert not redis.lists.get(coordinator.queue.pending)
+    assert not redis.lists.get(coordinator.queue.processing)
+    assert not redis.hashes
+    assert all(key.startswith("changelog:") for key in redis.data)
+
+
+def test_crashed_worker_job_is_requeued(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:2]
+    config.queue_lease_ttl = 1
+    redis = FakeRedis()
+    processed: list[str] = []
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        return Changelog(changes=[], upcoming_changes="")
+
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    app = make_app(config, redis, tmp_path / "changelog.md", monkeypatch)
+    coordinator = Coordinator(app, timeout=10, poll_interval=0.05)
+    worker = make_worker(config, redis, tmp_path, monkeypatch, processed)
+    worker.idle_timeout = 2
+
+    async def crash() -> None:
+        # a worker takes the first job and dies before it finishes, its lease runs out
+        while not (job := await coordinator.queue.claim("crashed")):
+            await asyncio.sleep(0.01)
+        await redis.delete(coordinator.queue.lease_key(job[0]))
+        await worker._run()
+
+    async def run() -> None:
+        await asyncio.gather(coordinator._run(), crash())
+
+    asyncio.run(run())
+
+    assert sorted(processed) == sorted(doc.url for doc in config.docs)
+    assert not app.metrics.counters["errors"]
+
+
+@pytest.mark.skipif(not os.getenv("REDIS_TEST_URL"), reason="REDIS_TEST_URL is not set")
+def test_work_queue_with_redis(config: Config) -> None:
+    from redis.asyncio import Redis
+
+    from exchange_changelog.distributed import WorkQueue
+
+    async def run() -> None:
+        redis = Redis.from_url(os.environ["REDIS_TEST_URL"])
+        queue = WorkQueue(redis, name="exchange-changelog-test")
+        job_ids = await queue.enqueue("run", config.docs[:2], ttl=60)
+
+        job = await queue.claim("worker")
+        assert job is not None
+        assert job[0] == job_ids[0]
+        assert job[2] == config.docs[0]
+        await queue.complete(job[0], "run", {"error": "failed"})
+        assert await queue.results("run") == {job_ids[0]: {"error": "failed"}}
+
+        await queue.cleanup("run", job_ids)
+        await redis.delete(queue.pending, queue.processing)
+        await redis.aclose()
+
+    asyncio.run(run())
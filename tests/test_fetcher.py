@@ -0,0 +1,85 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from exchange_changelog.converter import html_to_markdown
+from exchange_changelog.fetcher import HttpFetcher
+from exchange_changelog.fetcher import is_sufficient
+from exchange_changelog.store import FileStore
+from exchange_changelog.store import RedisStore
+
+from .fake_redis import FakeRedis
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+
+
+def test_is_sufficient() -> None:
+    assert is_sufficient(html_to_markdown((PAGES_DIR / "binance_spot.html").read_text()))
+    assert not is_sufficient(html_to_markdown('<html><body><div id="root"></div></body></html>'))
+    assert not is_sufficient("You need to enable JavaScript to run this app.\n" + "lorem ipsum\n" * 100)
+
+
+def test_conditional_requests(tmp_path: Path) -> None:
+    html = (PAGES_DIR / "bybit_v5.html").read_text()
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=html, headers={"ETag": '"v1"', "Content-Type": "text/html"})
+
+    async def fetch_twice() -> tuple:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with HttpFetcher(FileStore(tmp_path), client=client) as fetcher:
+            first = await fetcher.fetch("https://example.com/changelog")
+            second = await fetcher.fetch("https://example.com/changelog")
+            return first, second
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first is not None
+    assert not first.not_modified
+    assert first.html == html
+    assert "If-None-Match" not in requests[0].headers
+
+    assert second is not None
+    assert second.not_modified
+    assert second.html == html
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+
+
+def test_fetch_error_returns_none(tmp_path: Path) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(403, text="Forbidden")
+
+    async def fetch() -> object:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with HttpFetcher(FileStore(tmp_path), client=client) as fetcher:
+            return await fetcher.fetch("https://example.com/changelog")
+
+    assert asyncio.run(fetch()) is None
+
+
+def test_stored_pages_expire(tmp_path: Path) -> None:
+    redis = FakeRedis()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text="<p>page</p>", headers={"ETag": '"v1"', "Content-Type": "text/html"})
+
+    async def fetch() -> None:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with HttpFetcher(RedisStore(redis), client=client, ttl=3600) as fetcher:  # type: ignore[arg-type]
+            page = await fetcher.fetch("https://example.com/a", remember=False)
+            assert page is not None
+            assert await fetcher.store.get("http:https://example.com/a") is None
+
+            await fetcher.remember("https://example.com/a", page)
+            await fetcher.fetch("https://example.com/b")
+
+    asyncio.run(fetch())
+
+    for url in ("https://example.com/a", "https://example.com/b"):
+        ttl = redis.ttl(f"http:{url}")
+        assert ttl is not None and 3500 < ttl <= 3600
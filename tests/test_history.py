@@ -0,0 +1,116 @@
+from datetime import date
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from exchange_changelog.changelog import Category
+from exchange_changelog.changelog import Change
+from exchange_changelog.changelog import Reasoning
+from exchange_changelog.cli import cli
+from exchange_changelog.history import HistoryIndex
+
+
+def make_change(day: str, items: list[str], keywords: list[str], categories: list[Category]) -> Change:
+    return Change(
+        reasoning=Reasoning(steps=[], final_output=""),
+        date=day,
+        items=items,
+        keywords=keywords,
+        categories=categories,
+    )
+
+
+SPOT = [
+    make_change(
+        "2025-04-08",
+        ["Removed the depth endpoint weight override"],
+        ["depth", "rate limits"],
+        [Category.BREAKING_CHANGES],
+    ),
+    make_change("2025-03-21", ["Added the myFilters endpoint"], ["filters"], [Category.NEW_FEATURES]),
+    make_change("2025-02-31", ["Placeholder"], [], []),
+]
+BYBIT = [
+    make_change(
+        "2025-04-01",
+        ["WebSocket order book depth 1000 for spot"],
+        ["websocket", "depth"],
+        [Category.NEW_FEATURES, Category.PERFORMANCE_IMPROVEMENTS],
+    ),
+]
+
+
+def test_search(tmp_path: Path) -> None:
+    index = HistoryIndex(tmp_path / "history.sqlite3")
+    index.upsert("Binance Spot", SPOT)
+    index.upsert("Bybit", BYBIT)
+
+    assert [(r.doc, r.date) for r in index.search()] == [
+        ("Binance Spot", date(2025, 4, 8)),
+        ("Bybit", date(2025, 4, 1)),
+        ("Binance Spot", date(2025, 3, 21)),
+    ]
+    assert [r.date for r in index.search(doc="Binance Spot", since=date(2025, 4, 1))] == [date(2025, 4, 8)]
+    assert [r.date for r in index.search(until=date(2025, 3, 31))] == [date(2025, 3, 21)]
+    assert [r.doc for r in index.search(category="NEW_FEATURES")] == ["Bybit", "Binance Spot"]
+    assert [r.doc for r in index.search(text="depth")] == ["Binance Spot", "Bybit"]
+    assert [r.doc for r in index.search(text="websocket depth")] == ["Bybit"]
+    assert index.search(text='order-book "depth')[0].doc == "Bybit"
+    assert index.search(limit=1)[0].to_change() == SPOT[0]
+
+    result = index.search(doc="Bybit")[0]
+    assert result.categories == ["NEW_FEATURES", "PERFORMANCE_IMPROVEMENTS"]
+    assert result.keywords == ["websocket", "depth"]
+
+
+def test_upsert_replaces_the_change_of_the_same_date(tmp_path: Path) -> None:
+    index = HistoryIndex(tmp_path / "history.sqlite3")
+    index.upsert("Binance Spot", SPOT)
+
+    edited = make_change("2025-04-08", ["Removed the ticker endpoint"], ["ticker"], [Category.DEPRECATIONS])
+    dates = index.upsert("Binance Spot", [edited, SPOT[1]])
+
+    assert dates == {edited.fingerprint(): date(2025, 4, 8), SPOT[1].fingerprint(): date(2025, 3, 21)}
+    assert len(index.search()) == 2
+    assert index.search(text="depth") == []
+    assert index.search(category="BREAKING_CHANGES") == []
+    assert index.search(category="DEPRECATIONS")[0].items == ["Removed the ticker endpoint"]
+
+
+def test_recent_changes(tmp_path: Path) -> None:
+    index = HistoryIndex(tmp_path / "history.sqlite3")
+
+    assert index.recent_changes("Binance Spot", SPOT, since=date(2025, 3, 21)) == SPOT[:2]
+    assert index.recent_changes("Binance Spot", SPOT, since=date(2025, 4, 1)) == SPOT[:1]
+
+
+def test_query(tmp_path: Path) -> None:
+    history_db = tmp_path / "history.sqlite3"
+    index = HistoryIndex(history_db)
+    index.upsert("Binance Spot", SPOT)
+    index.upsert("Bybit", BYBIT)
+    index.close()
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        f"history_db: {history_db}\n"
+        "docs:\n"
+        "  - {name: Bybit, url: 'https://bybit-exchange.github.io/docs/changelog/v5'}\n"
+    )
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli, ["query", "-c", str(config_file), "--category", "new_features", "--since", "2025-04-01"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output == "2025-04-01\tBybit\tNEW_FEATURES,PERFORMANCE_IMPROVEMENTS\t" + BYBIT[0].items[0] + "\n"
+
+    result = runner.invoke(cli, ["query", "-c", str(config_file), "--text", "depth", "--markdown"])
+    assert result.exit_code == 0, result.output
+    assert "# [Bybit](https://bybit-exchange.github.io/docs/changelog/v5)" in result.output
+    assert "- Removed the depth endpoint weight override" in result.output
+
+    config_file.write_text("docs: []\n")
+    result = runner.invoke(cli, ["query", "-c", str(config_file)])
+    assert result.exit_code == 1
+    assert "history_db is not set" in result.output
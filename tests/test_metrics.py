@@ -0,0 +1,74 @@
+from pathlib import Path
+
+from exchange_changelog.metrics import Metrics
+from exchange_changelog.metrics import record_usage
+
+
+def test_record_usage_is_attributed_to_the_current_document() -> None:
+    metrics = Metrics()
+
+    record_usage(input_tokens=1, output_tokens=1)
+    with metrics.document("Bybit"):
+        record_usage(input_tokens=100, output_tokens=20)
+        record_usage(input_tokens=50, output_tokens=10, requests=2)
+
+    assert metrics.counters["input_tokens"] == {"Bybit": 150}
+    assert metrics.counters["output_tokens"] == {"Bybit": 30}
+    assert metrics.counters["llm_requests"] == {"Bybit": 3}
+
+
+def test_timer_accumulates_per_stage() -> None:
+    metrics = Metrics()
+    with metrics.timer("convert", "Bybit"):
+        pass
+    with metrics.timer("convert", "Bybit"):
+        pass
+
+    assert list(metrics.timings["Bybit"]) == ["convert"]
+    assert metrics.timings["Bybit"]["convert"] >= 0
+
+
+def test_write_prometheus(tmp_path: Path) -> None:
+    metrics = Metrics()
+    metrics.inc("bytes_fetched", 'say "hi"', 1024)
+    metrics.timings["Bybit"]["llm"] = 1.5
+
+    path = tmp_path / "textfile" / "exchange_changelog.prom"
+    metrics.write_prometheus(path)
+    lines = path.read_text().splitlines()
+
+    assert "# TYPE exchange_changelog_bytes_fetched_last_run gauge" in lines
+    assert 'exchange_changelog_bytes_fetched_last_run{doc="say \\"hi\\""} 1024' in lines
+    assert 'exchange_changelog_stage_seconds{doc="Bybit",stage="llm"} 1.500000' in lines
+    assert not (tmp_path / "textfile" / "exchange_changelog.prom.tmp").exists()
+
+
+def test_summary() -> None:
+    metrics = Metrics()
+    metrics.timings["Bybit"]["llm"] = 1.5
+    metrics.timings[""]["slack"] = 0.25
+    metrics.inc("input_tokens", "Bybit", 100)
+
+    lines = metrics.summary().splitlines()
+
+    assert lines[0].split() == ["doc", "llm", "s", "slack", "s", "input_tokens", "output_tokens", "unchanged_skips"]
+    assert lines[1].split() == ["(run)", "0.25"]
+    assert lines[2].split() == ["Bybit", "1.50", "100"]
+
+
+def test_cascade_summary() -> None:
+    metrics = Metrics()
+    assert metrics.cascade_summary() is None
+
+    metrics.inc("cascade_accepted", "Binance Spot", 3)
+    metrics.inc("cascade_small_seconds", "Binance Spot", 6)
+    assert metrics.cascade_summary() == (
+        "model cascade: 0 of 3 extractions escalated (0%), no large model calls to estimate the time saved from"
+    )
+
+    metrics.inc("cascade_escalations", "Bybit")
+    metrics.inc("cascade_small_seconds", "Bybit", 2)
+    metrics.inc("cascade_large_seconds", "Bybit", 10)
+    assert metrics.cascade_summary() == (
+        "model cascade: 1 of 4 extractions escalated (25%), about 22.0s of model latency saved"
+    )
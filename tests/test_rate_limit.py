@@ -0,0 +1,233 @@
+import asyncio
+from collections.abc import Iterator
+from typing import Any
+
+import httpx
+import openai
+import pytest
+from agents import ModelResponse
+from agents import set_tracing_disabled
+
+from exchange_changelog import lazy
+from exchange_changelog.lazy import RateLimiter
+from exchange_changelog.lazy import get_openai_client
+from exchange_changelog.lazy import get_openai_model
+from exchange_changelog.lazy import get_rate_limiter
+from exchange_changelog.lazy import lazy_run
+from exchange_changelog.lazy import lazy_run_sync
+from exchange_changelog.metrics import Metrics
+
+from .test_response_cache import Answer
+from .test_response_cache import EchoModel
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def api_error(status_code: int) -> openai.APIStatusError:
+    response: Any = httpx.Response(status_code, request=httpx.Request("POST", "https://api.openai.com/v1/responses"))
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def connection_error(timeout: bool = False) -> openai.APIConnectionError:
+    request: Any = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    return openai.APITimeoutError(request=request) if timeout else openai.APIConnectionError(request=request)
+
+
+class FlakyModel(EchoModel):
+    """Fail with the given status codes or errors first, then answer."""
+
+    def __init__(self, *errors: int | Exception) -> None:
+        super().__init__()
+        self.errors = [api_error(error) if isinstance(error, int) else error for error in errors]
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        if self.errors:
+            raise self.errors.pop(0)
+        return await super().get_response(*args, **kwargs)
+
+
+@pytest.fixture
+def limiter(monkeypatch: pytest.MonkeyPatch) -> Iterator[RateLimiter]:
+    set_tracing_disabled(True)
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "4")
+    monkeypatch.setattr(lazy, "BACKOFF_BASE", 0.01)
+    get_rate_limiter.cache_clear()
+    yield get_rate_limiter()
+    get_rate_limiter.cache_clear()
+
+
+def test_rate_limiter_requests_per_minute() -> None:
+    clock = Clock()
+    limiter = RateLimiter(rpm=2, clock=clock)
+
+    for _ in range(2):
+        call, _ = limiter.try_acquire(10)
+        assert call is not None
+        limiter.release(call, 10)
+
+    clock.now = 15
+    call, wait = limiter.try_acquire(10)
+    assert call is None
+    assert wait == 45
+
+    clock.now = 60
+    call, _ = limiter.try_acquire(10)
+    assert call is not None
+
+
+def test_rate_limiter_tokens_per_minute_uses_actual_usage() -> None:
+    clock = Clock()
+    limiter = RateLimiter(tpm=100, clock=clock)
+
+    first, _ = limiter.try_acquire(80)
+    assert first is not None
+    clock.now = 10
+    call, wait = limiter.try_acquire(30)
+    assert call is None
+    assert wait == 50
+
+    # the first call used fewer tokens than estimated
+    limiter.release(first, 20)
+    call, _ = limiter.try_acquire(30)
+    assert call is not None
+
+    # a call over the whole quota waits for an empty window instead of forever
+    clock.now = 20
+    call, wait = limiter.try_acquire(500)
+    assert call is None
+    assert wait == 50
+    clock.now = 70
+    call, _ = limiter.try_acquire(500)
+    assert call is not None
+
+
+def test_rate_limiter_adapts_concurrency() -> None:
+    limiter = RateLimiter(max_concurrency=4)
+
+    calls = [limiter.try_acquire(1)[0] for _ in range(4)]
+    assert limiter.try_acquire(1)[0] is None
+
+    for call in calls:
+        assert call is not None
+        limiter.release(call, throttled=True)
+    assert limiter.limit == 1
+
+    call, _ = limiter.try_acquire(1)
+    assert call is not None
+    assert limiter.try_acquire(1)[0] is None
+
+    # additive increase, one more call in flight after `limit` successes
+    limiter.release(call)
+    assert limiter.limit == 2
+    for _ in range(10):
+        call, _ = limiter.try_acquire(1)
+        assert call is not None
+        limiter.release(call)
+    assert limiter.limit == 4
+
+
+def test_lazy_run_retries_throttled_calls(limiter: RateLimiter) -> None:
+    model = FlakyModel(429, 503)
+    metrics = Metrics()
+
+    async def run() -> Answer:
+        with metrics.document("doc"):
+            return await lazy_run("hello", model=model, output_type=Answer)
+
+    assert asyncio.run(run()) == Answer(text="hello")
+    assert model.calls == 1
+    assert metrics.counters["llm_retries"] == {"doc": 2}
+    assert limiter.limit < 4
+    assert limiter.in_flight == 0
+    # the window holds the actual usage of the successful call
+    assert limiter.calls[-1].tokens == 15
+
+    model = FlakyModel(500)
+    assert lazy_run_sync("world", model=model, output_type=Answer) == Answer(text="world")
+
+
+def test_lazy_run_retries_connection_errors_and_timeouts(limiter: RateLimiter) -> None:
+    model = FlakyModel(connection_error(), connection_error(timeout=True))
+    metrics = Metrics()
+
+    async def run() -> Answer:
+        with metrics.document("doc"):
+            return await lazy_run("hello", model=model, output_type=Answer)
+
+    assert asyncio.run(run()) == Answer(text="hello")
+    assert metrics.counters["llm_retries"] == {"doc": 2}
+    # the server never answered, so the concurrency is not cut as for throttling
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+    model = FlakyModel(connection_error(timeout=True))
+    assert lazy_run_sync("world", model=model, output_type=Answer) == Answer(text="world")
+    assert limiter.limit == 4
+
+
+class HangingModel(EchoModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = asyncio.Event()
+
+    async def get_response(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        self.started.set()
+        await asyncio.Event().wait()
+        raise AssertionError("never answers")
+
+
+def test_lazy_run_releases_cancelled_calls(limiter: RateLimiter) -> None:
+    model = HangingModel()
+
+    async def run() -> None:
+        task = asyncio.create_task(lazy_run("hello", model=model, output_type=Answer))
+        await model.started.wait()
+        assert limiter.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert limiter.in_flight == 0
+
+
+def test_lazy_run_does_not_retry_client_errors(limiter: RateLimiter) -> None:
+    model = FlakyModel(400)
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(lazy_run("hello", model=model, output_type=Answer))
+    assert limiter.in_flight == 0
+
+
+def test_lazy_run_gives_up_after_max_retries(limiter: RateLimiter, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("LLM_MAX_RETRIES", "2")
+    model = FlakyModel(429, 429, 429)
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(lazy_run("hello", model=model, output_type=Answer))
+    assert model.errors == []
+    assert limiter.limit == 1
+
+
+def test_only_lazy_run_turns_off_the_client_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("AZURE_OPENAI_API_KEY", raising=False)
+    get_openai_client.cache_clear()
+    get_openai_model.cache_clear()
+    try:
+        # callers running the model themselves keep the client's retries
+        model: Any = get_openai_model("gpt-4o")
+        assert model._client.max_retries == openai.DEFAULT_MAX_RETRIES
+
+        agent: Any = lazy._create_agent()
+        assert agent.model._client.max_retries == 0
+    finally:
+        get_openai_client.cache_clear()
+        get_openai_model.cache_clear()
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from agents import Model
+from agents import ModelResponse
+from agents import Usage
+from agents import set_tracing_disabled
+from openai.types.responses import ResponseOutputMessage
+from openai.types.responses import ResponseOutputText
+from pydantic import BaseModel
+
+from exchange_changelog import lazy as lazy_module
+from exchange_changelog.lazy import lazy_run
+from exchange_changelog.lazy import lazy_run_sync
+from exchange_changelog.metrics import Metrics
+from exchange_changelog.response_cache import SQLiteResponseCache
+from exchange_changelog.response_cache import get_response_cache
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class EchoModel(Model):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get_response(
+        self, system_instructions: str | None, input: Any, *args: Any, **kwargs: Any
+    ) -> ModelResponse:
+        self.calls += 1
+        text = input if isinstance(input, str) else str(input[-1]["content"])
+        return ModelResponse(
+            output=[
+                ResponseOutputMessage(
+                    id=f"msg_{self.calls}",
+                    content=[
+                        ResponseOutputText(text=Answer(text=text).model_dump_json(), type="output_text", annotations=[])
+                    ],
+                    role="assistant",
+                    status="completed",
+                    type="message",
+                )
+            ],
+            usage=Usage(requests=1, input_tokens=10, output_tokens=5, total_tokens=15),
+            response_id=None,
+        )
+
+    def stream_response(self, *args: Any, **kwargs: Any) -> Any:
+        # lazy_run never streams
+        raise AssertionError("EchoModel does not stream")
+
+
+@pytest.fixture
+def llm_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    set_tracing_disabled(True)
+    path = tmp_path / "llm.sqlite3"
+    monkeypatch.setenv("LLM_CACHE", str(path))
+    get_response_cache.cache_clear()
+    yield path
+    get_response_cache.cache_clear()
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = SQLiteResponseCache(tmp_path / "llm.sqlite3", max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"
+
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+
+def test_sqlite_cache_expires_entries(tmp_path: Path) -> None:
+    cache = SQLiteResponseCache(tmp_path / "llm.sqlite3", ttl=0)
+    cache.set("a", "1")
+    assert cache.get("a") is None
+
+
+def test_lazy_run_uses_the_cache(llm_cache: Path) -> None:
+    model = EchoModel()
+    metrics = Metrics()
+
+    async def run(input: str, instructions: str = "echo") -> Answer:
+        with metrics.document("doc"):
+            return await lazy_run(input, instructions=instructions, model=model, output_type=Answer)
+
+    assert asyncio.run(run("hello")) == Answer(text="hello")
+    assert asyncio.run(run("hello")) == Answer(text="hello")
+    assert model.calls == 1
+    assert metrics.counters["llm_cache_hits"] == {"doc": 1}
+    assert metrics.counters["input_tokens"] == {"doc": 10}
+
+    # any part of the key changing is a miss
+    asyncio.run(run("hello", instructions="repeat"))
+    asyncio.run(run("world"))
+    assert model.calls == 3
+
+    # the sync variant shares the cache
+    assert lazy_run_sync("world", instructions="echo", model=model, output_type=Answer) == Answer(text="world")
+    assert model.calls == 3
+    assert llm_cache.exists()
+
+
+def test_lazy_run_without_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_tracing_disabled(True)
+    monkeypatch.delenv("LLM_CACHE", raising=False)
+    get_response_cache.cache_clear()
+    model = EchoModel()
+
+    for _ in range(2):
+        asyncio.run(lazy_run("hello", model=model, output_type=Answer))
+
+    assert model.calls == 2
+
+
+class ThreadRecordingCache:
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self.threads: list[int] = []
+
+    def get(self, key: str) -> str | None:
+        self.threads.append(threading.get_ident())
+        return self.data.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.threads.append(threading.get_ident())
+        self.data[key] = value
+
+
+def test_lazy_run_uses_the_cache_off_the_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_tracing_disabled(True)
+    cache = ThreadRecordingCache()
+    monkeypatch.setattr(lazy_module, "get_response_cache", lambda: cache)
+    model = EchoModel()
+
+    async def run() -> int:
+        for _ in range(2):
+            assert await lazy_run("hello", model=model, output_type=Answer) == Answer(text="hello")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+
+    assert model.calls == 1
+    # a miss, the write and a hit
+    assert len(cache.threads) == 3
+    assert loop_thread not in cache.threads
+
+
+def test_lazy_run_without_a_cache_makes_no_thread_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    set_tracing_disabled(True)
+    monkeypatch.setattr(lazy_module, "get_response_cache", lambda: None)
+    to_thread = asyncio.to_thread
+    calls = []
+
+    async def recording_to_thread(func: Any, /, *args: Any, **kwargs: Any) -> Any:
+        calls.append(func)
+        return await to_thread(func, *args, **kwargs)
+
+    monkeypatch.setattr(asyncio, "to_thread", recording_to_thread)
+
+    assert asyncio.run(lazy_run("hello", model=EchoModel(), output_type=Answer)) == Answer(text="hello")
+    assert calls == []
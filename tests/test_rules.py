@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog.changelog import Category
+from exchange_changelog.converter import html_to_markdown
+from exchange_changelog.rules import parse_changelog
+from exchange_changelog.rules import parse_items
+from exchange_changelog.rules import tag_categories
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+SOURCES_DIR = Path(__file__).parent / "fixtures" / "sources"
+
+
+def parse_page(name: str) -> tuple:
+    result = parse_changelog(html_to_markdown((PAGES_DIR / name).read_text()))
+    return result.changelog, result.confidence
+
+
+@pytest.mark.parametrize(
+    "page, num_changes, newest, oldest",
+    [
+        ("binance_spot.html", 8, "2025-09-12", "2025-03-05"),
+        ("bybit_v5.html", 6, "2025-09-04", "2025-06-05"),
+        ("bitfinex.html", 5, "2025-09-10", "2025-05-14"),
+        ("woox.html", 4, "2025-08-28", "2025-06-24"),
+        ("huobi.html", 4, "2025-08-20", "2025-05-07"),
+        ("coinbase_exchange.html", 4, "2025-09-04", "2025-05-20"),
+        ("kraken.html", 4, "2025-09-16", "2025-07-08"),
+        ("bitget.html", 3, "2025-09-11", "2025-08-06"),
+    ],
+)
+def test_parse_fixtures(page: str, num_changes: int, newest: str, oldest: str) -> None:
+    changelog, confidence = parse_page(page)
+
+    assert confidence == 1.0
+    assert len(changelog.changes) == num_changes
+    assert changelog.changes[0].date == newest
+    assert changelog.changes[-1].date == oldest
+    assert all(change.items for change in changelog.changes)
+
+
+def test_parse_nested_bullets() -> None:
+    changelog, _ = parse_page("bybit_v5.html")
+
+    assert changelog.changes[0].items[:2] == [
+        "REST API: Place Order: Add new request parameter `slippageToleranceType`",
+        "REST API: Place Order: Add new request parameter `slippageTolerance`",
+    ]
+    assert changelog.changes[0].keywords[0] == "breakEvenPrice"
+    assert changelog.changes[0].categories == [Category.NEW_FEATURES]
+
+
+def test_parse_labels_and_endpoints() -> None:
+    changelog, _ = parse_page("binance_spot.html")
+    change = next(change for change in changelog.changes if change.date == "2025-07-30")
+
+    assert change.items[0].startswith("REST and WebSocket API: The request weight of `GET /api/v3/depth`")
+    assert change.items[-1].startswith("User Data Streams: Listen tokens created with")
+    assert "/api/v3/depth" in change.keywords
+    assert Category.DEPRECATIONS in change.categories
+
+
+def test_parse_sub_headings() -> None:
+    changelog, _ = parse_page("bitget.html")
+
+    assert changelog.changes[0].items == [
+        "Spot: Added `GET /api/v2/spot/market/merge-depth` precision levels `scale4` and `scale5`.",
+        "Futures: Added the `stpMode` request parameter to `POST /api/v2/mix/order/place-order`.",
+        "Futures: Fixed `GET /api/v2/mix/position/history-position` returning closed positions twice.",
+    ]
+    # the date in the example response is not a change
+    assert changelog.changes[1].items == [
+        "The V1 endpoints are deprecated and will be removed, migrate to the V2 endpoints."
+    ]
+
+
+def test_parse_plain_text_export() -> None:
+    result = parse_changelog((SOURCES_DIR / "max_google_doc.txt").read_text(encoding="utf-8-sig"))
+
+    assert result.confidence == 1.0
+    assert [change.date for change in result.changelog.changes] == ["2025-03-12", "2025-01-20", "2024-11-05"]
+    assert Category.DEPRECATIONS in result.changelog.changes[1].categories
+
+
+def test_tables_lower_confidence() -> None:
+    # parameter tables do not fit in items, so pages like this go to the model
+    changelog, confidence = parse_page("okx_log.html")
+
+    assert confidence < 0.8
+    assert changelog.changes[0].date == "2025-09-18"
+    assert changelog.upcoming_changes.startswith("The changes below will be released")
+
+
+def test_parse_upcoming_changes() -> None:
+    changelog, _ = parse_page("bitfinex.html")
+
+    assert changelog.upcoming_changes.startswith("Starting October 15, 2025")
+
+
+def test_prose_lowers_confidence() -> None:
+    items, confidence = parse_items("## 2025-01-01\nWe changed a few things this week.\nMore on that later.")
+
+    assert items == ["We changed a few things this week.", "More on that later."]
+    assert confidence < 0.8
+
+
+def test_no_dated_headings() -> None:
+    result = parse_changelog("# Introduction\nWelcome.")
+
+    assert result.confidence == 0.0
+    assert result.changelog.changes == []
+
+
+def test_tag_categories() -> None:
+    assert tag_categories("Fixed a bug in `GET /v1/orders`") == [Category.BUG_FIXES]
+    assert tag_categories("Deprecated field, will be removed") == [Category.BREAKING_CHANGES, Category.DEPRECATIONS]
@@ -0,0 +1,252 @@
+import asyncio
+from typing import Any
+
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from exchange_changelog.scraper import PageOptions
+from exchange_changelog.scraper import PageSlot
+from exchange_changelog.scraper import PlaywrightScraper
+from exchange_changelog.scraper import is_blocked
+
+
+@pytest.mark.parametrize(
+    ("resource_type", "url", "allow", "blocked"),
+    [
+        ("document", "https://docs.example.com/changelog", (), False),
+        ("script", "https://docs.example.com/main.js", (), False),
+        ("image", "https://docs.example.com/logo.png", (), True),
+        ("font", "https://fonts.example.com/inter.woff2", (), True),
+        ("script", "https://www.googletagmanager.com/gtm.js", (), True),
+        ("script", "https://widget.intercom.io/widget/abc", (), True),
+        ("script", "https://notintercom.io/widget.js", (), False),
+        ("font", "https://fonts.example.com/inter.woff2", ("font",), False),
+        ("script", "https://widget.intercom.io/widget/abc", ("intercom.io",), False),
+    ],
+)
+def test_is_blocked(resource_type: str, url: str, allow: tuple[str, ...], blocked: bool) -> None:
+    assert is_blocked(resource_type, url, allow) == blocked
+
+
+class FakePage:
+    def __init__(self, goto_error: Exception | None = None) -> None:
+        self.goto_error = goto_error
+        self.calls: list[str] = []
+
+    async def goto(self, url: str, **kwargs: Any) -> None:
+        self.calls.append(f"goto {kwargs['wait_until']}")
+        if self.goto_error is not None:
+            raise self.goto_error
+
+    async def wait_for_selector(self, selector: str, **kwargs: Any) -> None:
+        self.calls.append(f"wait_for_selector {selector}")
+
+    async def evaluate(self, expression: str, arg: Any) -> None:
+        self.calls.append("evaluate")
+        await asyncio.sleep(10)
+
+    async def content(self) -> str:
+        return "<p>content</p>"
+
+
+def load(scraper: PlaywrightScraper, page: FakePage, options: PageOptions) -> str:
+    return asyncio.run(scraper._load(PageSlot(), page, "https://example.com", options))  # type: ignore[arg-type]
+
+
+def test_load_waits_for_the_content_selector() -> None:
+    page = FakePage()
+
+    assert load(PlaywrightScraper(), page, PageOptions(content_selector="article")) == "<p>content</p>"
+    assert page.calls == ["goto domcontentloaded", "wait_for_selector article"]
+
+
+def test_load_takes_the_page_when_the_dom_does_not_settle() -> None:
+    page = FakePage()
+
+    assert load(PlaywrightScraper(ready_timeout=0.01), page, PageOptions()) == "<p>content</p>"
+    assert page.calls == ["goto domcontentloaded", "evaluate"]
+
+
+def test_load_never_navigates_twice() -> None:
+    page = FakePage(goto_error=PlaywrightTimeoutError("Timeout 30000ms exceeded"))
+
+    assert load(PlaywrightScraper(), page, PageOptions()) == "<p>content</p>"
+    assert page.calls == ["goto domcontentloaded"]
+
+    page = FakePage(goto_error=RuntimeError("net::ERR_NAME_NOT_RESOLVED"))
+    with pytest.raises(RuntimeError):
+        load(PlaywrightScraper(), page, PageOptions())
+    assert page.calls == ["goto domcontentloaded"]
+
+
+class FakeChromium:
+    def __init__(self, connect_error: Exception | None = None) -> None:
+        self.connect_error = connect_error
+        self.calls: list[str] = []
+
+    async def _connect(self, call: str) -> str:
+        self.calls.append(call)
+        if self.connect_error is not None:
+            raise self.connect_error
+        return "browser"
+
+    async def connect_over_cdp(self, url: str, **kwargs: Any) -> str:
+        return await self._connect(f"connect_over_cdp {url}")
+
+    async def connect(self, url: str, **kwargs: Any) -> str:
+        return await self._connect(f"connect {url}")
+
+    async def launch(self, **kwargs: Any) -> str:
+        self.calls.append("launch")
+        return "browser"
+
+
+class FakePlaywright:
+    def __init__(self, connect_error: Exception | None = None) -> None:
+        self.chromium = FakeChromium(connect_error)
+
+
+@pytest.mark.parametrize(
+    ("browser_url", "calls"),
+    [
+        (None, ["launch"]),
+        ("http://127.0.0.1:9222", ["connect_over_cdp http://127.0.0.1:9222"]),
+        ("ws://127.0.0.1:9222/devtools/browser/abc", ["connect_over_cdp ws://127.0.0.1:9222/devtools/browser/abc"]),
+        ("ws://127.0.0.1:3000/", ["connect ws://127.0.0.1:3000/"]),
+    ],
+)
+def test_launch_connects_to_the_shared_browser(browser_url: str | None, calls: list[str]) -> None:
+    playwright = FakePlaywright()
+
+    asyncio.run(PlaywrightScraper(browser_url=browser_url)._launch(playwright))  # type: ignore[arg-type]
+
+    assert playwright.chromium.calls == calls
+
+
+def test_launch_falls_back_when_the_shared_browser_is_gone() -> None:
+    playwright = FakePlaywright(connect_error=RuntimeError("connect ECONNREFUSED 127.0.0.1:9222"))
+
+    asyncio.run(PlaywrightScraper(browser_url="http://127.0.0.1:9222")._launch(playwright))  # type: ignore[arg-type]
+
+    assert playwright.chromium.calls == ["connect_over_cdp http://127.0.0.1:9222", "launch"]
+
+
+class PoolPage:
+    def __init__(self, browser: "PoolBrowser", context: "PoolContext") -> None:
+        self.browser = browser
+        self.context = context
+
+    async def goto(self, url: str, **kwargs: Any) -> None:
+        if url in self.browser.crash_on:
+            self.browser.crash_on.discard(url)
+            self.browser.connected = False
+            raise RuntimeError("Target page, context or browser has been closed")
+        if url.endswith("/broken"):
+            raise RuntimeError("net::ERR_CONNECTION_RESET")
+        self.url = url
+
+    async def content(self) -> str:
+        return f"<p>{self.url}</p>"
+
+    def is_closed(self) -> bool:
+        return self.context.closed
+
+
+class PoolContext:
+    def __init__(self, browser: "PoolBrowser") -> None:
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self) -> PoolPage:
+        return PoolPage(self.browser, self)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class PoolBrowser:
+    def __init__(self, crash_on: set[str]) -> None:
+        self.crash_on = crash_on
+        self.connected = True
+        self.contexts: list[PoolContext] = []
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self) -> PoolContext:
+        self.contexts.append(PoolContext(self))
+        return self.contexts[-1]
+
+    async def close(self) -> None:
+        self.connected = False
+
+
+class PoolPlaywright:
+    """Launches fake browsers, the first of which disconnects while loading the URLs in `crash_on`."""
+
+    def __init__(self, crash_on: set[str] | None = None) -> None:
+        self.crash_on = crash_on or set()
+        self.browsers: list[PoolBrowser] = []
+        self.chromium = self
+
+    async def launch(self, **kwargs: Any) -> PoolBrowser:
+        self.browsers.append(PoolBrowser(self.crash_on if not self.browsers else set()))
+        return self.browsers[-1]
+
+    async def stop(self) -> None:
+        pass
+
+
+def pooled(playwright: PoolPlaywright, urls: list[str], **kwargs: Any) -> list[str | Exception]:
+    scraper = PlaywrightScraper(block_requests=False, wait_for_ready=False, **kwargs)
+
+    async def run() -> list[str | Exception]:
+        async with scraper:
+            scraper._playwright = playwright  # type: ignore[assignment]
+            results: list[str | Exception] = []
+            for url in urls:
+                try:
+                    results.append(await scraper.fetch(url))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    return asyncio.run(run())
+
+
+def test_pool_recycles_contexts_after_max_page_uses() -> None:
+    playwright = PoolPlaywright()
+
+    results = pooled(playwright, [f"https://example.com/{i}" for i in range(5)], pool_size=1, max_page_uses=2)
+
+    assert results == [f"<p>https://example.com/{i}</p>" for i in range(5)]
+    (browser,) = playwright.browsers
+    assert [context.closed for context in browser.contexts] == [True, True, True]
+
+
+def test_pool_drops_only_the_context_of_a_failed_load() -> None:
+    playwright = PoolPlaywright()
+    urls = ["https://example.com/a", "https://example.com/b", "https://example.com/broken", "https://example.com/c"]
+
+    results = pooled(playwright, urls, pool_size=2)
+
+    assert isinstance(results[2], RuntimeError)
+    assert results[3] == "<p>https://example.com/c</p>"
+    (browser,) = playwright.browsers
+    # the context of the failed load is closed, the other one was reused for the last url
+    assert len(browser.contexts) == 2
+    assert [context.closed for context in browser.contexts] == [True, True]
+
+
+def test_pool_relaunches_a_disconnected_browser_and_retries_once() -> None:
+    playwright = PoolPlaywright(crash_on={"https://example.com/crash"})
+    urls = ["https://example.com/a", "https://example.com/b", "https://example.com/crash", "https://example.com/c"]
+
+    results = pooled(playwright, urls, pool_size=2)
+
+    assert results == [f"<p>{url}</p>" for url in urls]
+    first, second = playwright.browsers
+    assert len(first.contexts) == 2
+    # the slot still holding a page of the dead browser got a new context instead of being reused
+    assert len(second.contexts) == 2
+    assert all(context.closed for context in first.contexts)
@@ -0,0 +1,177 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog.converter import html_to_markdown
+from exchange_changelog.sections import diff_sections
+from exchange_changelog.sections import parse_date
+from exchange_changelog.sections import parse_headings
+from exchange_changelog.sections import select_recent_sections
+from exchange_changelog.sections import split_sections
+from exchange_changelog.tokens import count_tokens
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+SOURCES_DIR = Path(__file__).parent / "fixtures" / "sources"
+
+
+def load_page(name: str) -> str:
+    # unpruned, so the selection has to skip the navigation on its own
+    return html_to_markdown((PAGES_DIR / name).read_text(), prune=False)
+
+
+@pytest.mark.parametrize(
+    "title, expected",
+    [
+        ("2024-09-20", date(2024, 9, 20)),
+        ("2024-Sep-20", date(2024, 9, 20)),
+        ("1.0.142 2025.08.20", date(2025, 8, 20)),
+        ("Sep 10, 2025", date(2025, 9, 10)),
+        ("September 10th, 2025", date(2025, 9, 10)),
+        ("10 September 2025", date(2025, 9, 10)),
+        ("2025-SEP-04", date(2025, 9, 4)),
+        ("Release 2025.09.11", date(2025, 9, 11)),
+        ("2025/02/30", None),
+        ("REST API", None),
+    ],
+)
+def test_parse_date(title: str, expected: date | None) -> None:
+    assert parse_date(title) == expected
+
+
+@pytest.mark.parametrize(
+    "page, newest, oldest",
+    [
+        ("binance_spot.html", "### 2025-09-12", "### 2025-03-05"),
+        ("bybit_v5.html", "## 2025-09-04", "## 2025-06-05"),
+        ("bitfinex.html", "### Sep 10, 2025", "### May 14, 2025"),
+        ("woox.html", "## 2025-08-28", "## 2025-06-24"),
+        ("huobi.html", "## 1.0.142 2025.08.20", "## 1.0.139 2025.05.07"),
+        ("coinbase_exchange.html", "2025-SEP-04", "2025-MAY-20"),
+        ("kraken.html", "**Sep 16, 2025**", "**Jul 8, 2025**"),
+        ("bitget.html", "## Release 2025.09.11", "## Release 2025.08.06"),
+    ],
+)
+def test_select_recent_sections(page: str, newest: str, oldest: str) -> None:
+    text = load_page(page)
+
+    selected = select_recent_sections(text, token_budget=10_000)
+    assert selected is not None
+    assert newest in selected
+    assert oldest in selected
+    # navigation and intro text before the changelog is dropped
+    assert len(selected) < len(text)
+
+    small = select_recent_sections(text, token_budget=120)
+    assert small is not None
+    assert newest in small
+    assert oldest not in small
+    assert count_tokens(small) <= 120
+
+
+def test_select_recent_sections_skips_other_chapters() -> None:
+    selected = select_recent_sections(load_page("woox.html"), token_budget=10_000)
+    assert selected is not None
+    assert "Authentication" not in selected
+    assert "Error Codes" not in selected
+
+
+def test_select_recent_sections_keeps_upcoming_changes() -> None:
+    selected = select_recent_sections(load_page("bitfinex.html"), token_budget=120)
+    assert selected is not None
+    assert selected.startswith("## Upcoming Changes")
+
+
+def test_select_recent_sections_with_dated_chapters() -> None:
+    # slate pages with a chapter per date, topics and parameter tables below it
+    text = load_page("okx_log.html")
+
+    selected = select_recent_sections(text, token_budget=250)
+    assert selected is not None
+    assert selected.startswith("# Upcoming Changes")
+    assert "# 2025-09-18\n## New trade fields" in selected
+    assert "| pxAmendType | String | No |" in selected
+    assert "# 2025-07-24" not in selected
+
+
+def test_select_recent_sections_from_a_plain_text_export() -> None:
+    # google docs exports have no markdown headings, only lines holding the date
+    text = (SOURCES_DIR / "max_google_doc.txt").read_text(encoding="utf-8-sig")
+
+    selected = select_recent_sections(text, token_budget=10_000)
+    assert selected is not None
+    assert selected.startswith("2025-03-12\n* Added GET /api/v3/wallet")
+    assert "2024-11-05" in selected
+    assert "MAX Exchange API Change Log" not in selected
+
+
+def test_parse_headings_date_lines() -> None:
+    lines = ["# Changelog", "**Sep 16, 2025**", "2025-SEP-04", "* 2025-01-01", "Last updated: 2025-09-11", "**Note**"]
+
+    headings = parse_headings(lines)
+
+    assert [(heading.line, heading.date) for heading in headings] == [
+        (0, None),
+        (1, date(2025, 9, 16)),
+        (2, date(2025, 9, 4)),
+    ]
+
+
+def test_select_recent_sections_orders_by_date() -> None:
+    text = "# Changelog\n## 2024-01-05\n* old\n## 2024-03-01\n* new\n# Other\n## 2024-06-01\n* not a change"
+    assert select_recent_sections(text, token_budget=100) == "## 2024-03-01\n* new\n## 2024-01-05\n* old"
+
+
+def test_select_recent_sections_with_section_pattern() -> None:
+    text = "# Releases\n## 2024-03-01\n* new\n# Examples\n## 2020-01-01\n* example"
+    assert select_recent_sections(text, token_budget=100, section_pattern="^Releases$") == "## 2024-03-01\n* new"
+
+
+def test_select_recent_sections_without_dates() -> None:
+    assert select_recent_sections("# Changelog\nsome text\n## Details\nmore text", token_budget=100) is None
+
+
+def test_diff_sections() -> None:
+    old = "## Upcoming Changes\n* soon\n## 2024-03-01\n* b\n## 2024-01-05\n* a"
+    new = "## Upcoming Changes\n* soon\n## 2024-04-01\n* c\n## 2024-03-01\n* b, fixed\n## 2024-01-05\n* a"
+
+    diff = diff_sections(old, new)
+    assert diff is not None
+    assert diff.changed == ["## 2024-04-01\n* c", "## 2024-03-01\n* b, fixed"]
+    assert not diff.upcoming_changed
+    assert diff.to_text() == "## Upcoming Changes\n* soon\n## 2024-04-01\n* c\n## 2024-03-01\n* b, fixed"
+
+    diff = diff_sections(old, old)
+    assert diff is not None
+    assert diff.unchanged
+
+    diff = diff_sections(old, "## 2024-03-01\n* b\n## 2024-01-05\n* a")
+    assert diff is not None
+    assert diff.upcoming_changed
+    assert diff.upcoming is None
+
+    assert diff_sections(old, "no headings") is None
+
+
+def test_split_sections() -> None:
+    text = "\n".join(
+        f"## 2025-01-{day:02d}\n" + "\n".join(f"- change {i}" for i in range(20)) for day in range(9, 0, -1)
+    )
+    max_tokens = count_tokens(text) // 3
+
+    chunks = split_sections(text, max_tokens)
+
+    assert len(chunks) > 1
+    assert "\n".join(chunks) == text
+    assert all(count_tokens(chunk) <= max_tokens for chunk in chunks)
+    assert all(chunk.startswith("## 2025-01-") for chunk in chunks)
+
+
+def test_split_sections_splits_oversized_sections() -> None:
+    text = "## 2025-01-01\n" + "\n".join(f"- change {i}" for i in range(100)) + "\n" + "x" * 400
+
+    chunks = split_sections(text, 50)
+
+    # the long line is cut by characters, so only the line breaks differ
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
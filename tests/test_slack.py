@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from slack_sdk.web.async_client import AsyncWebClient
+
+from exchange_changelog.slack import SlackQueue
+from exchange_changelog.slack import pack_messages
+from exchange_changelog.slack import split_message
+
+
+class SlackStandIn(ThreadingHTTPServer):
+    """Answers chat.postMessage like the Slack Web API, rate limiting the first `rate_limited` calls."""
+
+    def __init__(self, rate_limited: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), SlackHandler)
+        self.rate_limited = rate_limited
+        self.requests: list[dict] = []
+        self.messages: list[str] = []
+
+
+class SlackHandler(BaseHTTPRequestHandler):
+    server: SlackStandIn
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            params = json.loads(body)
+        else:
+            params = {key: values[0] for key, values in parse_qs(body).items()}
+        self.server.requests.append(params)
+
+        if self.server.rate_limited > 0:
+            self.server.rate_limited -= 1
+            self.reply(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": "0"})
+            return
+
+        self.server.messages.append(params["text"])
+        self.reply(200, {"ok": True, "channel": params["channel"], "ts": "1.0"})
+
+    def reply(self, status: int, payload: dict, headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def slack_api() -> Iterator[SlackStandIn]:
+    server = SlackStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_queue(server: SlackStandIn, messages: list[str], max_length: int = 4000) -> None:
+    async def post_all() -> None:
+        host, port = server.server_address[:2]
+        client = AsyncWebClient(token="xoxb-test", base_url=f"http://{host!s}:{port}/api/")
+        async with SlackQueue(client=client, channel="C123", max_length=max_length, linger=0.05) as queue:
+            for message in messages:
+                queue.post(message)
+
+    asyncio.run(post_all())
+
+
+def test_split_message() -> None:
+    assert split_message("a\nbb\nccc", max_length=5) == ["a\nbb", "ccc"]
+    assert split_message("x" * 12, max_length=5) == ["xxxxx", "xxxxx", "xx"]
+
+
+def test_pack_messages() -> None:
+    assert pack_messages(["a", "b", "c"], max_length=10) == ["a\n\nb\n\nc"]
+    assert pack_messages(["aaaa", "bbbb", "cccc"], max_length=10) == ["aaaa\n\nbbbb", "cccc"]
+    assert all(len(chunk) <= 10 for chunk in pack_messages(["x" * 25, "y"], max_length=10))
+
+
+def test_queue_batches_messages(slack_api: SlackStandIn) -> None:
+    run_queue(slack_api, ["first", "second", "third"])
+
+    assert slack_api.messages == ["first\n\nsecond\n\nthird"]
+    assert slack_api.requests[0]["channel"] == "C123"
+
+
+def test_queue_respects_size_limit(slack_api: SlackStandIn) -> None:
+    messages = [f"message {i}: " + "x" * 30 for i in range(10)]
+    run_queue(slack_api, messages, max_length=100)
+
+    assert len(slack_api.messages) > 1
+    assert all(len(message) <= 100 for message in slack_api.messages)
+    assert "\n\n".join(slack_api.messages) == "\n\n".join(messages)
+
+
+def test_queue_retries_after_rate_limit(slack_api: SlackStandIn) -> None:
+    slack_api.rate_limited = 2
+    run_queue(slack_api, ["hello"])
+
+    assert len(slack_api.requests) == 3
+    assert slack_api.messages == ["hello"]
@@ -0,0 +1,127 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from exchange_changelog.app import App
+from exchange_changelog.cli import cli
+from exchange_changelog.config import Config
+from exchange_changelog.scraper import PageOptions
+from exchange_changelog.snapshots import SnapshotStore
+from exchange_changelog.snapshots import zstandard
+
+from .test_app import no_static_page
+
+DAY = 24 * 60 * 60
+
+
+def blobs(directory: Path) -> list[Path]:
+    return sorted((directory / "blobs").glob("*/*"))
+
+
+def test_snapshots_are_deduplicated(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    first = store.save("Bybit", "https://bybit.com", "<p>a</p>" * 100, "a", taken_at=1)
+    second = store.save("Bybit", "https://bybit.com", "<p>a</p>" * 100, "a", taken_at=2)
+    store.save("Kraken", "https://kraken.com", "<p>b</p>", "b", taken_at=3)
+
+    assert (first.html, first.markdown) == (second.html, second.markdown)
+    assert len(blobs(tmp_path)) == 4
+    assert all(path.suffix == (".zst" if zstandard else ".gz") for path in blobs(tmp_path))
+    assert blobs(tmp_path)[0].stat().st_size < len("<p>a</p>" * 100)
+
+    assert store.read(first.html) == "<p>a</p>" * 100
+    assert [snapshot.taken_at for snapshot in store.list()] == [3, 2, 1]
+    assert [snapshot.id for snapshot in store.list(doc="Bybit", limit=1)] == [second.id]
+    assert store.get(first.id) == first
+    assert store.get(100) is None
+
+
+def test_snapshot_diff(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path, codec="gzip")
+    old = store.save("Bybit", "https://bybit.com", "<h2>v1</h2>", "## v1\n")
+    new = store.save("Bybit", "https://bybit.com", "<h2>v2</h2>", "## v2\n")
+
+    diff = store.diff(old, new)
+    assert f"--- Bybit@{old.id}" in diff
+    assert "-## v1\n+## v2\n" in diff
+    assert "+<h2>v2</h2>" in store.diff(old, new, kind="html")
+
+
+def test_prune(tmp_path: Path) -> None:
+    store = SnapshotStore(tmp_path)
+    now = 96 * DAY
+    pages = ["old", "a", "a", "a", "a", "b", "b"]
+    for day, page in enumerate(pages, start=90):
+        store.save("Bybit", "https://bybit.com", page, page, taken_at=day * DAY)
+    store.save("Kraken", "https://kraken.com", "stale", "stale", taken_at=0)
+
+    assert store.prune(keep_days=5, now=now) == (3, 1)
+
+    # the old page is past retention, the middle copies of "a" are redundant
+    # and the latest snapshot of each doc is kept regardless of age
+    remaining = [(snapshot.doc, snapshot.taken_at / DAY) for snapshot in store.list()]
+    assert remaining == [("Bybit", 96), ("Bybit", 95), ("Bybit", 94), ("Bybit", 91), ("Kraken", 0)]
+    assert len(blobs(tmp_path)) == 3
+
+    assert store.prune(keep_days=5, now=now) == (0, 0)
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_and_gzip_blobs_are_both_readable(tmp_path: Path) -> None:
+    gzipped = SnapshotStore(tmp_path, codec="gzip").save("Bybit", "https://bybit.com", "a", "a")
+    store = SnapshotStore(tmp_path, codec="zstd")
+    snapshot = store.save("Bybit", "https://bybit.com", "b", "b")
+
+    assert store.read(gzipped.html) == "a"
+    assert store.read(snapshot.html) == "b"
+
+
+def test_app_saves_snapshots(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:1]
+    config.snapshot_dir = str(tmp_path / "snapshots")
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        return "<h2>2025-01-01</h2><p>change</p>"
+
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+
+    text = asyncio.run(app.scrape(config.docs[0]))
+
+    assert app.snapshots is not None
+    [snapshot] = app.snapshots.list()
+    assert snapshot.doc == config.docs[0].name
+    assert app.snapshots.read(snapshot.html) == "<h2>2025-01-01</h2><p>change</p>"
+    assert app.snapshots.read(snapshot.markdown) == text
+
+
+def test_snapshots_cli(tmp_path: Path) -> None:
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(f"docs: []\nsnapshot_dir: {tmp_path / 'snapshots'}\n")
+    store = SnapshotStore(tmp_path / "snapshots")
+    old = store.save("Bybit", "https://bybit.com", "<p>v1</p>", "v1\n", taken_at=1)
+    store.save("Bybit", "https://bybit.com", "<p>v2</p>", "v2\n", taken_at=2)
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["snapshots", "list", "-c", str(config_file)])
+    assert result.exit_code == 0, result.output
+    assert len(result.output.splitlines()) == 2
+
+    result = runner.invoke(cli, ["snapshots", "show", str(old.id), "-c", str(config_file), "--html"])
+    assert result.output == "<p>v1</p>\n"
+
+    result = runner.invoke(cli, ["snapshots", "diff", str(old.id), "-c", str(config_file)])
+    assert "-v1\n+v2\n" in result.output
+
+    result = runner.invoke(cli, ["snapshots", "prune", "-c", str(config_file)])
+    assert result.output == "deleted 1 snapshots and 2 blobs\n"
+
+    result = runner.invoke(cli, ["snapshots", "show", "100", "-c", str(config_file)])
+    assert result.exit_code == 1
+
+    config_file.write_text("docs: []\n")
+    result = runner.invoke(cli, ["snapshots", "list", "-c", str(config_file)])
+    assert result.exit_code == 1
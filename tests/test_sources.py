@@ -0,0 +1,134 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+
+from exchange_changelog.app import App
+from exchange_changelog.config import Config
+from exchange_changelog.config import Document
+from exchange_changelog.fetcher import HttpFetcher
+from exchange_changelog.scraper import PageOptions
+from exchange_changelog.sources import DocusaurusSource
+from exchange_changelog.sources import GitHubSource
+from exchange_changelog.sources import GoogleDocsSource
+from exchange_changelog.sources import Source
+from exchange_changelog.sources import find_source
+from exchange_changelog.store import FileStore
+
+SOURCES_DIR = Path(__file__).parent / "fixtures" / "sources"
+GOOGLE_DOC = (
+    "https://docs.google.com/document/d/1iLwjhU-AHSLB4UnZh3cPbkYL-M3-R0jW0MEL6iWt410/edit?tab=t.0#heading=h.z31"
+)
+BINANCE_SPOT = "https://developers.binance.com/docs/binance-spot-api-docs/CHANGELOG"
+GITHUB_BLOB = "https://github.com/bybit-exchange/docs/blob/main/CHANGELOG.md"
+
+
+def recorded(responses: dict[str, tuple[str, str]], requested: list[str]) -> httpx.AsyncClient:
+    """A client answering each URL with the recorded fixture file and content type, 404 otherwise."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        requested.append(url)
+        if url not in responses:
+            return httpx.Response(404, text="<html>not found</html>", headers={"Content-Type": "text/html"})
+        name, content_type = responses[url]
+        return httpx.Response(200, content=(SOURCES_DIR / name).read_bytes(), headers={"Content-Type": content_type})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def fetch(source: Source, url: str, client: httpx.AsyncClient, store_dir: Path) -> str | None:
+    async def run() -> str | None:
+        async with HttpFetcher(FileStore(store_dir), client=client) as fetcher:
+            return await source.fetch(fetcher, url)
+
+    return asyncio.run(run())
+
+
+def test_find_source() -> None:
+    assert isinstance(find_source(GOOGLE_DOC), GoogleDocsSource)
+    assert isinstance(find_source(BINANCE_SPOT), DocusaurusSource)
+    assert isinstance(find_source(GITHUB_BLOB), GitHubSource)
+    assert find_source("https://docs.kraken.com/api/docs/change-log") is None
+    assert find_source("https://github.com/bybit-exchange/docs/blob/main/index.html") is None
+
+    assert find_source(BINANCE_SPOT, "page") is None
+    assert isinstance(find_source("https://docs.example.com/changelog", "docusaurus"), DocusaurusSource)
+
+
+def test_google_docs_source(tmp_path: Path) -> None:
+    export_url = "https://docs.google.com/document/d/1iLwjhU-AHSLB4UnZh3cPbkYL-M3-R0jW0MEL6iWt410/export?format=txt"
+    requested: list[str] = []
+    client = recorded({export_url: ("max_google_doc.txt", "text/plain; charset=utf-8")}, requested)
+
+    text = fetch(GoogleDocsSource(), GOOGLE_DOC, client, tmp_path)
+
+    assert requested == [export_url]
+    assert text is not None
+    assert text.startswith("MAX Exchange API Change Log")
+    assert "2025-03-12" in text
+
+
+def test_docusaurus_source(tmp_path: Path) -> None:
+    responses = {
+        "https://developers.binance.com/sitemap.xml": ("binance_sitemap.xml", "application/xml"),
+        BINANCE_SPOT + ".md": ("binance_spot_changelog.md", "text/markdown; charset=utf-8"),
+    }
+    requested: list[str] = []
+
+    text = fetch(DocusaurusSource(), BINANCE_SPOT + "#2025-04-08", recorded(responses, requested), tmp_path)
+    assert text is not None
+    assert "### 2025-04-08" in text
+    assert requested == ["https://developers.binance.com/sitemap.xml", BINANCE_SPOT + ".md"]
+
+    # the sitemap says the page did not change, the stored markdown is used
+    requested.clear()
+    assert fetch(DocusaurusSource(), BINANCE_SPOT, recorded(responses, requested), tmp_path) == text
+    assert requested == ["https://developers.binance.com/sitemap.xml"]
+
+    # no markdown served next to the page
+    margin = "https://developers.binance.com/docs/margin_trading/change-log"
+    assert fetch(DocusaurusSource(), margin, recorded(responses, requested), tmp_path) is None
+
+
+def test_github_source(tmp_path: Path) -> None:
+    raw_url = "https://raw.githubusercontent.com/bybit-exchange/docs/main/CHANGELOG.md"
+    requested: list[str] = []
+    responses = {raw_url: ("github_changelog.md", "text/plain; charset=utf-8")}
+
+    text = fetch(GitHubSource(), GITHUB_BLOB, recorded(responses, requested), tmp_path)
+
+    assert requested == [raw_url]
+    assert text == (SOURCES_DIR / "github_changelog.md").read_text()
+    assert GitHubSource().raw_url(raw_url) == raw_url
+
+
+def test_app_reads_sources_and_falls_back_to_the_page(
+    config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    config.docs = [
+        Document(name="MAX", url=GOOGLE_DOC),
+        Document(name="Binance Margin", url="https://developers.binance.com/docs/margin_trading/change-log"),
+    ]
+    export_url = "https://docs.google.com/document/d/1iLwjhU-AHSLB4UnZh3cPbkYL-M3-R0jW0MEL6iWt410/export?format=txt"
+    requested: list[str] = []
+    rendered: list[str] = []
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+    app.fetcher.client = recorded({export_url: ("max_google_doc.txt", "text/plain")}, requested)
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        rendered.append(url)
+        return "<main><h2>2025-03-21</h2><p>margin change</p></main>"
+
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+
+    async def scrape() -> list[str]:
+        return [await app.scrape(doc) for doc in config.docs]
+
+    google_doc, margin = asyncio.run(scrape())
+
+    assert "2025-03-12" in google_doc
+    assert "margin change" in margin
+    assert rendered == [config.docs[1].url]
+    assert app.metrics.counters["source_reads"] == {"MAX": 1}
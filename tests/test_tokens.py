@@ -0,0 +1,60 @@
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from exchange_changelog import tokens as tokens_module
+from exchange_changelog.tokens import count_tokens
+
+
+class FakeEncoding:
+    """Splits on whitespace, one token per word."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def encode(self, text: str, **kwargs: Any) -> list[int]:
+        return [len(word) for word in text.split()]
+
+
+class FakeTiktoken:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.loaded: list[str] = []
+
+    def encoding_for_model(self, model: str) -> FakeEncoding:
+        if self.error is not None:
+            raise self.error
+        if not model.startswith("gpt-"):
+            raise KeyError(model)
+        self.loaded.append(model)
+        return FakeEncoding(model)
+
+    def get_encoding(self, name: str) -> FakeEncoding:
+        self.loaded.append(name)
+        return FakeEncoding(name)
+
+
+@pytest.fixture(autouse=True)
+def clear_encodings() -> Iterator[None]:
+    tokens_module._get_encoding.cache_clear()
+    yield
+    tokens_module._get_encoding.cache_clear()
+
+
+def test_count_tokens_with_the_model_tokenizer(monkeypatch: pytest.MonkeyPatch) -> None:
+    fake = FakeTiktoken()
+    monkeypatch.setattr(tokens_module, "tiktoken", fake)
+    monkeypatch.setenv("OPENAI_MODEL", "gpt-4o")
+
+    assert count_tokens("three short words") == 3
+    assert count_tokens("an azure deployment name", model="my-deployment") == 4
+    assert count_tokens("cached encoding") == 2
+    assert fake.loaded == ["gpt-4o", "o200k_base"]
+
+
+def test_count_tokens_estimates_without_the_tokenizer(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tokens_module, "tiktoken", FakeTiktoken(error=ConnectionError("offline")))
+
+    assert count_tokens("three short words", model="gpt-4o") == 5
+    assert count_tokens("", model="gpt-4o") == 0
@@ -0,0 +1,95 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from exchange_changelog import app as app_module
+from exchange_changelog.app import App
+from exchange_changelog.changelog import Changelog
+from exchange_changelog.config import Config
+from exchange_changelog.scraper import PageOptions
+from exchange_changelog.watch import PollSchedule
+from exchange_changelog.watch import Watcher
+from exchange_changelog.watch import has_new_changes
+
+from .test_app import no_static_page
+from .test_changelog import make_change
+
+
+def test_poll_schedule_backs_off_and_tightens() -> None:
+    schedule = PollSchedule(min_interval=60, max_interval=600, backoff=2, jitter=0)
+
+    intervals = []
+    for _ in range(5):
+        schedule.update(changed=False, now=0)
+        intervals.append(schedule.next_at)
+    assert intervals == [120, 240, 480, 600, 600]
+
+    schedule.update(changed=True, now=1000)
+    assert schedule.next_at == 1060
+
+
+def test_poll_schedule_jitter() -> None:
+    schedule = PollSchedule(min_interval=100, max_interval=100, jitter=0.2)
+
+    waits = set()
+    for _ in range(20):
+        schedule.update(changed=False, now=0)
+        waits.add(schedule.next_at)
+    assert all(80 <= wait <= 120 for wait in waits)
+    assert len(waits) > 1
+
+
+def test_has_new_changes() -> None:
+    previous = Changelog(changes=[make_change("2025-01-01", "a")], upcoming_changes="")
+
+    assert not has_new_changes(None, previous)
+    assert not has_new_changes(previous, Changelog(changes=[], upcoming_changes=""))
+    assert has_new_changes(previous, Changelog(changes=[make_change("2025-01-02", "b")], upcoming_changes=""))
+    assert has_new_changes(previous, Changelog(changes=previous.changes, upcoming_changes="soon"))
+
+
+def test_watch(config: Config, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config.docs = config.docs[:2]
+    config.num_days = 36500
+    config.watch_min_interval = 0.01
+    config.watch_max_interval = 0.08
+    config.watch_jitter = 0
+    pages = {doc.url: "2025-01-01" for doc in config.docs}
+    checks: dict[str, int] = {doc.url: 0 for doc in config.docs}
+    posted: list[str] = []
+
+    async def fake_fetch(url: str, options: PageOptions | None = None) -> str:
+        checks[url] += 1
+        if checks[url] == 3:
+            pages[url] = "2025-01-02"
+        return pages[url]
+
+    async def fake_extract_changelog(
+        text: str, prompt: str | None = None, chunk_tokens: int | None = None
+    ) -> Changelog:
+        return Changelog(changes=[make_change(text, "change")], upcoming_changes="")
+
+    app = App(config=config, output_file=tmp_path / "changelog.md")
+    watcher = Watcher(app)
+    monkeypatch.setattr(app.fetcher, "fetch", no_static_page)
+    monkeypatch.setattr(app.scraper, "fetch", fake_fetch)
+    monkeypatch.setattr(app.scraper, "start", lambda: asyncio.sleep(0))
+    monkeypatch.setattr(app_module, "extract_changelog", fake_extract_changelog)
+    monkeypatch.setattr(app.slack, "post", posted.append)
+
+    async def run() -> None:
+        task = asyncio.create_task(watcher._run())
+        await asyncio.sleep(0.5)
+        watcher.stop()
+        await task
+
+    asyncio.run(run())
+
+    # backed off to the maximum interval while stable
+    assert all(4 <= count <= 12 for count in checks.values())
+    assert all(schedule.interval == config.watch_max_interval for schedule in watcher.schedules.values())
+    # the first check and the change are posted once per doc, and the file has the latest state
+    assert len(posted) == 4
+    assert sum("2025-01-02" in message for message in posted) == 2
+    assert "2025-01-02" in (tmp_path / "changelog.md").read_text()